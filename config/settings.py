@@ -4,7 +4,7 @@ from pathlib import Path
 # Project root directory (two levels up from this file)
 ROOT = Path(__file__).resolve().parents[1]
 
-# Chain mode (default: local)
+# Chain mode: "local" (JSON/JSONL files), "sqlite" or "eth" (default: local)
 CHAIN_MODE = os.getenv("CHAIN_MODE", "local")
 
 # Data directories (can be overridden via environment variables)
@@ -13,9 +13,72 @@ CLOUD_DIR  = Path(os.getenv("CLOUD_DIR", DATA_DIR / "cloud"))
 LEDGER_DIR = Path(os.getenv("LEDGER_DIR", DATA_DIR / "ledger"))
 KEYS_DIR   = Path(os.getenv("KEYS_DIR", DATA_DIR / "keys"))
 
+# Ledger on-disk format: "json" (single array, rewritten per append) or
+# "jsonl" (append-only, one block per line)
+LEDGER_FORMAT = os.getenv("LEDGER_FORMAT", "json")
+
+# Group-commit window in milliseconds for LocalChain (0 = commit every append immediately).
+# Batches appends made concurrently through one LocalChain instance, i.e. by threads of one
+# process using make_chain(); separate processes take turns on the ledger lock unbatched.
+LEDGER_GROUP_COMMIT_MS = float(os.getenv("LEDGER_GROUP_COMMIT_MS", "0"))
+
+# Roll a JSONL ledger over into a sealed segment after this many blocks / bytes (0 = never)
+LEDGER_SEGMENT_BLOCKS = int(os.getenv("LEDGER_SEGMENT_BLOCKS", "0"))
+LEDGER_SEGMENT_BYTES  = int(os.getenv("LEDGER_SEGMENT_BYTES", "0"))
+
 # Ethereum RPC endpoint
 ETH_RPC_URL = os.getenv("ETH_RPC_URL", "http://127.0.0.1:8545")
 
+# Max EthChain transactions in flight (0 = send one and wait for its receipt)
+ETH_PIPELINE_DEPTH = int(os.getenv("ETH_PIPELINE_DEPTH", "0"))
+
+# Blob directory fan-out: levels of 2-hex-char subdirectories under CLOUD_DIR (0 = flat)
+CLOUD_SHARD_LEVELS = int(os.getenv("CLOUD_SHARD_LEVELS", "2"))
+
+# Blob storage backend: "fs" (CLOUD_DIR) or "s3" (any S3-compatible object store)
+STORAGE_MODE = os.getenv("STORAGE_MODE", "fs")
+
+# S3 backend: bucket, key prefix, endpoint (e.g. http://127.0.0.1:9000 for MinIO; unset = AWS),
+# multipart part / ranged GET size, and parallel transfers (= connection pool size)
+S3_BUCKET       = os.getenv("S3_BUCKET", "")
+S3_PREFIX       = os.getenv("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_PART_SIZE    = int(os.getenv("S3_PART_SIZE", str(8 << 20)))
+S3_WORKERS      = int(os.getenv("S3_WORKERS", "8"))
+
+# Local LRU cache of downloaded ciphertext, mainly for remote backends (0 bytes = off)
+BLOB_CACHE_DIR   = Path(os.getenv("BLOB_CACHE_DIR", DATA_DIR / "cache"))
+BLOB_CACHE_BYTES = int(os.getenv("BLOB_CACHE_BYTES", "0"))
+
+# Parsed keys kept in memory by the keystore (LRU entries)
+KEY_CACHE_SIZE = int(os.getenv("KEY_CACHE_SIZE", "256"))
+
+# Key wrapping used for new KEY_SHARE events: "rsa" (RSA-OAEP, readable by every client) or
+# "x25519" (ECDH + HKDF + AES-GCM; opt-in, needs clients that understand the "scheme" tag).
+# Downloads accept either.
+KEY_WRAP_SCHEME = os.getenv("KEY_WRAP_SCHEME", "rsa").lower()
+
+# Where owners' per-file AES key stores live. Kept apart from KEYS_DIR so the
+# stores can go on a shared volume while the private keys stay local.
+OWNER_KEYS_DIR = Path(os.getenv("OWNER_KEYS_DIR", DATA_DIR / "owner_keys"))
+
+# Store owners' per-file AES keys wrapped under their own X25519 key (for an OWNER_KEYS_DIR on a shared volume)
+OWNER_KEYS_WRAP = os.getenv("OWNER_KEYS_WRAP", "0").lower() in ("1", "true", "yes")
+
+# Keypairs of each kind pre-generated in background processes by the GUI (0 = off, the default).
+# Opt-in: the workers start with the GUI and their keys are discarded on exit if nobody registers.
+KEYPOOL_DEPTH = int(os.getenv("KEYPOOL_DEPTH", "0"))
+
+# Plaintext bytes per AES-GCM chunk in the streaming upload format
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1 << 20)))
+
+# How uploads are signed: "tree" (Merkle root over ciphertext chunks, hashed in
+# parallel and verifiable per chunk) or "stream" (one SHA-256 over the ciphertext)
+UPLOAD_SIGN_MODE = os.getenv("UPLOAD_SIGN_MODE", "tree")
+
+# Compress uploads before encryption: "off", "auto" (only if a sample compresses) or "zlib"
+UPLOAD_COMPRESSION = os.getenv("UPLOAD_COMPRESSION", "off")
+
 # Create required directories if they don’t exist
 for p in [DATA_DIR, CLOUD_DIR, LEDGER_DIR, KEYS_DIR]:
     p.mkdir(parents=True, exist_ok=True)
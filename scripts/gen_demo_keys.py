@@ -3,15 +3,47 @@ Generate demo keypairs for users to run the GUI without manual setup.
 
 Usage:
   python scripts/gen_demo_keys.py owner1 requester1 alice bob
+  python scripts/gen_demo_keys.py --parallel [WORKERS] --count N [--prefix user]
+
+--parallel provisions in bulk, generating RSA keys across processes;
+--count N adds users <prefix>1..<prefix>N.
 """
 import sys
+import time
 from pathlib import Path
 from config.settings import KEYS_DIR
-from src.core.keystore import ensure_user_keys
+from src.core.keystore import ensure_user_keys, provision_users
+
+def _parse(argv):
+    # Minimal flag parsing: returns (users, parallel, workers)
+    users, parallel, workers, count, prefix = [], False, None, 0, "user"
+    it = iter(argv)
+    for arg in it:
+        if arg == "--parallel":
+            parallel = True
+            nxt = next(it, None)
+            if nxt is not None and nxt.isdigit():
+                workers = int(nxt)
+            elif nxt is not None:
+                users.append(nxt)
+        elif arg == "--count":
+            count = int(next(it))
+        elif arg == "--prefix":
+            prefix = next(it)
+        else:
+            users.append(arg)
+    users += [f"{prefix}{i}" for i in range(1, count + 1)]
+    return users or ["owner1", "requester1"], parallel, workers
 
 def main():
     # Create keys for provided users (defaults if none specified)
-    users = sys.argv[1:] or ["owner1", "requester1"]
+    users, parallel, workers = _parse(sys.argv[1:])
+    if parallel:
+        t0 = time.perf_counter()
+        created = provision_users(KEYS_DIR, users, workers=workers)
+        print(f"[ok] {len(created)} new / {len(users)} users under {KEYS_DIR} "
+              f"({time.perf_counter() - t0:.1f}s)")
+        return
     for u in users:
         ensure_user_keys(KEYS_DIR, u)
         print(f"[ok] keys for {u} at {KEYS_DIR/u}")
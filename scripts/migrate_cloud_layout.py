@@ -0,0 +1,20 @@
+"""
+Move blobs from the flat data/cloud layout (or an earlier shard depth) into
+the current shard directories. Nothing to do on the S3 backend.
+
+Safe to run while the app is in use: each file is moved with an atomic
+rename and readers look in both layouts. Uses CLOUD_SHARD_LEVELS.
+
+Usage:
+  python scripts/migrate_cloud_layout.py
+"""
+from config.settings import CLOUD_DIR, CLOUD_SHARD_LEVELS
+from src.storage.cloud import migrate_layout
+
+def main():
+    moved = migrate_layout()
+    print(f"[ok] moved {moved} file(s) into {CLOUD_SHARD_LEVELS}-level layout under {CLOUD_DIR}")
+
+if __name__ == "__main__":
+    # Entry point
+    main()
@@ -0,0 +1,33 @@
+"""
+Convert the legacy ledger.json array into the append-only JSONL format,
+or import a JSON/JSONL ledger into the SQLite backend (DST ending in .db).
+
+Usage:
+  python scripts/migrate_ledger.py            # data/ledger/ledger.json -> ledger.jsonl
+  python scripts/migrate_ledger.py SRC DST
+  python scripts/migrate_ledger.py data/ledger/ledger.json data/ledger/ledger.db
+"""
+import sys
+from pathlib import Path
+from filelock import FileLock
+from config.settings import LEDGER_DIR
+from src.blockchain.local_chain import LOCK_FILE, migrate_json_to_jsonl
+from src.blockchain.sqlite_chain import SqliteChain, import_ledger
+
+def main():
+    # Migrate under the ledger lock so no writer sees a half-converted ledger
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else LEDGER_DIR / "ledger.json"
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else src.with_suffix(".jsonl")
+    with FileLock(str(LOCK_FILE)):
+        if dst.suffix == ".db":
+            n = import_ledger(SqliteChain(dst), src)
+            hint = "Set CHAIN_MODE=sqlite to use the new ledger."
+        else:
+            n = migrate_json_to_jsonl(src, dst)
+            hint = "Set LEDGER_FORMAT=jsonl to use the new ledger."
+    print(f"[ok] migrated {n} block(s) from {src} to {dst}")
+    print(hint)
+
+if __name__ == "__main__":
+    # Entry point
+    main()
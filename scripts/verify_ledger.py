@@ -0,0 +1,26 @@
+"""
+Fully re-verify the local ledger using all CPU cores.
+
+Usage:
+  python scripts/verify_ledger.py [WORKERS]
+"""
+import sys
+import time
+from src.blockchain.local_chain import LocalChain
+
+def main():
+    # Report the first tampered block index, exiting non-zero if one is found
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    chain = LocalChain()
+    t0 = time.perf_counter()
+    bad = chain.find_first_invalid(workers=workers)
+    took = time.perf_counter() - t0
+    if bad is None:
+        print(f"[ok] ledger valid ({took:.2f}s)")
+        return
+    print(f"[fail] first invalid block at index {bad} ({took:.2f}s)")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    # Entry point
+    main()
@@ -1,7 +1,41 @@
-from typing import Protocol, List, Dict, Any
+import threading
+import time
+from typing import Protocol, List, Dict, Any, Iterator, Optional
 
 # Protocol defining the required blockchain interface
 class Chain(Protocol):
     def append_event(self, event: Dict[str, Any]) -> str: ...
+    def append_events(self, events: List[Dict[str, Any]]) -> List[str]: ...
     def get_events(self) -> List[Dict[str, Any]]: ...
-    def verify_chain(self) -> bool: ...
+    def get_events_since(self, height: int) -> List[Dict[str, Any]]: ...
+    def height(self) -> int: ...
+    def verify_chain(self, full: bool = False) -> bool: ...
+    def find_first_invalid(self, workers: Optional[int] = None) -> Optional[int]: ...
+    # Event queries (indexed in LocalChain/SqliteChain; see scan_events for a plain fallback)
+    def find_events(self, **fields: str) -> List[Dict[str, Any]]: ...
+    def first_event(self, **fields: str) -> Optional[Dict[str, Any]]: ...
+    def latest_event(self, **fields: str) -> Optional[Dict[str, Any]]: ...
+    def requests_for_owner(self, owner_id: str) -> List[Dict[str, Any]]: ...
+
+def scan_events(blocks: List[Dict[str, Any]], **fields: str) -> List[Dict[str, Any]]:
+    # Blocks whose event matches all given fields, by a linear scan
+    return [b for b in blocks if all(b["event"].get(f) == v for f, v in fields.items())]
+
+def scan_requests_for_owner(blocks: List[Dict[str, Any]], owner_id: str) -> List[Dict[str, Any]]:
+    # ACCESS_REQUEST blocks for files uploaded by owner_id, by a linear scan
+    owned = {b["event"].get("file_id") for b in scan_events(blocks, type="UPLOAD", owner_id=owner_id)}
+    return [b for b in scan_events(blocks, type="ACCESS_REQUEST") if b["event"].get("file_id") in owned]
+
+def follow(chain: Chain, height: int = 0, poll_interval: float = 0.5,
+           stop: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+    # Yield blocks from `height` onward, blocking for new ones until `stop` is set
+    while stop is None or not stop.is_set():
+        new = chain.get_events_since(height)
+        for block in new:
+            yield block
+        height += len(new)
+        if not new:
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
@@ -0,0 +1,40 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional
+from src.util.time import now_ts
+
+GENESIS = "GENESIS"
+
+def hash_block(block: Dict[str, Any]) -> str:
+    # Compute SHA-256 hash of a block
+    payload = {
+        "ts": block["ts"],
+        "prev": block["prev"],
+        "event": block["event"],
+    }
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(data).hexdigest()
+
+def make_block(event: Dict[str, Any], prev_hash: str) -> Dict[str, Any]:
+    # Build a new block chained onto prev_hash
+    block = {
+        "ts": now_ts(),
+        "prev": prev_hash,
+        "event": event,
+    }
+    block["hash"] = hash_block(block)
+    return block
+
+def encode_line(block: Dict[str, Any]) -> bytes:
+    # Serialize one block as a single JSONL line
+    return json.dumps(block, separators=(",", ":")).encode() + b"\n"
+
+def first_bad_block(blocks: Iterable[Dict[str, Any]], prev: str = GENESIS) -> Optional[int]:
+    # Index of the first block that breaks linkage or its own hash, if any
+    for i, b in enumerate(blocks):
+        if b.get("prev") != prev:
+            return i
+        if hash_block(b) != b.get("hash"):
+            return i
+        prev = b["hash"]
+    return None
@@ -9,22 +9,30 @@ Requires:
 Notes:
 - verify_chain() always returns True (immutability handled by consensus).
 - Returned events match LocalChain format.
+- With pipeline_depth > 0 (ETH_PIPELINE_DEPTH), nonces are tracked locally and
+  up to that many transactions are kept in flight; receipts are confirmed by a
+  background thread and flush() waits for finality.
 """
 
 import json
 import os
+import queue
+import threading
 import time
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from web3 import Web3
-from config.settings import ETH_RPC_URL
+from config.settings import ETH_RPC_URL, ETH_PIPELINE_DEPTH
 from src.util.time import now_ts
+from src.blockchain.base import follow, scan_events, scan_requests_for_owner
 
 ABI_PATH = Path("contracts/ChainLogger.abi.json")
 
 class EthChain:
-    def __init__(self, contract_address: str | None = None, abi_path: Path = ABI_PATH, rpc_url: str = ETH_RPC_URL):
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+    def __init__(self, contract_address: str | None = None, abi_path: Path = ABI_PATH, rpc_url: str = ETH_RPC_URL,
+                 w3=None, pipeline_depth: int = ETH_PIPELINE_DEPTH, receipt_timeout: float = 120):
+        # w3 may be injected (e.g. a dev-chain stand-in in tests)
+        self.w3 = w3 or Web3(Web3.HTTPProvider(rpc_url))
         if not self.w3.is_connected():
             raise RuntimeError(f"Cannot connect to ETH node at {rpc_url}")
 
@@ -39,18 +47,101 @@ class EthChain:
         # Use first available account (common for Ganache/Hardhat)
         self.account = self.w3.eth.accounts[0]
 
-    def append_event(self, event: Dict[str, Any]) -> str:
-        # Encode event as JSON and send to contract
+        # Pipelined submission state
+        self.pipeline_depth  = pipeline_depth
+        self.receipt_timeout = receipt_timeout
+        self._nonce_lock = threading.Lock()
+        self._nonce: int | None = None
+        self._slots = threading.BoundedSemaphore(max(pipeline_depth, 1))
+        self._inflight: "queue.Queue" = queue.Queue()
+        self._failed: List[tuple] = []
+        self._confirmer: threading.Thread | None = None
+
+    def _build_tx(self, event: Dict[str, Any], nonce: int):
+        # Encode event as JSON and build the contract call
         payload = json.dumps(event, sort_keys=True, separators=(",", ":"))
-        tx = self.contract.functions.append(payload).build_transaction({
+        return self.contract.functions.append(payload).build_transaction({
             "from": self.account,
-            "nonce": self.w3.eth.get_transaction_count(self.account),
+            "nonce": nonce,
             "gas": 100_000,
         })
+
+    def append_event(self, event: Dict[str, Any]) -> str:
+        # Send to contract; blocks for the receipt unless pipelining is enabled
+        if self.pipeline_depth > 0:
+            return self._submit(event)
+        tx = self._build_tx(event, self.w3.eth.get_transaction_count(self.account))
         tx_hash = self.w3.eth.send_transaction(tx)
         self.w3.eth.wait_for_transaction_receipt(tx_hash)
         return tx_hash.hex()
 
+    # ---------- pipelined mode ----------
+    def _next_nonce(self) -> int:
+        # Hand out nonces locally, seeding from the node's pending count once
+        with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = self.w3.eth.get_transaction_count(self.account, "pending")
+            n = self._nonce
+            self._nonce += 1
+            return n
+
+    def _submit(self, event: Dict[str, Any]) -> str:
+        # Send without waiting for the receipt; at most pipeline_depth stay in flight
+        self._slots.acquire()
+        try:
+            tx_hash = self.w3.eth.send_transaction(self._build_tx(event, self._next_nonce()))
+        except Exception:
+            # Our nonce view may now be wrong; reseed from the node on the next send
+            with self._nonce_lock:
+                self._nonce = None
+            self._slots.release()
+            raise
+        self._ensure_confirmer()
+        self._inflight.put(tx_hash)
+        return tx_hash.hex()
+
+    def _ensure_confirmer(self):
+        if self._confirmer is None or not self._confirmer.is_alive():
+            self._confirmer = threading.Thread(target=self._confirm_loop, name="eth-receipts", daemon=True)
+            self._confirmer.start()
+
+    def _confirm_loop(self):
+        # Wait for receipts in submission order and free a pipeline slot for each
+        while True:
+            tx_hash = self._inflight.get()
+            try:
+                receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout)
+                if receipt.get("status", 1) != 1:
+                    self._failed.append((tx_hash.hex(), "reverted"))
+            except Exception as exc:
+                self._failed.append((tx_hash.hex(), str(exc)))
+            finally:
+                self._slots.release()
+                self._inflight.task_done()
+
+    def flush(self, timeout: float | None = None) -> None:
+        # Block until every submitted transaction has a receipt; raise if any failed
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._inflight.all_tasks_done:
+            while self._inflight.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{self._inflight.unfinished_tasks} transaction(s) still pending")
+                self._inflight.all_tasks_done.wait(remaining)
+        if self._failed:
+            failed, self._failed = self._failed, []
+            with self._nonce_lock:
+                self._nonce = None
+            raise RuntimeError(f"{len(failed)} transaction(s) failed: {failed}")
+
+    def append_events(self, events: List[Dict[str, Any]]) -> List[str]:
+        # One transaction per event (the contract has no batch entry point);
+        # pipelined, they are all in flight at once and confirmed together
+        hashes = [self.append_event(ev) for ev in events]
+        if self.pipeline_depth > 0:
+            self.flush()
+        return hashes
+
     def get_events(self) -> List[Dict[str, Any]]:
         # Read all events from contract storage
         items = self.contract.functions.getAll().call()
@@ -68,6 +159,35 @@ class EthChain:
             })
         return out
 
-    def verify_chain(self) -> bool:
+    def get_events_since(self, height: int) -> List[Dict[str, Any]]:
+        # The contract only exposes getAll(), so slice its result
+        return self.get_events()[height:]
+
+    def height(self) -> int:
+        return len(self.contract.functions.getAll().call())
+
+    def follow(self, height: int = 0, poll_interval: float = 2.0, stop=None):
+        # Generator over new events as they are mined (see base.follow)
+        return follow(self, height, poll_interval, stop)
+
+    def verify_chain(self, full: bool = False) -> bool:
         # Trust Ethereum consensus for integrity
         return True
+
+    def find_first_invalid(self, workers: Optional[int] = None) -> Optional[int]:
+        return None
+
+    # The contract has no query entry points, so these scan getAll()
+    def find_events(self, **fields: str) -> List[Dict[str, Any]]:
+        return scan_events(self.get_events(), **fields)
+
+    def first_event(self, **fields: str) -> Optional[Dict[str, Any]]:
+        hits = self.find_events(**fields)
+        return hits[0]["event"] if hits else None
+
+    def latest_event(self, **fields: str) -> Optional[Dict[str, Any]]:
+        hits = self.find_events(**fields)
+        return hits[-1]["event"] if hits else None
+
+    def requests_for_owner(self, owner_id: str) -> List[Dict[str, Any]]:
+        return scan_requests_for_owner(self.get_events(), owner_id)
@@ -0,0 +1,29 @@
+import threading
+from config.settings import CHAIN_MODE
+from src.blockchain.local_chain import LocalChain
+from src.blockchain.sqlite_chain import SqliteChain
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def _build(mode: str):
+    if mode == "local":
+        return LocalChain()
+    if mode == "sqlite":
+        return SqliteChain()
+    if mode == "eth":
+        # Imported lazily so web3 is only needed when actually selected
+        from src.blockchain.eth_chain import EthChain
+        return EthChain()
+    raise ValueError(f"Unknown CHAIN_MODE: {mode!r} (expected local, sqlite or eth)")
+
+def make_chain(mode: str = CHAIN_MODE, shared: bool = True):
+    # The Chain backend selected by CHAIN_MODE. By default one instance per process is
+    # shared, so callers reuse its in-memory index and concurrent appends can be group
+    # committed; shared=False builds a private one.
+    if not shared:
+        return _build(mode)
+    with _shared_lock:
+        if mode not in _shared:
+            _shared[mode] = _build(mode)
+        return _shared[mode]
@@ -0,0 +1,107 @@
+"""
+Secondary indexes over ledger events.
+
+Maps the event fields used by the services and GUI (type, file_id, owner_id,
+requester_id) to block positions so lookups do not rescan the ledger. The
+index is rebuildable from the ledger at any time; for JSONL ledgers LocalChain
+persists it in a sidecar and catches it up with blocks appended since it was
+saved. JSON-array ledgers keep it in memory only.
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+INDEXED_FIELDS = ("type", "file_id", "owner_id", "requester_id")
+INDEX_VERSION  = 1
+
+class EventIndex:
+    def __init__(self):
+        self.height = 0           # number of blocks indexed
+        self.tip    = "GENESIS"   # hash of the last indexed block
+        self.end    = 0           # JSONL byte offset just past the last indexed block
+        self.spans: List[Tuple[int, int]] = []   # JSONL byte span per block
+        self.files: List[Optional[str]] = []     # file_id per block, for joins
+        self.hashes: List[str] = []              # block hash per position (Merkle leaves)
+        self.postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in INDEXED_FIELDS}
+
+    def add(self, block: Dict[str, Any], span: Tuple[int, int] | None = None):
+        # Index the next block in ledger order
+        pos = self.height
+        ev = block.get("event", {})
+        for field in INDEXED_FIELDS:
+            value = ev.get(field)
+            if isinstance(value, str):
+                self.postings[field].setdefault(value, []).append(pos)
+        fid = ev.get("file_id")
+        self.files.append(fid if isinstance(fid, str) else None)
+        self.hashes.append(block["hash"])
+        if span is not None:
+            self.spans.append(tuple(span))
+            self.end = span[1]
+        self.height = pos + 1
+        self.tip = block["hash"]
+
+    def positions(self, **fields: str) -> List[int]:
+        # Ascending positions of blocks whose event matches every given field
+        lists = [self.postings[f].get(v, []) for f, v in fields.items()]
+        if not lists:
+            return list(range(self.height))
+        lists.sort(key=len)
+        out = lists[0]
+        for other in lists[1:]:
+            out = [p for p in out if _contains(other, p)]
+        return list(out)
+
+    def first(self, **fields: str) -> Optional[int]:
+        # Position of the earliest matching block
+        hits = self.positions(**fields)
+        return hits[0] if hits else None
+
+    def latest(self, **fields: str) -> Optional[int]:
+        # Position of the most recent matching block
+        if len(fields) == 1:
+            (f, v), = fields.items()
+            hits = self.postings[f].get(v)
+            return hits[-1] if hits else None
+        hits = self.positions(**fields)
+        return hits[-1] if hits else None
+
+    def owner_request_positions(self, owner_id: str) -> List[int]:
+        # ACCESS_REQUESTs targeting any file this owner uploaded
+        owned = {self.files[p] for p in self.positions(type="UPLOAD", owner_id=owner_id)}
+        out = []
+        for fid in owned:
+            out.extend(self.positions(type="ACCESS_REQUEST", file_id=fid))
+        return sorted(out)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "height": self.height,
+            "tip": self.tip,
+            "end": self.end,
+            "spans": self.spans,
+            "files": self.files,
+            "hashes": self.hashes,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["EventIndex"]:
+        # Rebuild from a persisted sidecar; None if it is from another version
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        idx = cls()
+        idx.height   = data["height"]
+        idx.tip      = data["tip"]
+        idx.end      = data["end"]
+        idx.spans    = [tuple(s) for s in data["spans"]]
+        idx.files    = data["files"]
+        idx.hashes   = data["hashes"]
+        idx.postings = {f: data["postings"].get(f, {}) for f in INDEXED_FIELDS}
+        return idx
+
+def _contains(sorted_list: List[int], value: int) -> bool:
+    # Membership test on an ascending postings list
+    i = bisect_left(sorted_list, value)
+    return i < len(sorted_list) and sorted_list[i] == value
@@ -1,60 +1,410 @@
-import hashlib
-from typing import Dict, Any, List
+import os
+import threading
+import time
+from itertools import islice
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
-from filelock import FileLock
-from config.settings import LEDGER_DIR
-from src.util.time import now_ts
-from src.util.jsonio import read_json, write_json
+from filelock import FileLock, Timeout
+from config.settings import (
+    LEDGER_DIR, LEDGER_FORMAT, LEDGER_GROUP_COMMIT_MS, LEDGER_SEGMENT_BLOCKS, LEDGER_SEGMENT_BYTES
+)
+from src.util.jsonio import read_json, write_json, write_json_atomic
+from src.blockchain.base import follow
+from src.blockchain.blocks import GENESIS, hash_block as _hash_block, make_block, encode_line, first_bad_block
+from src.blockchain.index import EventIndex
+from src.blockchain.segments import JsonlLog
+from src.blockchain.parallel_verify import first_invalid_jsonl, first_invalid_json
+from src.core.merkle import MerkleTree, verify_proof as _verify_merkle_proof
 
-LEDGER_FILE = LEDGER_DIR / "ledger.json"
+LEDGER_FILE = LEDGER_DIR / ("ledger.jsonl" if LEDGER_FORMAT == "jsonl" else "ledger.json")
 LOCK_FILE   = LEDGER_DIR / "ledger.lock"
 
-def _hash_block(block: Dict[str, Any]) -> str:
-    # Compute SHA-256 hash of a block
-    import json
-    payload = {
-        "ts": block["ts"],
-        "prev": block["prev"],
-        "event": block["event"],
-    }
-    data = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
-    return hashlib.sha256(data).hexdigest()
+JSONL_SUFFIX = ".jsonl"
+INDEX_SAVE_EVERY = 256  # persist the index sidecar after at least this many newly indexed blocks
+INDEX_SAVE_GROWTH = 8   # ... and at least 1/8 of its size, so rewrites stay amortized O(n)
+
+def migrate_json_to_jsonl(src: Path, dst: Path) -> int:
+    # One-shot conversion of a legacy ledger.json array into JSONL
+    chain = read_json(src, default=[])
+    tmp = Path(dst).with_suffix(".jsonl.tmp")
+    with tmp.open("wb") as f:
+        for block in chain:
+            f.write(encode_line(block))
+    os.replace(tmp, dst)
+    return len(chain)
+
+class _GroupCommitter:
+    """
+    Coalesces append_event calls from concurrent threads into one append_events
+    call. The first caller of a round becomes the leader: it waits `window`
+    seconds for others to join, commits the whole batch, and hands each caller
+    its own block hash (or the commit error).
+    """
+    def __init__(self, chain: "LocalChain", window: float):
+        self.chain   = chain
+        self.window  = window
+        self.cond    = threading.Condition()
+        self.pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        self.leading = False
+
+    def submit(self, event: Dict[str, Any]) -> str:
+        slot: Dict[str, Any] = {"done": False}
+        with self.cond:
+            self.pending.append((event, slot))
+            lead = not self.leading
+            self.leading = True
+        if lead:
+            self._lead()
+        with self.cond:
+            while not slot["done"]:
+                self.cond.wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["hash"]
+
+    def _lead(self):
+        # Commit rounds until no caller is left waiting
+        while True:
+            time.sleep(self.window)
+            with self.cond:
+                batch, self.pending = self.pending, []
+            try:
+                hashes = self.chain.append_events([e for e, _ in batch])
+                results = [{"hash": h} for h in hashes]
+            except Exception as exc:
+                results = [{"error": exc}] * len(batch)
+            with self.cond:
+                for (_, slot), res in zip(batch, results):
+                    slot.update(res, done=True)
+                self.cond.notify_all()
+                if not self.pending:
+                    self.leading = False
+                    return
 
 class LocalChain:
-    def __init__(self, ledger_path: Path = LEDGER_FILE, lock_path: Path = LOCK_FILE):
+    def __init__(self, ledger_path: Path = LEDGER_FILE, lock_path: Path = LOCK_FILE,
+                 group_commit_ms: float = LEDGER_GROUP_COMMIT_MS,
+                 segment_max_blocks: int = LEDGER_SEGMENT_BLOCKS,
+                 segment_max_bytes: int = LEDGER_SEGMENT_BYTES):
         self.ledger_path = Path(ledger_path)
         self.lock_path   = Path(lock_path)
+        # ".jsonl" ledgers are append-only; anything else is the legacy JSON array
+        self.jsonl       = self.ledger_path.suffix == JSONL_SUFFIX
+        # JSONL storage, rolled over into sealed segments when a threshold is set
+        self._log = JsonlLog(self.ledger_path, segment_max_blocks, segment_max_bytes) if self.jsonl else None
+        # Sidecar recording the last block a verification trusted
+        self.checkpoint_path = self.ledger_path.with_name(self.ledger_path.name + ".checkpoint.json")
+        # Persisted secondary indexes (see src/blockchain/index.py)
+        self.index_path = self.ledger_path.with_name(self.ledger_path.name + ".index.json")
+        self._index: Optional[EventIndex] = None
+        self._index_saved_height = 0
+        # Parsed JSON-array ledger and the file version it was read from
+        self._json_cache: Tuple[Optional[tuple], List[Dict[str, Any]]] = (None, [])
+        # Merkle tree over block hashes, extended from the index as it grows
+        self._merkle: Optional[MerkleTree] = None
+        self._merkle_index: Optional[EventIndex] = None
+        # Guards the in-memory index, parse cache and Merkle tree when threads share this instance
+        self._state_lock = threading.RLock()
+        # Optional group commit: coalesces appends from threads sharing this instance
+        # (make_chain() hands out one per process); other processes only serialize on the lock
+        self._committer = _GroupCommitter(self, group_commit_ms / 1000) if group_commit_ms > 0 else None
         self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
         if not self.ledger_path.exists():
+            with FileLock(str(self.lock_path)):
+                if not self.ledger_path.exists():
+                    self._create()
+
+    def _create(self):
+        # Initialise an empty ledger, migrating a sibling ledger.json if present
+        if not self.jsonl:
             write_json(self.ledger_path, [])
+            return
+        legacy = self.ledger_path.with_suffix(".json")
+        if self._log.seals():
+            self._log.recover()
+        elif legacy.exists():
+            migrate_json_to_jsonl(legacy, self.ledger_path)
+        else:
+            self.ledger_path.touch()
 
     def append_event(self, event: Dict[str, Any]) -> str:
         # Add an event to the ledger with file locking
+        if self._committer is not None:
+            return self._committer.submit(event)
+        return self.append_events([event])[0]
+
+    def append_events(self, events: List[Dict[str, Any]]) -> List[str]:
+        # Chain several events under one lock and make them durable with one write
+        if not events:
+            return []
         with FileLock(str(self.lock_path)):
-            chain = read_json(self.ledger_path, default=[])
-            prev_hash = chain[-1]["hash"] if chain else "GENESIS"
-            block = {
-                "ts": now_ts(),
-                "prev": prev_hash,
-                "event": event,
-            }
-            block["hash"] = _hash_block(block)
-            chain.append(block)
-            write_json(self.ledger_path, chain)
-            return block["hash"]
+            if self.jsonl:
+                self._log.recover()
+                prev_hash = self._log.tail_hash()
+            else:
+                chain = self._json_chain()
+                prev_hash = chain[-1]["hash"] if chain else GENESIS
+            first_prev = prev_hash
+
+            blocks = []
+            for event in events:
+                block = make_block(event, prev_hash)
+                blocks.append(block)
+                prev_hash = block["hash"]
+
+            spans: List[Optional[Tuple[int, int]]] = [None] * len(blocks)
+            if self.jsonl:
+                spans = self._log.append([encode_line(b) for b in blocks])
+            else:
+                chain = chain + blocks
+                write_json(self.ledger_path, chain)
+                self._json_cache = (self._json_version(), chain)
+
+            with self._state_lock:
+                if self._index is not None and self._index.tip == first_prev:
+                    for block, span in zip(blocks, spans):
+                        self._index.add(block, span)
+                    if self.jsonl and self._index_save_due():
+                        self.save_index()
+            return [b["hash"] for b in blocks]
 
     def get_events(self) -> List[Dict[str, Any]]:
         # Return all events from the ledger
+        if self.jsonl:
+            return [b for _, _, b in self._log.iter_blocks()]
         return read_json(self.ledger_path, default=[])
 
-    def verify_chain(self) -> bool:
-        # Verify integrity of the chain
-        chain = self.get_events()
-        prev = "GENESIS"
-        for b in chain:
-            if b.get("prev") != prev:
-                return False
-            if _hash_block(b) != b.get("hash"):
+    def _json_version(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.ledger_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _json_chain(self) -> List[Dict[str, Any]]:
+        # Parsed JSON-array ledger, re-read only when the file changes, so the index,
+        # queries and cursors share one parse per ledger version. Blocks are shared:
+        # callers must not modify them (get_events() returns a private copy).
+        version = self._json_version()
+        cached_version, chain = self._json_cache
+        if version is None or version != cached_version:
+            chain = read_json(self.ledger_path, default=[])
+            self._json_cache = (version, chain)
+        return chain
+
+    def height(self) -> int:
+        # Number of blocks in the ledger
+        return self._sync_index().height
+
+    def get_events_since(self, height: int) -> List[Dict[str, Any]]:
+        # Blocks at positions >= height, reading only the new tail of a JSONL ledger.
+        # JSON ledgers are parsed in full, but at most once per change: height() and
+        # repeated polls of an unchanged ledger reuse the same parse.
+        if not self.jsonl:
+            return self._json_chain()[max(height, 0):]
+        idx = self._sync_index()
+        if height >= idx.height:
+            return []
+        blocks = self._log.iter_blocks(idx.spans[max(height, 0)][0])
+        return [b for _, _, b in islice(blocks, idx.height - max(height, 0))]
+
+    def follow(self, height: int = 0, poll_interval: float = 0.5, stop=None):
+        # Generator over new blocks as they are appended (see base.follow)
+        return follow(self, height, poll_interval, stop)
+
+    # ---------- secondary indexes ----------
+    def _load_index(self) -> Optional[EventIndex]:
+        # Load the persisted index sidecar, ignoring a missing or corrupt file
+        try:
+            return EventIndex.from_dict(read_json(self.index_path, default=None))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _index_save_due(self) -> bool:
+        unsaved = self._index.height - self._index_saved_height
+        return unsaved >= max(INDEX_SAVE_EVERY, self._index.height // INDEX_SAVE_GROWTH)
+
+    def _try_locked(self, fn) -> bool:
+        # Run fn under the ledger lock if it is free right now; read paths use this to
+        # persist sidecars opportunistically without waiting on (or racing) writers
+        try:
+            with FileLock(str(self.lock_path), timeout=0):
+                fn()
+            return True
+        except Timeout:
+            return False
+
+    def save_index(self):
+        # Persist the in-memory index so the next startup only catches up
+        if self._index is not None:
+            write_json_atomic(self.index_path, self._index.to_dict())
+            self._index_saved_height = self._index.height
+
+    def _sync_index(self) -> EventIndex:
+        # Bring the index up to date with blocks appended (by anyone) since it was built.
+        # Only JSONL ledgers persist it: a JSON ledger is parsed in full anyway, and
+        # indexing the parsed blocks costs less than reading a sidecar.
+        with self._state_lock:
+            if self._index is None:
+                self._index = (self._load_index() if self.jsonl else None) or EventIndex()
+                self._index_saved_height = self._index.height
+            idx, rebuilt = self._index, False
+            if self.jsonl:
+                if idx.height:
+                    last = self._log.read_block(*idx.spans[-1])
+                    if last is None or last.get("hash") != idx.tip:
+                        idx, rebuilt = EventIndex(), True
+                for start, end, b in self._log.iter_blocks(idx.end):
+                    idx.add(b, (start, end))
+            else:
+                chain = self._json_chain()
+                if len(chain) < idx.height or (idx.height and chain[idx.height - 1].get("hash") != idx.tip):
+                    idx, rebuilt = EventIndex(), True
+                for b in chain[idx.height:]:
+                    idx.add(b)
+            self._index = idx
+            if rebuilt:
+                self._index_saved_height = 0
+            if self.jsonl and (rebuilt or self._index_save_due()):
+                self._try_locked(self.save_index)
+            return idx
+
+    def rebuild_index(self) -> EventIndex:
+        # Discard the index and rebuild it from the ledger
+        self._index = EventIndex()
+        self._index_saved_height = 0
+        idx = self._sync_index()
+        if self.jsonl:
+            with FileLock(str(self.lock_path)):
+                self.save_index()
+        return idx
+
+    @property
+    def index(self) -> EventIndex:
+        return self._sync_index()
+
+    def _blocks_at(self, positions: List[int]) -> List[Dict[str, Any]]:
+        # Fetch blocks by position, seeking directly to them in JSONL ledgers
+        if self.jsonl:
+            spans = self._index.spans
+            return [self._log.read_block(*spans[p]) for p in positions]
+        chain = self._json_chain()
+        return [chain[p] for p in positions]
+
+    def block_at(self, position: int) -> Dict[str, Any]:
+        # Block at a ledger position (0-based)
+        self._sync_index()
+        return self._blocks_at([position])[0]
+
+    # ---------- Merkle tree ----------
+    def _merkle_tree(self) -> MerkleTree:
+        # Catch the tree up with the index, rebuilding it if the index was rebuilt
+        with self._state_lock:
+            idx = self._sync_index()
+            if self._merkle is None or self._merkle_index is not idx:
+                self._merkle, self._merkle_index = MerkleTree(), idx
+            for h in idx.hashes[self._merkle.size:]:
+                self._merkle.append(bytes.fromhex(h))
+            return self._merkle
+
+    def merkle_root(self, size: Optional[int] = None) -> str:
+        # Hex Merkle root over block hashes (optionally of the first `size` blocks)
+        return self._merkle_tree().root(size).hex()
+
+    def prove(self, index: int, size: Optional[int] = None) -> Dict[str, Any]:
+        # Inclusion proof for block `index` against the root at `size` blocks
+        proof = self._merkle_tree().prove(index, size)
+        proof["leaf"] = self._index.hashes[index]
+        return proof
+
+    @staticmethod
+    def verify_proof(block_hash: str, proof: Dict[str, Any], root: str) -> bool:
+        # Check a proof from prove() without access to the ledger
+        return _verify_merkle_proof(bytes.fromhex(block_hash), proof, bytes.fromhex(root))
+
+    def find_events(self, **fields: str) -> List[Dict[str, Any]]:
+        # Blocks whose event matches all given fields, in ledger order
+        return self._blocks_at(self.index.positions(**fields))
+
+    def first_event(self, **fields: str) -> Optional[Dict[str, Any]]:
+        # Event payload of the earliest matching block
+        pos = self.index.first(**fields)
+        return None if pos is None else self._blocks_at([pos])[0]["event"]
+
+    def latest_event(self, **fields: str) -> Optional[Dict[str, Any]]:
+        # Event payload of the most recent matching block
+        pos = self.index.latest(**fields)
+        return None if pos is None else self._blocks_at([pos])[0]["event"]
+
+    def requests_for_owner(self, owner_id: str) -> List[Dict[str, Any]]:
+        # ACCESS_REQUEST blocks for files uploaded by owner_id
+        return self._blocks_at(self.index.owner_request_positions(owner_id))
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        # Read the verified-height checkpoint, ignoring a missing or corrupt sidecar
+        try:
+            cp = read_json(self.checkpoint_path, default=None)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cp, dict) or not isinstance(cp.get("height"), int) or cp["height"] <= 0:
+            return None
+        return cp
+
+    def _save_checkpoint(self, height: int, block_hash: str, start: int = 0, end: int = 0):
+        # Persist the height/hash (and JSONL byte span) of the last verified block.
+        # Skipped if a writer holds the ledger lock; the next verify saves it.
+        self._try_locked(lambda: write_json_atomic(self.checkpoint_path, {
+            "height": height, "hash": block_hash, "start": start, "end": end,
+        }))
+
+    def _verify_jsonl(self, cp: Optional[Dict[str, Any]], full: bool) -> bool:
+        # Verify a JSONL ledger, resuming after the checkpoint block (or, failing
+        # that, after the sealed segments) unless a full check is requested
+        if not cp and self._log.verify_seals() is not None:
+            return False
+        height, prev, pos = 0, GENESIS, 0
+        last_span = (0, 0)
+        if cp:
+            block = self._log.read_block(cp.get("start", 0), cp.get("end", 0))
+            if block is None or block.get("hash") != cp["hash"] or _hash_block(block) != cp["hash"]:
+                return self._verify_jsonl(None, full)
+            height, prev, pos = cp["height"], cp["hash"], cp["end"]
+            last_span = (cp["start"], cp["end"])
+        elif not full:
+            # Sealed segments were verified when sealed and their digests still match
+            pos, height, prev = self._log.sealed_end()
+        for start, end, b in self._log.iter_blocks(pos):
+            if first_bad_block([b], prev) is not None:
                 return False
-            prev = b["hash"]
+            height, prev, last_span = height + 1, b["hash"], (start, end)
+        if height and last_span != (0, 0) and (not cp or height != cp["height"]):
+            self._save_checkpoint(height, prev, *last_span)
         return True
+
+    def verify_chain(self, full: bool = False) -> bool:
+        # Verify integrity of the chain; only blocks after the checkpoint unless full
+        cp = None if full else self._load_checkpoint()
+        if self.jsonl:
+            return self._verify_jsonl(cp, full)
+
+        chain = self.get_events()
+        height, prev = 0, GENESIS
+        if cp and cp["height"] <= len(chain):
+            block = chain[cp["height"] - 1]
+            if block.get("hash") == cp["hash"] and _hash_block(block) == cp["hash"]:
+                height, prev = cp["height"], cp["hash"]
+        if first_bad_block(chain[height:], prev) is not None:
+            return False
+        if chain and (not cp or len(chain) != cp["height"]):
+            self._save_checkpoint(len(chain), chain[-1]["hash"])
+        return True
+
+    def find_first_invalid(self, workers: Optional[int] = None) -> Optional[int]:
+        # Full re-verification across a process pool; index of the first bad block or None
+        if self.jsonl:
+            bad = first_invalid_jsonl(self._log.files(), workers)
+            if bad is None and self._log.verify_seals() is not None:
+                # Blocks are intact but a seal record no longer matches its segment
+                return self._log.seals()[self._log.verify_seals()]["first_index"]
+            return bad
+        return first_invalid_json(self.ledger_path, workers)
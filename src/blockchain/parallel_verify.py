@@ -0,0 +1,172 @@
+"""
+Multi-core full-chain verification.
+
+Recomputing each block's hash is independent work, so the ledger file is
+split into byte ranges on block boundaries (lines of a JSONL file, or
+top-level elements of the indented JSON array that write_json produces) and
+each worker process reads and parses its own range. Workers check hashes and
+the linkage inside their range and send back only a small summary; the parent
+then checks the links between ranges and reports the first bad block index.
+Nothing block-sized crosses the process boundary, and ledgers too small to
+benefit are checked in-process.
+"""
+
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from src.blockchain.blocks import GENESIS, hash_block
+from src.util.jsonio import read_json
+
+# (blocks in range, prev of its first block, hash of its last block, first bad local index)
+Summary = Tuple[int, Optional[str], Optional[str], Optional[int]]
+
+MIN_PARALLEL_BYTES = 4 << 20  # smaller ledgers are verified in-process
+RANGE_BYTES = 8 << 20         # upper bound on the bytes a single task reads
+_SCAN_BLOCK = 1 << 16
+_JSON_ITEM = b"\n  {\n"       # start of a top-level element in write_json(indent=2) output
+
+def _check_blocks(blocks: List[Any]) -> Summary:
+    # Hash and link-check a run of consecutive blocks (dicts or raw JSON lines)
+    bad, first_prev, last = None, None, None
+    for i, b in enumerate(blocks):
+        try:
+            if isinstance(b, bytes):
+                b = json.loads(b)
+            prev, h = b.get("prev"), b.get("hash")
+            ok = hash_block(b) == h
+        except (ValueError, KeyError, TypeError, AttributeError):
+            prev, h, ok = None, None, False
+        if i == 0:
+            first_prev = prev
+        elif prev != last:
+            ok = False
+        if not ok and bad is None:
+            bad = i
+        last = h
+    return len(blocks), first_prev, last, bad
+
+def _read(path: str, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+def _check_range(path: str, start: int, end: int) -> Summary:
+    # Worker: hash the complete lines stored in bytes [start, end) of a JSONL file
+    data = _read(path, start, end)
+    cut = data.rfind(b"\n")
+    return _check_blocks(data[:cut + 1].splitlines() if cut >= 0 else [])
+
+def _check_json_range(path: str, start: int, end: int) -> Summary:
+    # Worker: parse and hash the top-level array elements stored in bytes [start, end)
+    data = _read(path, start, end).rstrip()
+    if data.endswith(b","):
+        data = data[:-1]
+    return _check_blocks(json.loads(b"[" + data + b"]"))
+
+def _link_pass(results: List[Summary]) -> Optional[int]:
+    # Check the links between consecutive ranges, returning the first bad index
+    prev, base = GENESIS, 0
+    for n, first_prev, last, bad in results:
+        if not n:
+            continue
+        if first_prev != prev:
+            return base
+        if bad is not None:
+            return base + bad
+        prev, base = last, base + n
+    return None
+
+def _parts(size: int, workers: int) -> int:
+    # A couple of ranges per worker for balance, and none larger than RANGE_BYTES
+    return max(workers * 2, size // RANGE_BYTES + 1)
+
+def _split_file(path: Path, parts: int) -> List[Tuple[str, int, int]]:
+    # Cut a JSONL file into roughly equal byte ranges on line boundaries
+    size = path.stat().st_size if path.exists() else 0
+    if not size:
+        return []
+    step = max(size // parts, 1)
+    ranges, start = [], 0
+    with path.open("rb") as f:
+        while start < size:
+            f.seek(min(start + step, size))
+            if f.tell() < size:
+                f.readline()
+            end = min(f.tell(), size)
+            ranges.append((str(path), start, end))
+            start = end
+    return ranges
+
+def _next_item(f, offset: int, limit: int) -> int:
+    # Offset of the first top-level array element starting after offset (or limit)
+    f.seek(offset)
+    buf, base = b"", offset
+    while base + len(buf) < limit:
+        buf += f.read(_SCAN_BLOCK)
+        i = buf.find(_JSON_ITEM)
+        if i >= 0:
+            return min(base + i + 1, limit)
+        keep = len(_JSON_ITEM) - 1
+        base, buf = base + len(buf) - keep, buf[-keep:]
+    return limit
+
+def _split_json_array(path: Path, parts: int) -> Optional[List[Tuple[str, int, int]]]:
+    # Byte ranges of whole top-level elements, or None if the file is not in write_json's layout
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        head = f.read(len(_JSON_ITEM) + 1)
+        if head.strip() == b"[]":
+            return []
+        f.seek(max(size - 16, 0))
+        tail = f.read()
+        if not head.startswith(b"[" + _JSON_ITEM) or not tail.rstrip().endswith(b"}\n]"):
+            return None
+        end = size - len(tail) + tail.rfind(b"\n]")
+        bounds = [2]
+        for k in range(1, parts):
+            pos = _next_item(f, max(k * size // parts, bounds[-1] + 1), end)
+            if pos > bounds[-1] and pos < end:
+                bounds.append(pos)
+    bounds.append(end)
+    return [(str(path), a, b) for a, b in zip(bounds, bounds[1:])]
+
+def _run(fn, tasks: List[tuple], workers: int, total_bytes: int) -> List[Summary]:
+    # Execute tasks in order, in a process pool when there is enough work to repay it
+    workers = min(workers, os.cpu_count() or 1)  # extra processes only contend for the same cores
+    if workers <= 1 or len(tasks) <= 1 or total_bytes < MIN_PARALLEL_BYTES:
+        return [fn(*t) for t in tasks]
+    # spawn: the GUI calls this from the Tk process, whose state workers must not inherit
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ctx) as pool:
+        return list(pool.map(fn, *zip(*tasks)))
+
+def first_invalid_jsonl(files: List[Tuple[int, Path]], workers: Optional[int] = None) -> Optional[int]:
+    # First bad block index across JSONL segment files (in ledger order)
+    workers = workers or os.cpu_count() or 1
+    paths = [Path(p) for _, p in files if Path(p).exists()]
+    total = sum(p.stat().st_size for p in paths)
+    tasks: List[tuple] = []
+    for path in paths:
+        tasks.extend(_split_file(path, max(_parts(total, workers) * path.stat().st_size // max(total, 1), 1)))
+    return _link_pass(_run(_check_range, tasks, workers, total))
+
+def first_invalid_json(path: Path, workers: Optional[int] = None) -> Optional[int]:
+    # First bad block index in a JSON-array ledger, parsed slice by slice in the workers
+    workers = workers or os.cpu_count() or 1
+    path = Path(path)
+    size = path.stat().st_size if path.exists() else 0
+    tasks = _split_json_array(path, _parts(size, workers)) if size else []
+    if tasks is not None:
+        try:
+            return _link_pass(_run(_check_json_range, tasks, workers, size))
+        except ValueError:
+            pass  # a slice did not parse on its own; let the whole-file parse decide
+    return first_invalid_blocks(read_json(path, default=[]))
+
+def first_invalid_blocks(blocks: List[Dict[str, Any]], workers: Optional[int] = None) -> Optional[int]:
+    # First bad block index in an in-memory list of blocks. Checked in-process:
+    # the blocks are already parsed, and shipping them to workers costs more than hashing.
+    return _link_pass([_check_blocks(blocks)])
@@ -0,0 +1,243 @@
+"""
+Append-only JSONL block log with optional segmentation.
+
+The active tail lives at the ledger path (e.g. ledger.jsonl). When a block or
+byte threshold is reached, the tail is verified and sealed: it moves to
+<ledger>.segments/NNNNNN.jsonl, becomes read-only, and manifest.json records
+its first/last hash, block range, byte range and SHA-256 digest. Only the
+active tail is ever appended to.
+
+Offsets are global: a block's span is its position in the concatenation of
+all sealed segments followed by the active tail, so indexes and checkpoints
+stay valid across rollovers.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import stat
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.blockchain.blocks import GENESIS, first_bad_block
+from src.util.jsonio import read_json, write_json_atomic
+
+_TAIL_CHUNK = 4096
+
+def _read_tail_line(path: Path) -> Optional[bytes]:
+    # Return the last complete line of a JSONL file, dropping a torn tail
+    with path.open("r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos, buf = end, b""
+        while pos > 0:
+            step = min(_TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            # Need at least one newline before the last line (or reach file start)
+            if buf.count(b"\n") >= 2 or (buf.endswith(b"\n") and pos == 0):
+                break
+        if buf and not buf.endswith(b"\n"):
+            # An interrupted append left a partial line; discard it
+            cut = buf.rfind(b"\n")
+            f.truncate(pos + cut + 1 if cut >= 0 else 0)
+            buf = buf[:cut + 1] if cut >= 0 else b""
+        lines = buf.rstrip(b"\n").rsplit(b"\n", 1)
+        return lines[-1] if lines[-1] else None
+
+def _iter_file(path: Path, base: int, start: int) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    # Yield (global_start, global_end, block) for complete lines at or after start
+    if not path.exists():
+        return
+    with path.open("rb") as f:
+        pos = max(start - base, 0)
+        f.seek(pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield base + pos, base + pos + len(line), json.loads(line)
+            pos += len(line)
+
+def file_digest(path: Path) -> str:
+    # SHA-256 of a file, hashed straight from the page cache via mmap
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256(b"").hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+class JsonlLog:
+    def __init__(self, path: Path, max_blocks: int = 0, max_bytes: int = 0):
+        self.path = Path(path)
+        self.max_blocks = max_blocks
+        self.max_bytes  = max_bytes
+        self.segments_dir  = self.path.with_name(self.path.name + ".segments")
+        self.manifest_path = self.segments_dir / "manifest.json"
+        # (inode, size, blocks) of the active tail, so counting stays incremental
+        self._active_stat: Tuple[int, int, int] = (-1, 0, 0)
+
+    # ---------- layout ----------
+    def seals(self) -> List[Dict[str, Any]]:
+        # Sealed segment records, oldest first
+        if not self.manifest_path.exists():
+            return []
+        return read_json(self.manifest_path, default={}).get("segments", [])
+
+    @staticmethod
+    def _end(seals: List[Dict[str, Any]]) -> Tuple[int, int]:
+        # (global byte offset, block height) at the end of the sealed segments
+        if not seals:
+            return 0, 0
+        last = seals[-1]
+        return last["start"] + last["bytes"], last["first_index"] + last["count"]
+
+    def _files(self, seals: List[Dict[str, Any]]) -> List[Tuple[int, Path]]:
+        # (global_start, path) for every segment plus the active tail
+        out = []
+        for s in seals:
+            p = self.segments_dir / s["file"]
+            # A seal whose file is missing is mid-rollover: its bytes are still the tail
+            if not p.exists():
+                out.append((s["start"], self.path))
+                return out
+            out.append((s["start"], p))
+        out.append((self._end(seals)[0], self.path))
+        return out
+
+    def files(self) -> List[Tuple[int, Path]]:
+        # (global_start, path) of each sealed segment and the active tail, in order
+        return self._files(self.seals())
+
+    def recover(self):
+        # Finish an interrupted rollover (call with the ledger lock held)
+        seals = self.seals()
+        if seals and not (self.segments_dir / seals[-1]["file"]).exists() and self.path.exists():
+            self._move_tail(seals[-1]["file"])
+        if not self.path.exists():
+            self.path.touch()
+
+    # ---------- reads ----------
+    def tail_hash(self) -> str:
+        # Hash of the newest block (sealed or active)
+        seals = self.seals()
+        tail = _read_tail_line(self.path) if self.path.exists() else None
+        if tail:
+            return json.loads(tail)["hash"]
+        return seals[-1]["last_hash"] if seals else GENESIS
+
+    def iter_blocks(self, start: int = 0) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        # Blocks from global offset start onward, skipping whole segments before it
+        files = self._files(self.seals())
+        first = max(bisect_right([b for b, _ in files], start) - 1, 0)
+        for base, path in files[first:]:
+            yield from _iter_file(path, base, start)
+
+    def read_block(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        # Read the single block stored at global bytes [start, end)
+        files = self._files(self.seals())
+        i = bisect_right([b for b, _ in files], start) - 1
+        if i < 0 or not files[i][1].exists():
+            return None
+        base, path = files[i]
+        with path.open("rb") as f:
+            f.seek(start - base)
+            line = f.read(end - start)
+        if len(line) != end - start or not line.endswith(b"\n"):
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+    def sealed_end(self) -> Tuple[int, int, str]:
+        # (global offset, height, last hash) covered by sealed segments
+        seals = self.seals()
+        offset, height = self._end(seals)
+        return offset, height, seals[-1]["last_hash"] if seals else GENESIS
+
+    def verify_seals(self) -> Optional[int]:
+        # Index of the first sealed segment whose digest or linkage is broken
+        prev, start, first_index = GENESIS, 0, 0
+        seals = self.seals()
+        for i, s in enumerate(seals):
+            p = self.segments_dir / s["file"]
+            if not p.exists() and i == len(seals) - 1:
+                p = self.path  # mid-rollover: still at the tail path
+            if s["first_prev"] != prev or s["start"] != start or s["first_index"] != first_index:
+                return i
+            if not p.exists() or p.stat().st_size != s["bytes"] or file_digest(p) != s["digest"]:
+                return i
+            prev, start, first_index = s["last_hash"], start + s["bytes"], first_index + s["count"]
+        return None
+
+    # ---------- writes (ledger lock held) ----------
+    def append(self, lines: List[bytes]) -> List[Tuple[int, int]]:
+        # Append encoded blocks to the tail, returning their global spans
+        base = self._end(self.seals())[0]
+        with self.path.open("ab") as f:
+            pos = base + f.tell()
+            f.write(b"".join(lines))
+        spans = []
+        for line in lines:
+            spans.append((pos, pos + len(line)))
+            pos += len(line)
+        if self.max_blocks or self.max_bytes:
+            self._maybe_seal()
+        return spans
+
+    def _active_blocks(self) -> Tuple[int, int]:
+        # (bytes, blocks) in the active tail, counting only bytes added since last call
+        st = self.path.stat()
+        ino, size, blocks = self._active_stat
+        if st.st_ino != ino or st.st_size < size:
+            size, blocks = 0, 0
+        if st.st_size > size:
+            with self.path.open("rb") as f:
+                f.seek(size)
+                blocks += f.read(st.st_size - size).count(b"\n")
+        self._active_stat = (st.st_ino, st.st_size, blocks)
+        return st.st_size, blocks
+
+    def _maybe_seal(self):
+        size, blocks = self._active_blocks()
+        if (self.max_blocks and blocks >= self.max_blocks) or (self.max_bytes and size >= self.max_bytes):
+            self.seal()
+
+    def seal(self) -> bool:
+        # Verify the active tail and roll it over into a sealed, read-only segment
+        seals = self.seals()
+        data = self.path.read_bytes()
+        if not data:
+            return False
+        blocks = [json.loads(line) for line in data.splitlines()]
+        start, first_index = self._end(seals)
+        prev = seals[-1]["last_hash"] if seals else GENESIS
+        if first_bad_block(blocks, prev) is not None:
+            # Never seal tampered history; verify_chain will report it
+            return False
+        seq = len(seals) + 1
+        record = {
+            "seq": seq,
+            "file": f"{seq:06d}.jsonl",
+            "start": start,
+            "bytes": len(data),
+            "first_index": first_index,
+            "count": len(blocks),
+            "first_prev": prev,
+            "last_hash": blocks[-1]["hash"],
+            "digest": hashlib.sha256(data).hexdigest(),
+        }
+        # Manifest first: readers treat a sealed-but-unmoved segment as the tail
+        write_json_atomic(self.manifest_path, {"segments": seals + [record]}, indent=2)
+        self._move_tail(record["file"])
+        return True
+
+    def _move_tail(self, name: str):
+        # Rename the tail into the segments directory and start a fresh one
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        dst = self.segments_dir / name
+        os.replace(self.path, dst)
+        os.chmod(dst, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        self.path.touch()
+        self._active_stat = (-1, 0, 0)
@@ -0,0 +1,202 @@
+"""
+SQLite-backed Chain.
+
+Blocks live in one table of an embedded database in WAL mode, so readers
+never block the writer and each append is a single transaction. The event
+fields the app queries on (type, file_id, owner_id, requester_id) and ts are
+stored in indexed columns. Hashing and chaining are identical to LocalChain,
+so blocks imported from a ledger.json/ledger.jsonl keep their hashes.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from config.settings import LEDGER_DIR
+from src.blockchain.base import follow
+from src.blockchain.blocks import GENESIS, hash_block, make_block, first_bad_block
+
+SQLITE_FILE = LEDGER_DIR / "ledger.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    height       INTEGER PRIMARY KEY,
+    ts           REAL NOT NULL,
+    prev         TEXT NOT NULL,
+    hash         TEXT NOT NULL,
+    type         TEXT,
+    file_id      TEXT,
+    owner_id     TEXT,
+    requester_id TEXT,
+    event        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_type      ON blocks(type);
+CREATE INDEX IF NOT EXISTS blocks_file      ON blocks(file_id, type);
+CREATE INDEX IF NOT EXISTS blocks_owner     ON blocks(owner_id, type);
+CREATE INDEX IF NOT EXISTS blocks_requester ON blocks(requester_id, type);
+CREATE INDEX IF NOT EXISTS blocks_ts        ON blocks(ts);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id     INTEGER PRIMARY KEY CHECK (id = 1),
+    height INTEGER NOT NULL,
+    hash   TEXT NOT NULL
+);
+"""
+
+_FIELDS = ("type", "file_id", "owner_id", "requester_id")
+
+def _field(ev: Dict[str, Any], name: str) -> Optional[str]:
+    value = ev.get(name)
+    return value if isinstance(value, str) else None
+
+class SqliteChain:
+    def __init__(self, db_path: Path = SQLITE_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    @staticmethod
+    def _row_to_block(row) -> Dict[str, Any]:
+        ts, prev, h, event = row
+        return {"ts": ts, "prev": prev, "event": json.loads(event), "hash": h}
+
+    def _insert(self, height: int, block: Dict[str, Any]):
+        ev = block["event"]
+        self._conn.execute(
+            "INSERT INTO blocks (height, ts, prev, hash, type, file_id, owner_id, requester_id, event) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (height, block["ts"], block["prev"], block["hash"],
+             *(_field(ev, f) for f in _FIELDS), json.dumps(ev, separators=(",", ":"))),
+        )
+
+    def append_event(self, event: Dict[str, Any]) -> str:
+        # Add an event in its own transaction
+        return self.append_events([event])[0]
+
+    def append_events(self, events: List[Dict[str, Any]]) -> List[str]:
+        # Chain several events and commit them in one transaction
+        if not events:
+            return []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT height, hash FROM blocks ORDER BY height DESC LIMIT 1").fetchone()
+                height, prev = (row[0] + 1, row[1]) if row else (0, GENESIS)
+                hashes = []
+                for event in events:
+                    block = make_block(event, prev)
+                    self._insert(height, block)
+                    prev, height = block["hash"], height + 1
+                    hashes.append(prev)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return hashes
+
+    def get_events(self) -> List[Dict[str, Any]]:
+        # Return all blocks in ledger order
+        rows = self._conn.execute("SELECT ts, prev, hash, event FROM blocks ORDER BY height")
+        return [self._row_to_block(r) for r in rows]
+
+    def height(self) -> int:
+        # Heights are contiguous from 0, so MAX is an O(log n) primary-key lookup
+        return self._conn.execute("SELECT COALESCE(MAX(height) + 1, 0) FROM blocks").fetchone()[0]
+
+    def get_events_since(self, height: int) -> List[Dict[str, Any]]:
+        # Blocks at positions >= height, straight off the primary key
+        return list(self._blocks_from(height))
+
+    def follow(self, height: int = 0, poll_interval: float = 0.5, stop=None):
+        # Generator over new blocks as they are appended (see base.follow)
+        return follow(self, height, poll_interval, stop)
+
+    # ---------- indexed queries (same API as LocalChain) ----------
+    def _select(self, fields: Dict[str, str], order: str = "ASC", limit: Optional[int] = None):
+        for f in fields:
+            if f not in _FIELDS:
+                raise ValueError(f"Unsupported query field: {f}")
+        where = " AND ".join(f"{f} = ?" for f in fields) or "1"
+        sql = f"SELECT ts, prev, hash, event FROM blocks WHERE {where} ORDER BY height {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [self._row_to_block(r) for r in self._conn.execute(sql, tuple(fields.values()))]
+
+    def find_events(self, **fields: str) -> List[Dict[str, Any]]:
+        return self._select(fields)
+
+    def first_event(self, **fields: str) -> Optional[Dict[str, Any]]:
+        rows = self._select(fields, limit=1)
+        return rows[0]["event"] if rows else None
+
+    def latest_event(self, **fields: str) -> Optional[Dict[str, Any]]:
+        rows = self._select(fields, order="DESC", limit=1)
+        return rows[0]["event"] if rows else None
+
+    def requests_for_owner(self, owner_id: str) -> List[Dict[str, Any]]:
+        # ACCESS_REQUEST blocks for files uploaded by owner_id
+        rows = self._conn.execute(
+            "SELECT r.ts, r.prev, r.hash, r.event FROM blocks r "
+            "WHERE r.type = 'ACCESS_REQUEST' AND r.file_id IN "
+            "(SELECT u.file_id FROM blocks u WHERE u.type = 'UPLOAD' AND u.owner_id = ?) "
+            "ORDER BY r.height", (owner_id,))
+        return [self._row_to_block(r) for r in rows]
+
+    # ---------- verification ----------
+    def _blocks_from(self, height: int):
+        rows = self._conn.execute(
+            "SELECT ts, prev, hash, event FROM blocks WHERE height >= ? ORDER BY height", (height,))
+        return (self._row_to_block(r) for r in rows)
+
+    def verify_chain(self, full: bool = False) -> bool:
+        # Verify integrity; only blocks after the stored checkpoint unless full
+        height, prev = 0, GENESIS
+        cp = None if full else self._conn.execute("SELECT height, hash FROM checkpoint WHERE id = 1").fetchone()
+        if cp:
+            row = self._conn.execute(
+                "SELECT ts, prev, hash, event FROM blocks WHERE height = ?", (cp[0] - 1,)).fetchone()
+            if row and row[2] == cp[1] and hash_block(self._row_to_block(row)) == cp[1]:
+                height, prev = cp
+        count = 0
+        for b in self._blocks_from(height):
+            if first_bad_block([b], prev) is not None:
+                return False
+            prev, count = b["hash"], count + 1
+        if count:
+            self._conn.execute(
+                "INSERT INTO checkpoint (id, height, hash) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET height = excluded.height, hash = excluded.hash",
+                (height + count, prev))
+        return True
+
+    def find_first_invalid(self, workers: Optional[int] = None) -> Optional[int]:
+        # Index of the first bad block (sequential; SQLite reads are not the bottleneck)
+        return first_bad_block(self._blocks_from(0))
+
+def import_ledger(chain: SqliteChain, src: Path) -> int:
+    # Copy blocks from a ledger.json / ledger.jsonl into an empty SqliteChain, hashes intact
+    from src.blockchain.local_chain import LocalChain
+    blocks = LocalChain(ledger_path=src, lock_path=Path(src).with_name("ledger.lock")).get_events()
+    bad = first_bad_block(blocks)
+    if bad is not None:
+        raise ValueError(f"Source ledger is invalid at block {bad}")
+    with chain._lock:
+        chain._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if chain._conn.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]:
+                raise ValueError("Destination ledger is not empty")
+            for height, block in enumerate(blocks):
+                chain._insert(height, block)
+            chain._conn.execute("COMMIT")
+        except BaseException:
+            chain._conn.execute("ROLLBACK")
+            raise
+    return len(blocks)
@@ -0,0 +1,64 @@
+"""
+Optional compress-then-encrypt stage for uploads.
+
+Text-heavy files (logs, CSV, JSON) shrink several times under zlib, while
+ciphertext never compresses, so compression has to happen before AES-GCM.
+"auto" mode compresses a small sample first and skips files that are already
+compressed (archives, media, encrypted data). The codec is recorded in the
+UPLOAD event so downloads can undo it.
+"""
+
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+CODEC_ZLIB = "zlib"
+SAMPLE_BYTES = 64 * 1024
+MIN_SAVING = 0.10  # "auto" compresses only if the sample shrinks by at least 10%
+LEVEL = 6
+MAX_OUT = 1 << 20  # largest piece decompress_stream yields
+
+def choose_codec(path: str | Path, mode: str) -> Optional[str]:
+    # Codec to use for this file under mode "off", "auto" or "zlib"
+    if mode == "off":
+        return None
+    if mode == CODEC_ZLIB:
+        return CODEC_ZLIB
+    if mode != "auto":
+        raise ValueError(f"Unknown compression mode: {mode}")
+    with open(path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+    if not sample:
+        return None
+    # Level 1 on the sample is a cheap proxy for how well the whole file compresses
+    ratio = len(zlib.compress(sample, 1)) / len(sample)
+    return CODEC_ZLIB if ratio <= 1 - MIN_SAVING else None
+
+def compress_stream(chunks: Iterable[bytes], level: int = LEVEL) -> Iterator[bytes]:
+    co = zlib.compressobj(level)
+    for chunk in chunks:
+        out = co.compress(chunk)
+        if out:
+            yield out
+    yield co.flush()
+
+def decompress_stream(chunks: Iterable[bytes], max_out: int = MAX_OUT) -> Iterator[bytes]:
+    # Inverse of compress_stream; raises ValueError if the stream is incomplete.
+    # Pieces are capped at max_out bytes, so a tiny, highly compressed input
+    # (a "zip bomb") is expanded a bounded piece at a time.
+    do = zlib.decompressobj()
+    for chunk in chunks:
+        data = chunk
+        while True:
+            out = do.decompress(data, max_out)
+            if out:
+                yield out
+            data = do.unconsumed_tail
+            # A full piece may leave output pending inside zlib even with no input left
+            if not data and (len(out) < max_out or do.eof):
+                break
+    out = do.flush()
+    if out:
+        yield out
+    if not do.eof or do.unused_data:
+        raise ValueError("Compressed stream is truncated or has trailing data")
@@ -1,15 +1,32 @@
 from dataclasses import dataclass
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import ec, rsa, padding
+from cryptography.hazmat.primitives.asymmetric import ec, rsa, padding, x25519
 from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.serialization import (
     Encoding, PrivateFormat, NoEncryption, PublicFormat, BestAvailableEncryption
 )
+from typing import BinaryIO, Iterable, Iterator, Tuple, Union
 import os
+import struct
 
 AES_KEY_BYTES = 32  # 256-bit AES key
 NONCE_BYTES   = 12  # GCM nonce length
+TAG_BYTES     = 16  # GCM tag appended to every sealed chunk
+
+# Any contiguous buffer: bytes, bytearray, or a memoryview (e.g. over an mmap'd blob).
+# Data arguments below accept these without copying.
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Ciphertext formats recorded in UPLOAD events
+FORMAT_SINGLE  = 1  # one AES-GCM message over the whole file
+FORMAT_CHUNKED = 2  # fixed-size chunks, each sealed on its own (see aes_encrypt_chunks)
+
+# Key-wrapping schemes recorded in KEY_SHARE events ("scheme"; absent = WRAP_RSA)
+WRAP_RSA    = "rsa-oaep"            # RSA-2048 OAEP, 256-byte wrapped keys
+WRAP_X25519 = "x25519-hkdf-aesgcm"  # ephemeral X25519 ECDH + HKDF-SHA256 + AES-GCM, 80-byte wrapped keys
 
 # Key generation
 def gen_ecdsa_p256():
@@ -18,6 +35,9 @@ def gen_ecdsa_p256():
 def gen_rsa():
     return rsa.generate_private_key(public_exponent=65537, key_size=2048)
 
+def gen_x25519():
+    return x25519.X25519PrivateKey.generate()
+
 # PEM (serialize/deserialize)
 def pem_priv(priv, password: bytes | None = None):
     if password:
@@ -36,28 +56,82 @@ def load_pub_pem(data: bytes):
     return serialization.load_pem_public_key(data)
 
 # AES-GCM
-def aes_encrypt(plaintext: bytes, aad: bytes = b""):
+def aes_encrypt(plaintext: Buffer, aad: Buffer = b""):
     key = os.urandom(AES_KEY_BYTES)
     nonce = os.urandom(NONCE_BYTES)
     aes = AESGCM(key)
     ct = aes.encrypt(nonce, plaintext, aad)
     return key, nonce, ct
 
-def aes_decrypt(key: bytes, nonce: bytes, ct: bytes, aad: bytes = b""):
+def aes_decrypt(key: bytes, nonce: bytes, ct: Buffer, aad: Buffer = b""):
     aes = AESGCM(key)
     return aes.decrypt(nonce, ct, aad)
 
+def aes_gcm_decryptor(key: bytes, nonce: bytes, tag: bytes):
+    # Incremental decryptor for a single-shot ciphertext whose tag is read up front.
+    # Output is unauthenticated until finalize() succeeds.
+    return Cipher(algorithms.AES(key), modes.GCM(nonce, tag)).decryptor()
+
+# Chunked AES-GCM stream
+# Chunk i is sealed under base_nonce XOR i with AAD = aad || index || final flag,
+# so swapping, dropping or appending chunks fails authentication.
+def chunk_nonce(base_nonce: bytes, index: int) -> bytes:
+    return (int.from_bytes(base_nonce, "big") ^ index).to_bytes(NONCE_BYTES, "big")
+
+def chunk_aad(index: int, final: bool, aad: Buffer = b"") -> bytes:
+    return bytes(aad) + struct.pack(">QB", index, final)
+
+def read_chunks(f: BinaryIO, size: int) -> Iterator[bytes]:
+    # Yield successive reads of `size` bytes until EOF
+    while True:
+        block = f.read(size)
+        if not block:
+            return
+        yield block
+
+def _mark_last(chunks: Iterable[Buffer]) -> Iterator[Tuple[Buffer, bool]]:
+    # Pair each chunk with an is-last flag; an empty stream is one empty last chunk
+    it = iter(chunks)
+    cur = next(it, b"")
+    for nxt in it:
+        yield cur, False
+        cur = nxt
+    yield cur, True
+
+def aes_encrypt_chunks(key: bytes, base_nonce: bytes, chunks: Iterable[Buffer], aad: Buffer = b"") -> Iterator[bytes]:
+    # Seal plaintext chunks one at a time (each output is len(chunk) + TAG_BYTES)
+    aes = AESGCM(key)
+    for i, (chunk, last) in enumerate(_mark_last(chunks)):
+        yield aes.encrypt(chunk_nonce(base_nonce, i), chunk, chunk_aad(i, last, aad))
+
+def aes_decrypt_chunks(key: bytes, base_nonce: bytes, chunks: Iterable[Buffer], aad: Buffer = b"") -> Iterator[bytes]:
+    # Open sealed chunks in order; raises InvalidTag on reordering or truncation
+    aes = AESGCM(key)
+    for i, (chunk, last) in enumerate(_mark_last(chunks)):
+        yield aes.decrypt(chunk_nonce(base_nonce, i), chunk, chunk_aad(i, last, aad))
+
+def aes_decrypt_chunk(key: bytes, base_nonce: bytes, index: int, final: bool, chunk: Buffer, aad: Buffer = b"") -> bytes:
+    # Open a single sealed chunk at a known position (random access)
+    return AESGCM(key).decrypt(chunk_nonce(base_nonce, index), chunk, chunk_aad(index, final, aad))
+
 # ECDSA (SHA-256 prehash)
-def sign_ecdsa(priv_key, message: bytes):
+def sign_ecdsa(priv_key, message: Buffer):
     h = hashes.SHA256()
     digest = hashes.Hash(h); digest.update(message); d = digest.finalize()
     return priv_key.sign(d, ec.ECDSA(Prehashed(h)))
 
-def verify_ecdsa(pub_key, message: bytes, signature: bytes):
+def verify_ecdsa(pub_key, message: Buffer, signature: bytes):
     h = hashes.SHA256()
     digest = hashes.Hash(h); digest.update(message); d = digest.finalize()
     pub_key.verify(signature, d, ec.ECDSA(Prehashed(h)))
 
+def sign_ecdsa_digest(priv_key, digest: bytes):
+    # Sign a SHA-256 digest computed incrementally; same signature as sign_ecdsa(message)
+    return priv_key.sign(digest, ec.ECDSA(Prehashed(hashes.SHA256())))
+
+def verify_ecdsa_digest(pub_key, digest: bytes, signature: bytes):
+    pub_key.verify(signature, digest, ec.ECDSA(Prehashed(hashes.SHA256())))
+
 # RSA-OAEP (SHA-256)
 def rsa_wrap(pub_key, key_bytes: bytes) -> bytes:
     return pub_key.encrypt(
@@ -70,3 +144,31 @@ def rsa_unwrap(priv_key, wrapped: bytes) -> bytes:
         wrapped,
         padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
     )
+
+# X25519 ECIES: wrapped = ephemeral public key (32) || AES-GCM(kek, key) (len(key) + 16)
+_X25519_INFO = b"secureshare key wrap v1"
+_RAW = (Encoding.Raw, PublicFormat.Raw)
+
+def _x25519_kek(shared: bytes, eph_pub: bytes, recipient_pub: bytes) -> bytes:
+    # Both public keys go into the KDF so a wrapped key is bound to its recipient
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                info=_X25519_INFO + eph_pub + recipient_pub).derive(shared)
+
+def x25519_wrap(pub_key, key_bytes: bytes) -> bytes:
+    eph = x25519.X25519PrivateKey.generate()
+    eph_pub = eph.public_key().public_bytes(*_RAW)
+    kek = _x25519_kek(eph.exchange(pub_key), eph_pub, pub_key.public_bytes(*_RAW))
+    # Each KEK is used exactly once, so a fixed nonce is safe
+    return eph_pub + AESGCM(kek).encrypt(bytes(NONCE_BYTES), key_bytes, None)
+
+def x25519_unwrap(priv_key, wrapped: bytes) -> bytes:
+    eph_pub, sealed = wrapped[:32], wrapped[32:]
+    shared = priv_key.exchange(x25519.X25519PublicKey.from_public_bytes(eph_pub))
+    kek = _x25519_kek(shared, eph_pub, priv_key.public_key().public_bytes(*_RAW))
+    return AESGCM(kek).decrypt(bytes(NONCE_BYTES), sealed, None)
+
+def wrap_key(pub_key, key_bytes: bytes) -> Tuple[str, bytes]:
+    # Wrap with whichever scheme matches the recipient key; returns (scheme, wrapped)
+    if isinstance(pub_key, x25519.X25519PublicKey):
+        return WRAP_X25519, x25519_wrap(pub_key, key_bytes)
+    return WRAP_RSA, rsa_wrap(pub_key, key_bytes)
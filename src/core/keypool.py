@@ -0,0 +1,94 @@
+"""
+Background pre-generation of user keypairs.
+
+RSA-2048 generation takes tens to hundreds of milliseconds, which used to
+happen synchronously the first time a user id was seen (often inside a Tk
+constructor). A KeyPool keeps up to `depth` keypairs of each kind being
+generated in worker processes; ensure_user_keys takes a ready one when there
+is one and falls back to generating inline otherwise. Keys cross the process
+boundary as unencrypted PKCS#8 PEM and never touch disk until a user claims
+them.
+"""
+
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterator, Optional, Tuple
+from .crypto import gen_ecdsa_p256, gen_rsa, gen_x25519, pem_priv, pem_pub
+
+KINDS = ("ecdsa", "rsa")  # pooled kinds; X25519 keygen is too cheap to be worth it
+PemPair = Tuple[bytes, bytes]  # (private PEM, public PEM)
+
+def generate_pair(kind: str) -> PemPair:
+    # Generate one keypair of the given kind (runs in worker processes)
+    priv = {"rsa": gen_rsa, "ecdsa": gen_ecdsa_p256, "x25519": gen_x25519}[kind]()
+    return pem_priv(priv), pem_pub(priv.public_key())
+
+def generate_pairs(kind: str, count: int, workers: Optional[int] = None) -> Iterator[PemPair]:
+    # Generate many keypairs across processes, yielding them as they complete in order
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        yield from pool.map(generate_pair, [kind] * count)
+
+class KeyPool:
+    def __init__(self, depth: int, workers: Optional[int] = None):
+        self.depth = depth
+        # spawn: workers must not inherit Tk or other threads' state
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._pending: Dict[str, Deque[Future]] = {k: deque() for k in KINDS}
+        self._lock = threading.Lock()
+        self._closed = False
+        for kind in KINDS:
+            self._refill(kind)
+
+    def _refill(self, kind: str):
+        with self._lock:
+            while not self._closed and len(self._pending[kind]) < self.depth:
+                self._pending[kind].append(self._executor.submit(generate_pair, kind))
+
+    def take(self, kind: str) -> Optional[PemPair]:
+        # A finished keypair, or None if none is ready yet (never blocks)
+        if kind not in self._pending or self._closed:
+            return None
+        with self._lock:
+            q = self._pending[kind]
+            fut = next((f for f in q if f.done()), None)
+            if fut is not None:
+                q.remove(fut)
+        if fut is None:
+            return None
+        self._refill(kind)
+        try:
+            return fut.result()
+        except Exception:
+            return None
+
+    def ready(self, kind: str) -> int:
+        with self._lock:
+            return sum(f.done() for f in self._pending[kind])
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_pool: Optional[KeyPool] = None
+
+def start_pool(depth: int, workers: Optional[int] = None) -> Optional[KeyPool]:
+    # Start the shared pool used by ensure_user_keys (depth 0 = disabled)
+    global _pool
+    if _pool is None and depth > 0:
+        _pool = KeyPool(depth, workers)
+    return _pool
+
+def take(kind: str) -> Optional[PemPair]:
+    # Pre-generated keypair from the shared pool, if one is running and ready
+    return _pool.take(kind) if _pool is not None else None
+
+def stop_pool():
+    # Shut the shared pool down; queued keygen is cancelled and later takes return None
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
@@ -1,10 +1,20 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
-from .crypto import (
-    gen_ecdsa_p256, gen_rsa, pem_priv, pem_pub,
-    load_priv_pem, load_pub_pem
-)
+from typing import List, Optional
+from config.settings import KEY_CACHE_SIZE
+from . import keypool
+from .crypto import pem_priv, load_priv_pem, load_pub_pem
+
+KEY_KINDS = ("ecdsa_priv", "ecdsa_pub", "rsa_priv", "rsa_pub", "x25519_priv", "x25519_pub")
+
+# Parsed keys keyed by (path, mtime_ns, size, password digest), least recently used first.
+# A rewritten key file changes mtime/size and is simply parsed again.
+_key_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_ensured: set = set()   # (keys_dir, user_id) already known to have all key files
+_cache_lock = threading.Lock()
 
 @dataclass
 class KeyPairPaths:
@@ -13,6 +23,8 @@ class KeyPairPaths:
     ecdsa_pub:  Path
     rsa_priv:   Path
     rsa_pub:    Path
+    x25519_priv: Path
+    x25519_pub:  Path
 
 def user_key_paths(keys_dir: Path, user_id: str) -> KeyPairPaths:
     # Return paths to a user's key files
@@ -22,29 +34,87 @@ def user_key_paths(keys_dir: Path, user_id: str) -> KeyPairPaths:
         ecdsa_pub =udir / "ecdsa_pub.pem",
         rsa_priv  =udir / "rsa_priv.pem",
         rsa_pub   =udir / "rsa_pub.pem",
+        x25519_priv=udir / "x25519_priv.pem",
+        x25519_pub =udir / "x25519_pub.pem",
     )
 
+def _write_pair(priv_path: Path, pub_path: Path, pair, password: Optional[bytes]):
+    # Persist a (private PEM, public PEM) pair, encrypting the private key if asked
+    priv_pem, pub_pem = pair
+    if password:
+        priv_pem = pem_priv(load_priv_pem(priv_pem), password)
+    priv_path.write_bytes(priv_pem)
+    pub_path.write_bytes(pub_pem)
+
+def _fresh_pair(kind: str):
+    # Take a pre-generated keypair from the background pool, or generate one now
+    pair = keypool.take(kind)
+    return pair if pair is not None else keypool.generate_pair(kind)
+
 def ensure_user_keys(keys_dir: Path, user_id: str, password: Optional[bytes]=None) -> KeyPairPaths:
     # Create keys for a user if they do not already exist
     paths = user_key_paths(keys_dir, user_id)
+    ck = (str(keys_dir), user_id)
+    if ck in _ensured:
+        return paths
     paths.ecdsa_priv.parent.mkdir(parents=True, exist_ok=True)
 
     if not paths.ecdsa_priv.exists():
-        ecdsa = gen_ecdsa_p256()
-        paths.ecdsa_priv.write_bytes(pem_priv(ecdsa, password))
-        paths.ecdsa_pub.write_bytes(pem_pub(ecdsa.public_key()))
+        _write_pair(paths.ecdsa_priv, paths.ecdsa_pub, _fresh_pair("ecdsa"), password)
 
     if not paths.rsa_priv.exists():
-        rsa = gen_rsa()
-        paths.rsa_priv.write_bytes(pem_priv(rsa, password))
-        paths.rsa_pub.write_bytes(pem_pub(rsa.public_key()))
+        _write_pair(paths.rsa_priv, paths.rsa_pub, _fresh_pair("rsa"), password)
 
+    if not paths.x25519_priv.exists():
+        # Also added for users created before X25519 key wrapping existed
+        _write_pair(paths.x25519_priv, paths.x25519_pub, _fresh_pair("x25519"), password)
+
+    with _cache_lock:
+        _ensured.add(ck)
     return paths
 
+def provision_users(keys_dir: Path, user_ids: List[str], workers: Optional[int] = None,
+                    password: Optional[bytes] = None) -> List[str]:
+    # Create missing keys for many users, generating RSA keys across processes.
+    # Returns the ids that needed new keys.
+    missing = [u for u in user_ids if not user_key_paths(keys_dir, u).rsa_priv.exists()]
+    rsa_pairs = keypool.generate_pairs("rsa", len(missing), workers)
+    for user_id, pair in zip(missing, rsa_pairs):
+        paths = user_key_paths(keys_dir, user_id)
+        paths.rsa_priv.parent.mkdir(parents=True, exist_ok=True)
+        _write_pair(paths.rsa_priv, paths.rsa_pub, pair, password)
+    for user_id in user_ids:
+        ensure_user_keys(keys_dir, user_id, password)  # ECDSA is cheap enough inline
+    return missing
+
+def load_user_key(paths: KeyPairPaths, kind: str, password: Optional[bytes]=None):
+    # Load one key (any of KEY_KINDS, e.g. "ecdsa_priv" or "x25519_pub"), parsing
+    # the PEM (and running the password KDF) only if the file changed since last time
+    if kind not in KEY_KINDS:
+        raise ValueError(f"Unknown key kind: {kind}")
+    path = getattr(paths, kind)
+    st = path.stat()
+    pw = hashlib.sha256(password).digest() if password else None
+    ck = (str(path), st.st_mtime_ns, st.st_size, pw)
+    with _cache_lock:
+        key = _key_cache.get(ck)
+        if key is not None:
+            _key_cache.move_to_end(ck)
+            return key
+    data = path.read_bytes()
+    key = load_priv_pem(data, password=password) if kind.endswith("_priv") else load_pub_pem(data)
+    with _cache_lock:
+        _key_cache[ck] = key
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+    return key
+
 def load_user_keys(paths: KeyPairPaths, password: Optional[bytes]=None):
-    # Load keys from disk
-    ecdsa_priv = load_priv_pem(paths.ecdsa_priv.read_bytes(), password=password)
-    ecdsa_pub  = load_pub_pem(paths.ecdsa_pub.read_bytes())
-    rsa_priv   = load_priv_pem(paths.rsa_priv.read_bytes(), password=password)
-    rsa_pub    = load_pub_pem(paths.rsa_pub.read_bytes())
-    return ecdsa_priv, ecdsa_pub, rsa_priv, rsa_pub
+    # Load (ecdsa_priv, ecdsa_pub, rsa_priv, rsa_pub) from disk (cached; prefer load_user_key when only one is needed)
+    return tuple(load_user_key(paths, kind, password) for kind in KEY_KINDS[:4])
+
+def clear_key_cache():
+    # Forget parsed keys and existence checks (e.g. after rotating or deleting key files)
+    with _cache_lock:
+        _key_cache.clear()
+        _ensured.clear()
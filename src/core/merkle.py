@@ -0,0 +1,108 @@
+"""
+Incremental SHA-256 Merkle tree with logarithmic inclusion proofs.
+
+Leaves and interior nodes are domain-separated (0x00 / 0x01 prefixes, as in
+RFC 6962). A node without a right sibling is promoted unchanged to the next
+level, so appending a leaf only touches the right edge: O(log n) per append.
+Proofs can be produced for any earlier tree size, so a root published at
+size n keeps verifying after the tree has grown.
+"""
+
+import hashlib
+from typing import Any, Dict, List, Optional
+
+def leaf_hash(data: bytes) -> bytes:
+    # update() rather than concatenation: no copy, and hashlib drops the GIL for large inputs
+    h = hashlib.sha256(b"\x00")
+    h.update(data)
+    return h.digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+class MerkleTree:
+    def __init__(self, leaves: Optional[List[bytes]] = None):
+        # levels[0] holds leaf hashes; levels[k][i] covers leaves [i*2^k, (i+1)*2^k)
+        self.levels: List[List[bytes]] = [[]]
+        for data in leaves or []:
+            self.append(data)
+
+    @property
+    def size(self) -> int:
+        return len(self.levels[0])
+
+    def append(self, data: bytes) -> int:
+        # Add a leaf and refresh the right edge of every level
+        return self.append_hash(leaf_hash(data))
+
+    def append_hash(self, h: bytes) -> int:
+        # Add a leaf whose leaf_hash was computed elsewhere (e.g. on a worker thread)
+        self.levels[0].append(h)
+        k = 0
+        while len(self.levels[k]) > 1:
+            below = self.levels[k]
+            if len(self.levels) == k + 1:
+                self.levels.append([])
+            i = (len(below) - 1) // 2
+            left = below[2 * i]
+            h = node_hash(left, below[2 * i + 1]) if 2 * i + 1 < len(below) else left
+            above = self.levels[k + 1]
+            if i < len(above):
+                above[i] = h
+            else:
+                above.append(h)
+            k += 1
+        return self.size - 1
+
+    def _node(self, level: int, idx: int, size: int) -> bytes:
+        # Hash of node (level, idx) in the tree as it was with `size` leaves
+        if (idx + 1) << level <= size:
+            return self.levels[level][idx]  # complete subtree: unchanged since
+        if level == 0:
+            return self.levels[0][idx]
+        left = self._node(level - 1, 2 * idx, size)
+        if (2 * idx + 1) << (level - 1) < size:
+            return node_hash(left, self._node(level - 1, 2 * idx + 1, size))
+        return left
+
+    def root(self, size: Optional[int] = None) -> bytes:
+        # Root of the current tree, or of its first `size` leaves
+        size = self.size if size is None else size
+        if size == 0:
+            return hashlib.sha256(b"").digest()
+        if not 0 < size <= self.size:
+            raise IndexError("tree has fewer leaves than requested")
+        level = (size - 1).bit_length()
+        return self._node(level, 0, size)
+
+    def prove(self, index: int, size: Optional[int] = None) -> Dict[str, Any]:
+        # Sibling path from leaf `index` to the root of the first `size` leaves
+        size = self.size if size is None else size
+        if not 0 <= index < size <= self.size:
+            raise IndexError("leaf index outside the tree")
+        path, i, n, level = [], index, size, 0
+        while n > 1:
+            sib = i ^ 1
+            if sib < n:
+                path.append(self._node(level, sib, size).hex())
+            i, n, level = i // 2, (n + 1) // 2, level + 1
+        return {"index": index, "size": size, "path": path}
+
+def verify_proof(data: bytes, proof: Dict[str, Any], root: bytes) -> bool:
+    # Check that `data` is leaf proof["index"] of a tree of proof["size"] leaves with this root
+    h = leaf_hash(data)
+    i, n = proof["index"], proof["size"]
+    path = [bytes.fromhex(p) for p in proof["path"]]
+    if not 0 <= i < n:
+        return False
+    it = iter(path)
+    try:
+        while n > 1:
+            if i % 2 == 1:
+                h = node_hash(next(it), h)
+            elif i + 1 < n:
+                h = node_hash(h, next(it))
+            i, n = i // 2, (n + 1) // 2
+    except StopIteration:
+        return False
+    return next(it, None) is None and h == root
@@ -0,0 +1,154 @@
+"""
+Owner-side store of per-file AES keys, so sharing never needs the key pasted.
+
+Replaces the per-owner _aes_keys.json that every upload rewrote in full:
+keys live in an embedded SQLite table (one per owner, WAL mode), so inserts
+and lookups are primary-key operations, concurrent processes serialize on
+SQLite's write lock, and bulk sharing fetches many keys in a few queries.
+Stores live under OWNER_KEYS_DIR, apart from the key directory. With
+wrapping enabled each key is stored X25519-wrapped under the owner's own key
+(see crypto.x25519_wrap), so the database can sit on a shared volume without
+exposing file keys, provided the private keys in KEYS_DIR are not on that
+volume (or are password-protected). An existing _aes_keys.json is imported
+on first open.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from config.settings import OWNER_KEYS_DIR, OWNER_KEYS_WRAP
+from src.util.jsonio import read_json
+from .crypto import WRAP_X25519, x25519_unwrap, x25519_wrap
+from .keystore import ensure_user_keys, load_user_key
+
+SCHEME_PLAIN = "plain"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aes_keys (
+    file_id TEXT PRIMARY KEY,
+    scheme  TEXT NOT NULL,
+    key     BLOB NOT NULL
+);
+"""
+
+_BATCH = 500  # ids per IN (...) query, below SQLite's variable limit
+
+log = logging.getLogger(__name__)
+
+class OwnerKeyStore:
+    def __init__(self, db_path: Path, legacy_json: Optional[Path] = None, wrap_pub=None, unwrap_priv=None,
+                 load_unwrap_priv: Optional[Callable[[], object]] = None):
+        # wrap_pub: X25519 public key to wrap new entries under (None = store them as-is);
+        # unwrap_priv: matching private key, needed to read wrapped entries, or
+        # load_unwrap_priv to load it on the first read of a wrapped entry
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.wrap_pub = wrap_pub
+        self.unwrap_priv = unwrap_priv
+        self._load_unwrap_priv = load_unwrap_priv
+        if legacy_json is not None and Path(legacy_json).exists():
+            self.import_json(legacy_json)
+
+    def close(self):
+        self._conn.close()
+
+    def _seal(self, key: bytes) -> Tuple[str, bytes]:
+        if self.wrap_pub is None:
+            return SCHEME_PLAIN, key
+        return WRAP_X25519, x25519_wrap(self.wrap_pub, key)
+
+    def _open(self, scheme: str, stored: bytes) -> bytes:
+        if scheme == SCHEME_PLAIN:
+            return bytes(stored)
+        if scheme != WRAP_X25519:
+            raise ValueError(f"Unsupported key wrapping scheme: {scheme}")
+        if self.unwrap_priv is None and self._load_unwrap_priv is not None:
+            self.unwrap_priv = self._load_unwrap_priv()
+        if self.unwrap_priv is None:
+            raise ValueError("Stored key is wrapped; owner X25519 private key needed")
+        return x25519_unwrap(self.unwrap_priv, bytes(stored))
+
+    def put(self, file_id: str, key: bytes):
+        scheme, stored = self._seal(key)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO aes_keys (file_id, scheme, key) VALUES (?, ?, ?) "
+                "ON CONFLICT(file_id) DO UPDATE SET scheme = excluded.scheme, key = excluded.key",
+                (file_id, scheme, stored))
+
+    def get(self, file_id: str) -> Optional[bytes]:
+        row = self._conn.execute("SELECT scheme, key FROM aes_keys WHERE file_id = ?", (file_id,)).fetchone()
+        return self._open(*row) if row else None
+
+    def get_many(self, file_ids: Iterable[str]) -> Dict[str, bytes]:
+        # Keys for every known id among file_ids, a few queries in total
+        ids = list(dict.fromkeys(file_ids))
+        out = {}
+        for i in range(0, len(ids), _BATCH):
+            part = ids[i:i + _BATCH]
+            rows = self._conn.execute(
+                f"SELECT file_id, scheme, key FROM aes_keys WHERE file_id IN ({','.join('?' * len(part))})", part)
+            for fid, scheme, stored in rows:
+                out[fid] = self._open(scheme, stored)
+        return out
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM aes_keys").fetchone()[0]
+
+    def import_json(self, path: Path) -> int:
+        # Merge a legacy {file_id: key hex} file (entries already present win), then retire it.
+        # A corrupt file is logged and left in place rather than failing the open.
+        path = Path(path)
+        try:
+            rows = [(fid, *self._seal(bytes.fromhex(h))) for fid, h in read_json(path, default={}).items()]
+        except (ValueError, TypeError, AttributeError) as e:
+            log.warning("Skipping unreadable legacy key file %s: %s", path, e)
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO aes_keys (file_id, scheme, key) VALUES (?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        # Another process may have migrated it already
+        try:
+            os.replace(path, path.with_name(path.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+        return len(rows)
+
+_stores: Dict[Tuple[str, str, str, bool, Optional[bytes]], OwnerKeyStore] = {}
+_stores_lock = threading.Lock()
+
+def owner_key_store(keys_dir: Path, owner_id: str, wrap: bool = OWNER_KEYS_WRAP,
+                    store_dir: Path = OWNER_KEYS_DIR, password: Optional[bytes] = None) -> OwnerKeyStore:
+    # Shared store for an owner at store_dir/<owner_id>.db, opened once per process.
+    # With wrap, new entries are wrapped under the owner's X25519 key from keys_dir
+    # (password: for a password-protected private key, loaded only once a wrapped
+    # entry is read, so unwrapped stores open without it).
+    ck = (str(keys_dir), str(store_dir), owner_id, wrap, hashlib.sha256(password).digest() if password else None)
+    with _stores_lock:
+        store = _stores.get(ck)
+        if store is None:
+            paths = ensure_user_keys(keys_dir, owner_id)
+            udir = paths.x25519_priv.parent
+            store = OwnerKeyStore(
+                Path(store_dir) / f"{owner_id}.db", legacy_json=udir / "_aes_keys.json",
+                wrap_pub=load_user_key(paths, "x25519_pub") if wrap else None,
+                # Reads can always get the private key so wrapped entries stay readable if wrapping is turned off
+                load_unwrap_priv=lambda: load_user_key(paths, "x25519_priv", password))
+            _stores[ck] = store
+        return store
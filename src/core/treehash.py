@@ -0,0 +1,47 @@
+"""
+Tree-hashed ciphertext signatures.
+
+Instead of one linear SHA-256 pass over the whole ciphertext, the owner signs
+the Merkle root (see merkle.py) over fixed-size ciphertext leaves, one leaf
+per sealed AES-GCM chunk. Leaf hashes are independent, so uploads hash them on
+a thread pool, and a downloader holding the signed leaf list can accept each
+chunk as soon as it arrives instead of waiting for the end of the file.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+from src.core.merkle import MerkleTree, leaf_hash
+
+SIG_TREE = "tree"  # UPLOAD "sig_mode" for tree-hashed signatures
+HASH_BYTES = 32
+
+def hash_leaves(chunks: Iterable[bytes], workers: Optional[int] = None) -> Iterator[Tuple[bytes, bytes]]:
+    # Yield (chunk, leaf hash) in order, hashing up to 2 * workers chunks at once
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(leaf_hash, chunk)))
+            if len(pending) >= 2 * workers:
+                chunk, fut = pending.popleft()
+                yield chunk, fut.result()
+        while pending:
+            chunk, fut = pending.popleft()
+            yield chunk, fut.result()
+
+def tree_root(leaves: List[bytes]) -> bytes:
+    # Merkle root over precomputed leaf hashes
+    tree = MerkleTree()
+    for h in leaves:
+        tree.append_hash(h)
+    return tree.root()
+
+def encode_leaves(leaves: List[bytes]) -> bytes:
+    return b"".join(leaves)
+
+def decode_leaves(data: bytes) -> List[bytes]:
+    if len(data) % HASH_BYTES:
+        raise ValueError("Leaf list is not a whole number of hashes")
+    return [data[i:i + HASH_BYTES] for i in range(0, len(data), HASH_BYTES)]
@@ -7,6 +7,8 @@ try:
 except Exception:
     HAS_BOOTSTRAP = False
 
+from config.settings import KEYPOOL_DEPTH
+from src.core import keypool
 from .pages.home import HomePage
 from .pages.owner import OwnerPage
 from .pages.requester import RequesterPage
@@ -50,10 +52,13 @@ def _init_theme(root: tk.Tk):
 
 class App(tk.Tk):
     def __init__(self):
+        # Optionally pre-generate keypairs so users registered later don't block the UI on RSA keygen
+        keypool.start_pool(KEYPOOL_DEPTH)
         super().__init__()
         self.title(APP_TITLE)
         self.geometry(APP_SIZE)
         self.minsize(900, 620)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         _init_theme(self)
 
         # Router container
@@ -73,6 +78,11 @@ class App(tk.Tk):
     def show(self, name: str):
         self.pages[name].tkraise()
 
+    def _on_close(self):
+        # Stop the keygen workers before the window goes away
+        keypool.stop_pool()
+        self.destroy()
+
 
 if __name__ == "__main__":
     App().mainloop()
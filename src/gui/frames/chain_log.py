@@ -1,8 +1,9 @@
 import json
+import threading
 import tkinter as tk
 from tkinter import ttk
 from ..widgets import Section, StatusBar
-from src.blockchain.local_chain import LocalChain
+from src.blockchain.factory import make_chain
 from src.util.time import pretty_ts
 
 class ChainLogFrame(ttk.Frame):
@@ -20,6 +21,8 @@ class ChainLogFrame(ttk.Frame):
         self.filter_var = tk.StringVar(value="")
         ttk.Entry(row, textvariable=self.filter_var, width=24).pack(side="left", padx=6)
         ttk.Button(row, text="Refresh", command=self._refresh).pack(side="left")
+        self.full_btn = ttk.Button(row, text="Full Verify", command=lambda: self._refresh(full=True))
+        self.full_btn.pack(side="left", padx=6)
 
         view = Section(self, "Events")
         view.pack(fill="both", expand=True, padx=8, pady=6)
@@ -29,17 +32,81 @@ class ChainLogFrame(ttk.Frame):
         self.status = StatusBar(self)
         self.status.pack(fill="x")
 
+        # Blocks already fetched; each refresh only pulls the delta after them
+        self.chain = make_chain()
+        self._blocks = []
+        self._shown_filter = None
+        self._verifying = None  # worker thread of a running Full Verify
+
         self._refresh()
 
-    def _refresh(self):
-        chain = LocalChain()
-        ok = chain.verify_chain()
-        evs = chain.get_events()
+    def _refresh(self, full: bool = False):
+        # Routine refreshes only verify blocks appended since the last checkpoint
+        if full:
+            self._start_full_verify()
+        else:
+            self._show(self.chain.verify_chain())
+
+    def _start_full_verify(self):
+        # Full re-verification runs across all cores and pinpoints the bad block. It can take
+        # a while on large ledgers, so it runs on a worker thread while the Tk loop polls for
+        # the result (Tk itself must only be touched from the main thread).
+        if self._verifying is not None:
+            return
+        result = {}
+
+        def work():
+            try:
+                result["bad"] = self.chain.find_first_invalid()
+            except Exception as e:
+                result["error"] = e
+
+        self._verifying = threading.Thread(target=work, daemon=True)
+        self._verifying.start()
+        self.full_btn.state(["disabled"])
+        self.status.info("Verifying every block...")
+        self.after(100, self._poll_full_verify, result)
+
+    def _poll_full_verify(self, result: dict):
+        if self._verifying.is_alive():
+            self.after(100, self._poll_full_verify, result)
+            return
+        self._verifying = None
+        self.full_btn.state(["!disabled"])
+        if "error" in result:
+            self.status.error(f"Full verification failed: {result['error']}")
+        else:
+            self._show(result["bad"] is None, result["bad"])
+
+    def _show(self, ok: bool, bad=None):
+        # Pull blocks appended since the last refresh and report the verification result
+        chain = self.chain
+        if chain.height() < len(self._blocks):
+            # Ledger was replaced or truncated; start over
+            self._blocks, self._shown_filter = [], None
+        new = chain.get_events_since(len(self._blocks))
+        self._blocks.extend(new)
         f = self.filter_var.get().strip().upper()
 
-        self.text.delete("1.0", "end")
-        self.text.insert("end", f"Chain valid: {ok}\n\n")
-        for b in evs:
+        if f != self._shown_filter:
+            self.text.delete("1.0", "end")
+            self.text.insert("end", f"Chain valid: {ok}\n\n")
+            self._render(self._blocks, f)
+            self._shown_filter = f
+        else:
+            self.text.delete("1.0", "2.0")
+            self.text.insert("1.0", f"Chain valid: {ok}\n")
+            self._render(new, f)
+
+        if ok:
+            self.status.info("Ledger verified.")
+        else:
+            where = f" First invalid block: #{bad}." if bad is not None else ""
+            self.status.error(f"Ledger integrity check failed. One or more blocks were tampered.{where}")
+
+    def _render(self, blocks, f: str):
+        # Append blocks matching the type filter to the event view
+        for b in blocks:
             ev = b.get("event", {})
             if f and ev.get("type", "").upper() != f:
                 continue
@@ -47,8 +114,3 @@ class ChainLogFrame(ttk.Frame):
             self.text.insert("end", f"[{ts}] {ev.get('type', '?')}\n")
             pretty = json.dumps(ev, indent=2)
             self.text.insert("end", f"{pretty}\n\n")
-
-        if ok:
-            self.status.info("Ledger verified.")
-        else:
-            self.status.error("Ledger integrity check failed. One or more blocks were tampered.")
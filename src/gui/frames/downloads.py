@@ -2,10 +2,10 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 from pathlib import Path
 from ..widgets import Section, LabeledEntry, StatusBar, alert_error
-from src.blockchain.local_chain import LocalChain
-from src.core.keystore import ensure_user_keys, load_user_keys
-from src.services.verifier import requester_download_and_verify
-from src.storage.cloud import get_meta
+from src.blockchain.factory import make_chain
+from src.core.keystore import ensure_user_keys, load_user_key
+from src.services.verifier import requester_download_to
+from src.storage.cloud import get_metas
 
 class DownloadsFrame(ttk.Frame):
     def __init__(self, master):
@@ -52,16 +52,16 @@ class DownloadsFrame(ttk.Frame):
     def _scan_shares(self):
         """List file_ids that have a KEY_SHARE addressed to this requester."""
         self.tv.delete(*self.tv.get_children())
-        chain = LocalChain()
-        evs = chain.get_events()
+        chain = make_chain()
         r = self.requester_id.get().strip()
-        shares = [e["event"] for e in evs if e["event"].get("type") == "KEY_SHARE" and e["event"].get("requester_id") == r]
+        shares = [e["event"] for e in chain.find_events(type="KEY_SHARE", requester_id=r)]
         # Show distinct last shares by file_id (latest wins)
         seen = {}
         for ev in shares:
             seen[ev["file_id"]] = ev
+        metas = get_metas(seen)
         for fid, ev in seen.items():
-            meta = get_meta(fid) or {}
+            meta = metas.get(fid, {})
             self.tv.insert("", "end", values=(fid, meta.get("filename", "?"), ev.get("owner_id", "?")))
         self.status.info(f"Found {len(seen)} shared file(s) for requester {r}.")
 
@@ -81,7 +81,7 @@ class DownloadsFrame(ttk.Frame):
             alert_error("Enter or select a file ID first.")
             return
 
-        chain = LocalChain()
+        chain = make_chain()
         req_id = self.requester_id.get().strip()
         own_id = self.owner_id.get().strip()
 
@@ -89,24 +89,26 @@ class DownloadsFrame(ttk.Frame):
         from config.settings import KEYS_DIR
         req_paths = ensure_user_keys(KEYS_DIR, req_id)
         own_paths = ensure_user_keys(KEYS_DIR, own_id)
-        _, _, req_rsa_priv, _ = load_user_keys(req_paths)
-        _, own_ecdsa_pub, _, _ = load_user_keys(own_paths)
+        req_rsa_priv = load_user_key(req_paths, "rsa_priv")
+        req_x25519_priv = load_user_key(req_paths, "x25519_priv")
+        own_ecdsa_pub = load_user_key(own_paths, "ecdsa_pub")
 
+        save_to = filedialog.asksaveasfilename(title="Save decrypted file as")
+        if not save_to:
+            self.status.warn("Save canceled.")
+            return
         try:
-            pt = requester_download_and_verify(
+            # Streams to a temp file next to save_to; renamed only once verified
+            requester_download_to(
                 chain=chain,
                 requester_id=req_id,
                 requester_rsa_priv=req_rsa_priv,
+                requester_x25519_priv=req_x25519_priv,
                 owner_ecdsa_pub=own_ecdsa_pub,
-                file_id=fid
+                file_id=fid,
+                dest=save_to
             )
         except Exception as e:
             alert_error(str(e))
             return
-
-        save_to = filedialog.asksaveasfilename(title="Save decrypted file as")
-        if not save_to:
-            self.status.warn("Save canceled.")
-            return
-        Path(save_to).write_bytes(pt)
         self.status.info(f"Decrypted and verified. Saved to: {save_to}")
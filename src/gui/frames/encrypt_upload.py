@@ -1,8 +1,8 @@
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog
-from src.blockchain.local_chain import LocalChain
-from src.core.keystore import ensure_user_keys, load_user_keys
+from src.blockchain.factory import make_chain
+from src.core.keystore import ensure_user_keys, load_user_key
 from src.services.uploader import encrypt_sign_upload
 from config.settings import KEYS_DIR
 from ..widgets import Section, LabeledEntry, StatusBar, alert_error
@@ -61,9 +61,9 @@ class EncryptUploadFrame(ttk.Frame):
 
         # Ensure owner keys
         kp = ensure_user_keys(KEYS_DIR, self.owner_id.get())
-        ecdsa_priv, _, _, _ = load_user_keys(kp)
+        ecdsa_priv = load_user_key(kp, "ecdsa_priv")
 
-        chain = LocalChain()
+        chain = make_chain()
         result = encrypt_sign_upload(ecdsa_priv, self.owner_id.get(), path, chain=chain)
 
         self.out.delete("1.0", "end")
@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
 from ..widgets import Section, LabeledEntry, StatusBar, alert_error
-from src.storage.cloud import list_files
-from src.blockchain.local_chain import LocalChain
+from src.storage.cloud import iter_files
+from src.blockchain.factory import make_chain
 from src.services.sharing import create_access_request
 from config.settings import KEYS_DIR
 from src.core.keystore import ensure_user_keys
@@ -49,7 +49,7 @@ class RequestsFrame(ttk.Frame):
 
     def _refresh(self):
         self.tv.delete(*self.tv.get_children())
-        for f in list_files():
+        for f in iter_files():
             self.tv.insert("", "end", values=(f["file_id"], f["filename"], f["size"]))
         self.status.info("Cloud list refreshed.")
 
@@ -67,6 +67,6 @@ class RequestsFrame(ttk.Frame):
         if not fid:
             alert_error("Pick a file from the list first.")
             return
-        chain = LocalChain()
+        chain = make_chain()
         create_access_request(chain, self.requester_id.get(), fid)
         self.status.info(f"Access request created for file {fid}.")
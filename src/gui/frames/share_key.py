@@ -1,10 +1,10 @@
 import tkinter as tk
 from tkinter import ttk
 from ..widgets import Section, LabeledEntry, StatusBar, alert_error
-from src.core.keystore import ensure_user_keys, load_user_keys
-from src.blockchain.local_chain import LocalChain
+from src.core.keystore import ensure_user_keys, load_user_key
+from src.blockchain.factory import make_chain
 from src.services.sharing import approve_and_share_key
-from config.settings import KEYS_DIR
+from config.settings import KEYS_DIR, KEY_WRAP_SCHEME
 
 _VALID_KEY_SIZES = {16, 24, 32}  # bytes
 
@@ -68,15 +68,15 @@ class ShareKeyFrame(ttk.Frame):
             return
 
         req_paths = ensure_user_keys(KEYS_DIR, self.requester_id.get())
-        _, _, _, req_rsa_pub = load_user_keys(req_paths)
+        req_pub = load_user_key(req_paths, f"{KEY_WRAP_SCHEME}_pub")
 
-        chain = LocalChain()
+        chain = make_chain()
         approve_and_share_key(
             chain=chain,
             owner_id=self.owner_id.get(),
             file_id=fid,
             requester_id=self.requester_id.get(),
-            requester_rsa_pub=req_rsa_pub,
+            requester_pub=req_pub,
             aes_key=aes_key
         )
         self.status.info("Key shared. Requester can now download and verify.")
@@ -1,14 +1,15 @@
 import os
-import json
 import tkinter as tk
 from tkinter import ttk, filedialog, simpledialog
 from pathlib import Path
 
-from src.core.keystore import ensure_user_keys, load_user_keys
-from src.blockchain.local_chain import LocalChain
+from config.settings import KEY_WRAP_SCHEME
+from src.core.keystore import ensure_user_keys, load_user_key
+from src.core.owner_keys import owner_key_store
+from src.blockchain.factory import make_chain
 from src.services.uploader import encrypt_sign_upload
-from src.services.sharing import approve_and_share_key
-from src.storage.cloud import get_meta
+from src.services.sharing import approve_and_share_keys_bulk
+from src.storage.cloud import get_metas
 from ..widgets import (
     Section, LabeledEntry, StatusBar, alert_error, ScrollableFrame, apply_treeview_style
 )
@@ -17,32 +18,12 @@ from ..widgets import (
 KEYS_DIR: Path = Path("data/keys")
 
 
-# ---------- cache AES keys so sharing never needs pasting ----------
-def _owner_aes_store(owner_id: str) -> Path:
-    p = KEYS_DIR / owner_id / "_aes_keys.json"
-    p.parent.mkdir(parents=True, exist_ok=True)
-    if not p.exists():
-        p.write_text("{}", encoding="utf-8")
-    return p
-
-def _load_owner_keys(oid: str) -> dict:
-    try:
-        return json.loads(_owner_aes_store(oid).read_text(encoding="utf-8"))
-    except Exception:
-        return {}
-
-def _save_owner_key(oid: str, fid: str, key: bytes):
-    data = _load_owner_keys(oid)
-    data[fid] = key.hex()
-    _owner_aes_store(oid).write_text(json.dumps(data, indent=2), encoding="utf-8")
-
-
 class OwnerPage(ttk.Frame):
     """
     Full-screen Owner workflow:
       - Encrypt & Upload a file
       - View pending access requests for your files
-      - Share key to a selected request (uses cached AES key; if missing, prompt once and cache)
+      - Share keys to the selected requests (uses cached AES keys; if missing, prompt once per file and cache)
     """
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -99,7 +80,8 @@ class OwnerPage(ttk.Frame):
         wrap = ttk.Frame(req); wrap.pack(fill="both", expand=True, padx=8, pady=8)
 
         cols = ("file_id", "filename", "requester_id")
-        self.tv = ttk.Treeview(wrap, columns=cols, show="headings", height=12, style="SS.Treeview")
+        self.tv = ttk.Treeview(wrap, columns=cols, show="headings", height=12, style="SS.Treeview",
+                               selectmode="extended")
         self.tv.heading("file_id", text="file_id")
         self.tv.heading("filename", text="filename")
         self.tv.heading("requester_id", text="requester_id")
@@ -119,12 +101,21 @@ class OwnerPage(ttk.Frame):
 
         btns = ttk.Frame(req); btns.pack(fill="x", padx=8, pady=(4, 8))
         ttk.Button(btns, text="Refresh Requests", command=self._refresh_requests).pack(side="left")
-        ttk.Button(btns, text="Share Key with Selected Request", command=self._share_selected).pack(side="left", padx=8)
+        ttk.Button(btns, text="Select All", command=lambda: self.tv.selection_set(self.tv.get_children())).pack(
+            side="left", padx=(8, 0))
+        ttk.Button(btns, text="Share Key with Selected Requests", command=self._share_selected).pack(side="left", padx=8)
 
         self.status = StatusBar(root); self.status.pack(fill="x")
 
         # Ensure keys exist for this owner
         ensure_user_keys(KEYS_DIR, self.owner_id.get())
+
+        # Request list cursor: later refreshes only read blocks after _req_height
+        self.chain = make_chain()
+        self._req_owner = None
+        self._req_height = 0
+        self._owned = set()
+        self._req_seen = set()
         self._refresh_requests()
 
     # actions
@@ -145,12 +136,12 @@ class OwnerPage(ttk.Frame):
             return
 
         kp = ensure_user_keys(KEYS_DIR, self.owner_id.get())
-        ecdsa_priv, _, _, _ = load_user_keys(kp)
-        chain = LocalChain()
+        ecdsa_priv = load_user_key(kp, "ecdsa_priv")
+        chain = self.chain
         result = encrypt_sign_upload(ecdsa_priv, self.owner_id.get(), path, chain=chain)
 
         # Cache AES key locally so future shares don't need manual entry
-        _save_owner_key(self.owner_id.get(), result["file_id"], result["aes_key"])
+        owner_key_store(KEYS_DIR, self.owner_id.get()).put(result["file_id"], result["aes_key"])
 
         self.out.delete("1.0", "end")
         self.out.insert("end", "Upload complete.\n\n")
@@ -163,22 +154,35 @@ class OwnerPage(ttk.Frame):
         self.status.info("Encrypted, signed, and uploaded. When requests appear, select one and click Share Key.")
 
     def _refresh_requests(self):
-        self.tv.delete(*self.tv.get_children())
-        chain = LocalChain(); evs = chain.get_events()
+        chain = self.chain
         owner = self.owner_id.get().strip()
 
-        uploads = {
-            e["event"]["file_id"]: e["event"]
-            for e in evs if e["event"].get("type") == "UPLOAD" and e["event"].get("owner_id") == owner
-        }
-        reqs = [
-            e["event"] for e in evs
-            if e["event"].get("type") == "ACCESS_REQUEST" and e["event"].get("file_id") in uploads
-        ]
-        for r in reqs:
-            fid = r["file_id"]; meta = get_meta(fid) or {}
+        if owner != self._req_owner or chain.height() < self._req_height:
+            # First load for this owner comes from the ledger index
+            self.tv.delete(*self.tv.get_children())
+            self._req_owner, self._req_height, self._req_seen = owner, chain.height(), set()
+            self._owned = {b["event"]["file_id"] for b in chain.find_events(type="UPLOAD", owner_id=owner)}
+            new_reqs = chain.requests_for_owner(owner)
+        else:
+            # Afterwards only blocks appended since the last refresh are read
+            new = chain.get_events_since(self._req_height)
+            self._req_height += len(new)
+            new_reqs = []
+            for b in new:
+                ev = b["event"]
+                if ev.get("type") == "UPLOAD" and ev.get("owner_id") == owner:
+                    self._owned.add(ev["file_id"])
+                elif ev.get("type") == "ACCESS_REQUEST" and ev.get("file_id") in self._owned:
+                    new_reqs.append(b)
+
+        new_reqs = [b for b in new_reqs if b["hash"] not in self._req_seen]
+        metas = get_metas(b["event"]["file_id"] for b in new_reqs)
+        for b in new_reqs:
+            self._req_seen.add(b["hash"])
+            r = b["event"]
+            fid = r["file_id"]; meta = metas.get(fid, {})
             self.tv.insert("", "end", values=(fid, meta.get("filename", "?"), r.get("requester_id")))
-        self.status.info(f"Found {len(reqs)} request(s) for your files.")
+        self.status.info(f"Found {len(self.tv.get_children())} request(s) for your files.")
 
     def _prompt_for_aes_key(self, file_id: str) -> bytes | None:
         """
@@ -203,32 +207,45 @@ class OwnerPage(ttk.Frame):
             alert_error("AES key length must be 16, 24, or 32 bytes.")
             return None
         # Cache for future use
-        _save_owner_key(self.owner_id.get(), file_id, key)
+        owner_key_store(KEYS_DIR, self.owner_id.get()).put(file_id, key)
         return key
 
     def _share_selected(self):
         sel = self.tv.selection()
         if not sel:
-            alert_error("Select a request row first.")
+            alert_error("Select one or more request rows first.")
             return
 
-        fid, _, requester_id = self.tv.item(sel[0], "values")
+        rows = {}
+        for item in sel:
+            fid, _, requester_id = self.tv.item(item, "values")
+            rows.setdefault((fid, requester_id), []).append(item)
 
-        # Load owner's cached AES key for this file (or prompt once if missing)
-        store = _load_owner_keys(self.owner_id.get())
-        key_hex = store.get(fid)
-        if key_hex:
-            aes_key = bytes.fromhex(key_hex)
-        else:
+        # Owner's cached AES keys (prompt once for each file that isn't cached)
+        fids = {fid for fid, _ in rows}
+        aes_keys = owner_key_store(KEYS_DIR, self.owner_id.get()).get_many(fids)
+        for fid in fids - aes_keys.keys():
             aes_key = self._prompt_for_aes_key(fid)
-            if aes_key is None:
-                self.status.warn("Share canceled.")
-                return
-
-        # Load requester's RSA public key (ensure they have keys)
-        _, _, _, req_rsa_pub = load_user_keys(ensure_user_keys(KEYS_DIR, requester_id))
-
-        chain = LocalChain()
-        approve_and_share_key(chain, self.owner_id.get(), fid, requester_id, req_rsa_pub, aes_key)
+            if aes_key is not None:
+                aes_keys[fid] = aes_key
+        if not aes_keys:
+            self.status.warn("Share canceled.")
+            return
 
-        self.status.info(f"Shared key for file {fid} with requester {requester_id}.")
+        # Requester wrapping keys (ensure they have keys), loaded once per requester
+        def requester_pub(requester_id):
+            return load_user_key(ensure_user_keys(KEYS_DIR, requester_id), f"{KEY_WRAP_SCHEME}_pub")
+
+        result = approve_and_share_keys_bulk(self.chain, self.owner_id.get(), list(rows), aes_keys, requester_pub)
+
+        # Handled requests leave the pending list; ones without a key stay
+        skipped = set(result["missing_key"])
+        for pair, items in rows.items():
+            if pair not in skipped:
+                self.tv.delete(*items)
+        msg = f"Shared {len(result['shared'])} key(s)"
+        if result["already_shared"]:
+            msg += f", {result['already_shared']} already shared"
+        if skipped:
+            msg += f", {len(skipped)} skipped (no AES key)"
+        self.status.info(msg + ".")
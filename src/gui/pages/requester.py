@@ -2,11 +2,11 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 from pathlib import Path
 
-from src.core.keystore import ensure_user_keys, load_user_keys
-from src.blockchain.local_chain import LocalChain
+from src.core.keystore import ensure_user_keys, load_user_key
+from src.blockchain.factory import make_chain
 from src.services.sharing import create_access_request
-from src.services.verifier import requester_download_and_verify
-from src.storage.cloud import list_files, get_meta
+from src.services.verifier import requester_download_to
+from src.storage.cloud import iter_files, get_metas
 from ..widgets import (
     Section, LabeledEntry, StatusBar, alert_error, ScrollableFrame, apply_treeview_style
 )
@@ -104,12 +104,17 @@ class RequesterPage(ttk.Frame):
         self.status = StatusBar(root); self.status.pack(fill="x")
 
         ensure_user_keys(KEYS_DIR, self.requester_id.get())
+
+        # Share list cursor: later scans only read blocks after _share_height
+        self.chain = make_chain()
+        self._share_requester = None
+        self._share_height = 0
         self._refresh_cloud()
 
     # actions
     def _refresh_cloud(self):
         self.tv_cloud.delete(*self.tv_cloud.get_children())
-        for f in list_files():
+        for f in iter_files():
             self.tv_cloud.insert("", "end", values=(f["file_id"], f["filename"], f["size"]))
         self.status.info("Cloud list refreshed. Select a file and click Request Access.")
 
@@ -118,22 +123,38 @@ class RequesterPage(ttk.Frame):
         if not sel:
             alert_error("Select a file row first."); return
         fid, _, _ = self.tv_cloud.item(sel[0], "values")
-        chain = LocalChain()
+        chain = self.chain
         create_access_request(chain, self.requester_id.get(), fid)
         self.status.info(f"Access request created for file {fid}.")
 
     def _scan_shares(self):
-        self.tv_shared.delete(*self.tv_shared.get_children())
-        chain = LocalChain(); evs = chain.get_events()
+        chain = self.chain
         r = self.requester_id.get().strip()
-        shares = [e["event"] for e in evs if e["event"].get("type") == "KEY_SHARE" and e["event"].get("requester_id") == r]
+        if r != self._share_requester or chain.height() < self._share_height:
+            # First scan for this requester comes from the ledger index
+            self.tv_shared.delete(*self.tv_shared.get_children())
+            self._share_requester, self._share_height = r, chain.height()
+            blocks = chain.find_events(type="KEY_SHARE", requester_id=r)
+        else:
+            # Afterwards only blocks appended since the last scan are read
+            blocks = chain.get_events_since(self._share_height)
+            self._share_height += len(blocks)
+        shares = [b["event"] for b in blocks
+                  if b["event"].get("type") == "KEY_SHARE" and b["event"].get("requester_id") == r]
         latest = {}
         for ev in shares:
             latest[ev["file_id"]] = ev
+        metas = get_metas(latest)
         for fid, ev in latest.items():
-            meta = get_meta(fid) or {}
-            self.tv_shared.insert("", "end", values=(fid, meta.get("filename", "?"), ev.get("owner_id", "?")))
-        self.status.info(f"Found {len(latest)} shared file(s). Select one and click Download.")
+            meta = metas.get(fid, {})
+            values = (fid, meta.get("filename", "?"), ev.get("owner_id", "?"))
+            # Rows are keyed by file_id so a newer share replaces the old row
+            if self.tv_shared.exists(fid):
+                self.tv_shared.item(fid, values=values)
+            else:
+                self.tv_shared.insert("", "end", iid=fid, values=values)
+        count = len(self.tv_shared.get_children())
+        self.status.info(f"Found {count} shared file(s). Select one and click Download.")
 
     def _download_selected(self):
         sel = self.tv_shared.selection()
@@ -144,23 +165,25 @@ class RequesterPage(ttk.Frame):
 
         req_paths = ensure_user_keys(KEYS_DIR, self.requester_id.get())
         own_paths = ensure_user_keys(KEYS_DIR, self.owner_id.get())
-        _, _, req_rsa_priv, _ = load_user_keys(req_paths)
-        _, own_ecdsa_pub, _, _ = load_user_keys(own_paths)
+        req_rsa_priv = load_user_key(req_paths, "rsa_priv")
+        req_x25519_priv = load_user_key(req_paths, "x25519_priv")
+        own_ecdsa_pub = load_user_key(own_paths, "ecdsa_pub")
 
-        chain = LocalChain()
+        chain = self.chain
+        save_to = filedialog.asksaveasfilename(title="Save decrypted file as")
+        if not save_to:
+            self.status.warn("Save canceled."); return
         try:
-            pt = requester_download_and_verify(
+            # Streams to a temp file next to save_to; renamed only once verified
+            requester_download_to(
                 chain=chain,
                 requester_id=self.requester_id.get(),
                 requester_rsa_priv=req_rsa_priv,
+                requester_x25519_priv=req_x25519_priv,
                 owner_ecdsa_pub=own_ecdsa_pub,
-                file_id=fid
+                file_id=fid,
+                dest=save_to
             )
         except Exception as e:
             alert_error(str(e)); return
-
-        save_to = filedialog.asksaveasfilename(title="Save decrypted file as")
-        if not save_to:
-            self.status.warn("Save canceled."); return
-        Path(save_to).write_bytes(pt)
         self.status.info(f"Decrypted and verified. Saved to: {save_to}")
@@ -1,5 +1,8 @@
 import binascii
-from src.core.crypto import rsa_wrap
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.core.crypto import wrap_key
 from src.blockchain.local_chain import LocalChain
 
 def create_access_request(chain, requester_id: str, file_id: str):
@@ -10,14 +13,69 @@ def create_access_request(chain, requester_id: str, file_id: str):
         "requester_id": requester_id,
     })
 
-def approve_and_share_key(chain, owner_id: str, file_id: str, requester_id: str, requester_rsa_pub, aes_key: bytes):
-    # Wrap AES key with requester's RSA public key and log share event
-    wrapped = rsa_wrap(requester_rsa_pub, aes_key)
-    chain.append_event({
+def _key_share_event(owner_id: str, file_id: str, requester_id: str, requester_pub, aes_key: bytes) -> dict:
+    # Wrap the AES key for the requester; the scheme follows the key type (RSA or X25519)
+    scheme, wrapped = wrap_key(requester_pub, aes_key)
+    return {
         "type": "KEY_SHARE",
         "file_id": file_id,
         "owner_id": owner_id,
         "requester_id": requester_id,
+        "scheme": scheme,
         "wrapped_key": binascii.hexlify(wrapped).decode(),
-    })
-    return wrapped
+    }
+
+def approve_and_share_key(chain, owner_id: str, file_id: str, requester_id: str, requester_pub=None,
+                          aes_key: Optional[bytes] = None, *, requester_rsa_pub=None):
+    # Wrap AES key with requester's RSA or X25519 public key and log share event.
+    # requester_rsa_pub is the deprecated keyword name of requester_pub.
+    if requester_rsa_pub is not None:
+        if requester_pub is not None:
+            raise TypeError("Pass requester_pub or requester_rsa_pub, not both")
+        warnings.warn("requester_rsa_pub is deprecated; use requester_pub", DeprecationWarning, stacklevel=2)
+        requester_pub = requester_rsa_pub
+    if requester_pub is None or aes_key is None:
+        raise TypeError("approve_and_share_key() needs requester_pub and aes_key")
+    event = _key_share_event(owner_id, file_id, requester_id, requester_pub, aes_key)
+    chain.append_event(event)
+    return bytes.fromhex(event["wrapped_key"])
+
+def shared_pairs(chain, owner_id: str) -> Set[Tuple[str, str]]:
+    # (file_id, requester_id) pairs this owner has already shared a key for
+    if hasattr(chain, "find_events"):
+        blocks = chain.find_events(type="KEY_SHARE", owner_id=owner_id)
+    else:
+        blocks = [b for b in chain.get_events()
+                  if b["event"].get("type") == "KEY_SHARE" and b["event"].get("owner_id") == owner_id]
+    return {(b["event"]["file_id"], b["event"]["requester_id"]) for b in blocks}
+
+def approve_and_share_keys_bulk(chain, owner_id: str, requests: Iterable[Tuple[str, str]],
+                                aes_keys: Dict[str, bytes], requester_pub: Callable[[str], object],
+                                workers: Optional[int] = None) -> dict:
+    # Share keys for many (file_id, requester_id) requests with a single ledger write.
+    # Pairs that already have a KEY_SHARE from this owner (or repeat within the
+    # batch) are skipped, as are files missing from aes_keys. requester_pub is
+    # called once per distinct requester. Keys are wrapped on a thread pool.
+    done = shared_pairs(chain, owner_id)
+    todo: List[Tuple[str, str]] = []
+    missing: List[Tuple[str, str]] = []
+    already = 0
+    for pair in requests:
+        if pair in done:
+            already += 1
+        elif pair[0] not in aes_keys:
+            missing.append(pair)
+        else:
+            done.add(pair)
+            todo.append(pair)
+
+    pubs = {rid: requester_pub(rid) for rid in {rid for _, rid in todo}}
+
+    def wrap(pair):
+        fid, rid = pair
+        return _key_share_event(owner_id, fid, rid, pubs[rid], aes_keys[fid])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        events = list(pool.map(wrap, todo))
+    chain.append_events(events)
+    return {"shared": events, "already_shared": already, "missing_key": missing}
@@ -1,20 +1,67 @@
 import binascii
+import hashlib
+import os
 from pathlib import Path
-from src.core.crypto import aes_encrypt, sign_ecdsa
-from src.storage.cloud import put_blob
-from src.blockchain.local_chain import LocalChain
+from config.settings import UPLOAD_CHUNK_SIZE, UPLOAD_COMPRESSION, UPLOAD_SIGN_MODE
+from src.core.crypto import (
+    AES_KEY_BYTES, NONCE_BYTES, TAG_BYTES, FORMAT_CHUNKED, aes_encrypt_chunks, read_chunks, sign_ecdsa_digest
+)
+from src.core.compress import choose_codec, compress_stream
+from src.core.treehash import SIG_TREE, encode_leaves, hash_leaves, tree_root
+from src.storage.cloud import put_blob_stream, put_sidecar
+from src.blockchain.factory import make_chain
 from src.core.ids import new_id
+from src.util.chunks import rechunk
 
-def encrypt_sign_upload(owner_ecdsa_priv, owner_id: str, file_path: str, chain=None):
-    # Encrypt file with AES, sign ciphertext, upload to cloud, and log event
-    chain = chain or LocalChain()
-    data = Path(file_path).read_bytes()
+def encrypt_sign_upload(owner_ecdsa_priv, owner_id: str, file_path: str, chain=None,
+                        chunk_size: int = UPLOAD_CHUNK_SIZE, sign_mode: str = UPLOAD_SIGN_MODE,
+                        compression: str = UPLOAD_COMPRESSION):
+    # Encrypt file with AES, sign ciphertext, upload to cloud, and log event.
+    # The file is streamed chunk by chunk, so memory use does not grow with its size.
+    chain = chain or make_chain()
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if sign_mode not in (SIG_TREE, "stream"):
+        raise ValueError(f"Unknown sign_mode: {sign_mode}")
 
-    aes_key, nonce, ct = aes_encrypt(data)
-    signature = sign_ecdsa(owner_ecdsa_priv, ct)
+    codec = choose_codec(file_path, compression)
+
+    aes_key = os.urandom(AES_KEY_BYTES)
+    nonce = os.urandom(NONCE_BYTES)
+    digest = hashlib.sha256()
+    leaves = []
+    ct_size = 0
+
+    def sealed(f):
+        nonlocal ct_size
+        plain = read_chunks(f, chunk_size)
+        if codec:
+            plain = rechunk(compress_stream(plain), chunk_size)
+        chunks = aes_encrypt_chunks(aes_key, nonce, plain)
+        if sign_mode == SIG_TREE:
+            for ct, h in hash_leaves(chunks):
+                leaves.append(h)
+                ct_size += len(ct)
+                yield ct
+        else:
+            for ct in chunks:
+                digest.update(ct)
+                ct_size += len(ct)
+                yield ct
 
     file_id = new_id()
-    put_blob(file_id, ct, filename=Path(file_path).name)
+    with open(file_path, "rb") as f:
+        put_blob_stream(file_id, sealed(f), filename=Path(file_path).name)
+
+    tree = None
+    if sign_mode == SIG_TREE:
+        # Sign the Merkle root over sealed chunks; the leaf list is stored beside the blob
+        root = tree_root(leaves)
+        put_sidecar(file_id, "tree", encode_leaves(leaves))
+        signature = sign_ecdsa_digest(owner_ecdsa_priv, root)
+        tree = {"leaf_size": chunk_size + TAG_BYTES, "leaves": len(leaves), "root": root.hex()}
+    else:
+        signature = sign_ecdsa_digest(owner_ecdsa_priv, digest.digest())
 
     record = {
         "type": "UPLOAD",
@@ -23,8 +70,15 @@ def encrypt_sign_upload(owner_ecdsa_priv, owner_id: str, file_path: str, chain=N
         "filename": Path(file_path).name,
         "aes_nonce": binascii.hexlify(nonce).decode(),
         "sig": binascii.hexlify(signature).decode(),
-        "size": len(ct),
+        "size": ct_size,
+        "format": FORMAT_CHUNKED,
+        "chunk_size": chunk_size,
+        "sig_mode": sign_mode,
     }
+    if tree:
+        record["tree"] = tree
+    if codec:
+        record["codec"] = codec
     chain.append_event(record)
 
     return {
@@ -32,5 +86,5 @@ def encrypt_sign_upload(owner_ecdsa_priv, owner_id: str, file_path: str, chain=N
         "aes_key": aes_key,
         "nonce": nonce,
         "signature": signature,
-        "size": len(ct),
+        "size": ct_size,
     }
@@ -1,9 +1,23 @@
-from typing import Optional
-import binascii
-from src.core.crypto import rsa_unwrap, aes_decrypt, verify_ecdsa
-from src.storage.cloud import get_blob
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from src.blockchain.blocks import hash_block
+from src.core.crypto import (
+    TAG_BYTES, FORMAT_SINGLE, FORMAT_CHUNKED, WRAP_RSA, WRAP_X25519, rsa_unwrap, x25519_unwrap, aes_decrypt_chunk, aes_decrypt_chunks, aes_gcm_decryptor,
+    verify_ecdsa_digest
+)
+from src.core.compress import CODEC_ZLIB, decompress_stream
+from src.core.merkle import leaf_hash
+from src.core.treehash import SIG_TREE, decode_leaves, tree_root
+from src.storage.cloud import get_blob_range, get_cached_view, get_sidecar
 from src.blockchain.local_chain import LocalChain
 
+STREAM_BLOCK = 1 << 20  # decrypt step for single-shot (format 1) blobs
+
 def _find_upload(chain_events, file_id: str) -> Optional[dict]:
     # Find the upload event for a given file
     for e in chain_events:
@@ -14,31 +28,200 @@ def _find_upload(chain_events, file_id: str) -> Optional[dict]:
 
 def _find_keyshare(chain_events, file_id: str, requester_id: str) -> Optional[dict]:
     # Get the most recent KEY_SHARE for a file and requester
-    ks = [e["event"] for e in chain_events if e["event"].get("type")=="KEY_SHARE"
-          and e["event"].get("file_id")==file_id
-          and e["event"].get("requester_id")==requester_id]
-    return ks[-1] if ks else None
+    for e in reversed(chain_events):
+        ev = e["event"]
+        if ev.get("type") == "KEY_SHARE" and ev.get("file_id") == file_id \
+                and ev.get("requester_id") == requester_id:
+            return ev
+    return None
 
-def requester_download_and_verify(chain: LocalChain, requester_id: str, requester_rsa_priv, owner_ecdsa_pub, file_id: str) -> bytes:
-    # Download file from cloud, unwrap AES key, decrypt, and verify signature
+def _lookup_events(chain, file_id: str, requester_id: str):
+    # Resolve the UPLOAD and latest KEY_SHARE, via the ledger index when available
+    if hasattr(chain, "latest_event"):
+        return (chain.first_event(type="UPLOAD", file_id=file_id),
+                chain.latest_event(type="KEY_SHARE", file_id=file_id, requester_id=requester_id))
     events = chain.get_events()
-    upload_ev  = _find_upload(events, file_id)
+    return _find_upload(events, file_id), _find_keyshare(events, file_id, requester_id)
+
+def _proven_event(chain, trusted_root: Tuple[int, str], pos: Optional[int]) -> Optional[dict]:
+    # Load the block at pos and confirm it is included under the trusted Merkle root
+    if pos is None:
+        return None
+    size, root = trusted_root
+    if pos >= size:
+        raise ValueError("Event is newer than the trusted ledger root")
+    block = chain.block_at(pos)
+    if hash_block(block) != block["hash"] or not chain.verify_proof(block["hash"], chain.prove(pos, size), root):
+        raise ValueError("Ledger inclusion proof failed")
+    return block["event"]
+
+def _plaintext_chunks(upload_ev: dict, aes_key: bytes, view: memoryview, on_ct) -> Iterator[bytes]:
+    # Decrypt a blob in whichever format the UPLOAD event declares, passing every
+    # ciphertext slice to on_ct(index, data) before it is decrypted. Slices are
+    # views into the mapped blob, so hashing and decryption read it in place.
+    nonce = bytes.fromhex(upload_ev["aes_nonce"])
+    if upload_ev.get("format", FORMAT_SINGLE) == FORMAT_CHUNKED:
+        step = upload_ev["chunk_size"] + TAG_BYTES
+        def sealed():
+            for i, off in enumerate(range(0, len(view), step)):
+                ct = view[off:off + step]
+                on_ct(i, ct)
+                yield ct
+        yield from aes_decrypt_chunks(aes_key, nonce, sealed())
+        return
+    # Single-shot format: ciphertext || tag, so take the tag first and stream the body
+    if len(view) < TAG_BYTES:
+        raise ValueError("Blob is shorter than an AES-GCM tag")
+    body, tag = view[:-TAG_BYTES], view[-TAG_BYTES:]
+    dec = aes_gcm_decryptor(aes_key, nonce, bytes(tag))
+    i = -1
+    for i, off in enumerate(range(0, len(body), STREAM_BLOCK)):
+        ct = body[off:off + STREAM_BLOCK]
+        on_ct(i, ct)
+        yield dec.update(ct)
+    on_ct(i + 1, tag)
+    yield dec.finalize()
+
+def _unwrap(keyshare_ev: dict, requester_rsa_priv, requester_x25519_priv) -> bytes:
+    # AES key from a KEY_SHARE event under whichever scheme it declares
+    wrapped = bytes.fromhex(keyshare_ev["wrapped_key"])
+    scheme = keyshare_ev.get("scheme", WRAP_RSA)
+    if scheme == WRAP_RSA:
+        return rsa_unwrap(requester_rsa_priv, wrapped)
+    if scheme == WRAP_X25519:
+        if requester_x25519_priv is None:
+            raise ValueError("Key was shared with X25519; requester X25519 private key needed")
+        return x25519_unwrap(requester_x25519_priv, wrapped)
+    raise ValueError(f"Unsupported key wrapping scheme: {scheme}")
+
+def _resolve(chain, requester_id: str, requester_rsa_priv, file_id: str,
+             trusted_root: Optional[Tuple[int, str]], requester_x25519_priv=None) -> Tuple[dict, bytes]:
+    # UPLOAD event and unwrapped AES key for a requester's download.
+    # With trusted_root=(size, merkle_root) the UPLOAD and KEY_SHARE blocks are
+    # confirmed by O(log n) inclusion proofs instead of trusting the local ledger.
+    if trusted_root is not None:
+        if not all(hasattr(chain, a) for a in ("index", "block_at", "prove", "verify_proof")):
+            raise ValueError(f"{type(chain).__name__} cannot prove inclusion; trusted_root needs a LocalChain ledger")
+        idx = chain.index
+        upload_ev = _proven_event(chain, trusted_root, idx.first(type="UPLOAD", file_id=file_id))
+        keyshare_ev = _proven_event(chain, trusted_root,
+                                    idx.latest(type="KEY_SHARE", file_id=file_id, requester_id=requester_id))
+    else:
+        upload_ev, keyshare_ev = _lookup_events(chain, file_id, requester_id)
     if not upload_ev:
         raise ValueError("No upload event for file")
 
-    keyshare_ev = _find_keyshare(events, file_id, requester_id)
     if not keyshare_ev:
         raise ValueError("Key not shared to this requester")
 
-    wrapped = bytes.fromhex(keyshare_ev["wrapped_key"])
-    aes_key = rsa_unwrap(requester_rsa_priv, wrapped)
+    return upload_ev, _unwrap(keyshare_ev, requester_rsa_priv, requester_x25519_priv)
 
-    nonce = bytes.fromhex(upload_ev["aes_nonce"])
-    sig   = bytes.fromhex(upload_ev["sig"])
+def _signed_leaves(upload_ev: dict, owner_ecdsa_pub, file_id: str) -> List[bytes]:
+    # Load the chunk hash list of a tree-signed upload and check it against the signed root
+    tree = upload_ev["tree"]
+    data = get_sidecar(file_id, "tree")
+    if data is None:
+        raise ValueError("Chunk hash list missing for tree-signed file")
+    leaves = decode_leaves(data)
+    root = tree_root(leaves)
+    if len(leaves) != tree["leaves"] or root.hex() != tree["root"]:
+        raise ValueError("Chunk hash list does not match the UPLOAD event")
+    verify_ecdsa_digest(owner_ecdsa_pub, root, bytes.fromhex(upload_ev["sig"]))
+    return leaves
 
-    ct = get_blob(file_id)
-    pt = aes_decrypt(aes_key, nonce, ct)
+def _decrypt_verified(upload_ev: dict, aes_key: bytes, owner_ecdsa_pub, file_id: str, out: BinaryIO) -> int:
+    # Decrypt the blob into out and verify the owner's ECDSA signature over the ciphertext.
+    # Tree-signed files are checked chunk by chunk; others once the whole stream is hashed.
+    # Callers must discard what was written to out if this raises.
+    if upload_ev.get("sig_mode") == SIG_TREE:
+        leaves = _signed_leaves(upload_ev, owner_ecdsa_pub, file_id)
+        def on_ct(i, ct):
+            if i >= len(leaves) or leaf_hash(ct) != leaves[i]:
+                raise ValueError(f"Ciphertext chunk {i} does not match the signed tree")
+    else:
+        digest = hashlib.sha256()
+        on_ct = lambda i, ct: digest.update(ct)
+    written = 0
+    with get_cached_view(file_id, upload_ev["sig"]) as view:
+        pieces = _plaintext_chunks(upload_ev, aes_key, view, on_ct)
+        if upload_ev.get("codec") == CODEC_ZLIB:
+            pieces = decompress_stream(pieces, upload_ev.get("chunk_size", STREAM_BLOCK))
+        elif upload_ev.get("codec"):
+            raise ValueError(f"Unsupported codec: {upload_ev['codec']}")
+        for pt in pieces:
+            out.write(pt)
+            written += len(pt)
+    if upload_ev.get("sig_mode") != SIG_TREE:
+        verify_ecdsa_digest(owner_ecdsa_pub, digest.digest(), bytes.fromhex(upload_ev["sig"]))
+    return written
 
-    # Verify owner’s ECDSA signature over ciphertext
-    verify_ecdsa(owner_ecdsa_pub, ct, sig)
-    return pt
+def requester_download_to(chain, requester_id: str, requester_rsa_priv, owner_ecdsa_pub, file_id: str,
+                          dest: Union[str, Path, BinaryIO],
+                          trusted_root: Optional[Tuple[int, str]] = None, requester_x25519_priv=None) -> int:
+    # Stream-decrypt a file to a path or writable file object with bounded memory.
+    # requester_x25519_priv is needed for keys shared under the X25519 scheme.
+    # Plaintext goes to a temp file and only reaches dest once the signature checks out.
+    # Returns the number of plaintext bytes written.
+    upload_ev, aes_key = _resolve(chain, requester_id, requester_rsa_priv, file_id, trusted_root,
+                                  requester_x25519_priv)
+    if isinstance(dest, (str, Path)):
+        dest = Path(dest)
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                written = _decrypt_verified(upload_ev, aes_key, owner_ecdsa_pub, file_id, out)
+            os.replace(tmp, dest)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return written
+    with tempfile.TemporaryFile() as out:
+        written = _decrypt_verified(upload_ev, aes_key, owner_ecdsa_pub, file_id, out)
+        out.seek(0)
+        shutil.copyfileobj(out, dest, STREAM_BLOCK)
+    return written
+
+def requester_download_and_verify(chain: LocalChain, requester_id: str, requester_rsa_priv, owner_ecdsa_pub, file_id: str,
+                                  trusted_root: Optional[Tuple[int, str]] = None,
+                                  requester_x25519_priv=None) -> bytes:
+    # Download file from cloud, unwrap AES key, decrypt, and verify signature.
+    # Holds the whole plaintext in memory; use requester_download_to for large files.
+    upload_ev, aes_key = _resolve(chain, requester_id, requester_rsa_priv, file_id, trusted_root,
+                                  requester_x25519_priv)
+    buf = io.BytesIO()
+    _decrypt_verified(upload_ev, aes_key, owner_ecdsa_pub, file_id, buf)
+    return buf.getvalue()
+
+def requester_download_range(chain, requester_id: str, requester_rsa_priv, owner_ecdsa_pub, file_id: str,
+                             offset: int, length: int,
+                             trusted_root: Optional[Tuple[int, str]] = None,
+                             requester_x25519_priv=None) -> bytes:
+    # Plaintext bytes [offset, offset + length) of a tree-signed chunked upload.
+    # Only the ciphertext chunks covering the range are fetched; each is checked
+    # against the signed chunk hash list and decrypted on its own.
+    if offset < 0 or length < 0:
+        raise ValueError("offset and length must be non-negative")
+    upload_ev, aes_key = _resolve(chain, requester_id, requester_rsa_priv, file_id, trusted_root,
+                                  requester_x25519_priv)
+    if upload_ev.get("format", FORMAT_SINGLE) != FORMAT_CHUNKED or upload_ev.get("sig_mode") != SIG_TREE:
+        raise ValueError("Range downloads need a chunked, tree-signed upload")
+    if upload_ev.get("codec"):
+        raise ValueError("Range downloads are not available for compressed uploads")
+    leaves = _signed_leaves(upload_ev, owner_ecdsa_pub, file_id)
+    chunk = upload_ev["chunk_size"]
+    step = chunk + TAG_BYTES
+    pt_size = upload_ev["size"] - len(leaves) * TAG_BYTES
+    end = min(offset + length, pt_size)
+    if end <= offset:
+        return b""
+    first, last = offset // chunk, (end - 1) // chunk
+    ct = get_blob_range(file_id, first * step, (last - first + 1) * step)
+    nonce = bytes.fromhex(upload_ev["aes_nonce"])
+    out = []
+    for i in range(first, last + 1):
+        sealed = ct[(i - first) * step:(i - first + 1) * step]
+        if leaf_hash(sealed) != leaves[i]:
+            raise ValueError(f"Ciphertext chunk {i} does not match the signed tree")
+        out.append(aes_decrypt_chunk(aes_key, nonce, i, i == len(leaves) - 1, sealed))
+    data = b"".join(out)
+    return data[offset - first * chunk:end - first * chunk]
@@ -0,0 +1,14 @@
+from typing import BinaryIO, Iterable, Iterator, Optional, Protocol
+
+# Protocol defining the required blob storage interface.
+# Missing blobs raise FileNotFoundError from every backend.
+class BlobStore(Protocol):
+    def put(self, file_id: str, data: bytes) -> str: ...
+    def put_stream(self, file_id: str, chunks: Iterable[bytes]) -> str: ...
+    def get(self, file_id: str) -> bytes: ...
+    def get_range(self, file_id: str, offset: int, length: int) -> bytes: ...
+    def open(self, file_id: str) -> BinaryIO: ...
+    def view(self, file_id: str) -> memoryview: ...
+    def put_sidecar(self, file_id: str, kind: str, data: bytes) -> None: ...
+    def get_sidecar(self, file_id: str, kind: str) -> Optional[bytes]: ...
+    def iter_ids(self) -> Iterator[str]: ...
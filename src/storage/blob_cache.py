@@ -0,0 +1,133 @@
+"""
+Local, size-bounded LRU cache of ciphertext blobs.
+
+Sits between the verifier and a (typically remote) BlobStore so repeat
+downloads skip the transfer. Entries are keyed by file_id plus the UPLOAD
+signature, so a re-uploaded file never hits a stale entry. Each entry records
+the SHA-256 of its content, which is checked on every read; a corrupted
+entry is dropped and fetched again. Only ciphertext is cached, so the cache
+adds no plaintext exposure.
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key    TEXT PRIMARY KEY,
+    size   INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries(used);
+"""
+
+_COPY_BLOCK = 1 << 20
+
+def _map(path: Path) -> memoryview:
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+class BlobCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(str(self.root / "index.db"), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _key(file_id: str, sig: str) -> str:
+        return hashlib.sha256(f"{file_id}:{sig}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.blob"
+
+    def _drop(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._path(key).unlink(missing_ok=True)
+
+    def get(self, file_id: str, sig: str) -> Optional[memoryview]:
+        # Cached ciphertext as an mmap-backed view, or None on a miss or failed integrity check
+        key = self._key(file_id, sig)
+        row = self._conn.execute("SELECT size, digest FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            view = _map(self._path(key))
+        except FileNotFoundError:
+            view = None
+        if view is None or len(view) != row[0] or hashlib.sha256(view).hexdigest() != row[1]:
+            if view is not None:
+                view.release()
+            self._drop(key)
+            self.misses += 1
+            return None
+        with self._lock:
+            self._conn.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return view
+
+    def put(self, file_id: str, sig: str, src: BinaryIO) -> memoryview:
+        # Copy a blob stream into the cache, evict least-recently-used entries, return a view
+        key = self._key(file_id, sig)
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+        digest, size = hashlib.sha256(), 0
+        try:
+            with tmp.open("wb") as f:
+                while True:
+                    block = src.read(_COPY_BLOCK)
+                    if not block:
+                        break
+                    digest.update(block)
+                    f.write(block)
+                    size += len(block)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        view = _map(path)
+        if size > self.max_bytes:
+            # Larger than the whole cache: serve it once, keep nothing
+            path.unlink(missing_ok=True)
+            return view
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, size, digest, used) VALUES (?, ?, ?, ?)",
+                (key, size, digest.hexdigest(), time.time()))
+        self._evict(keep=key)
+        return view
+
+    def _evict(self, keep: str):
+        # Drop least-recently-used entries until the cache fits in max_bytes
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries WHERE key != ? ORDER BY used", (keep,)).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._drop(key)
+            total -= size
+
+    def size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def clear(self):
+        for (key,) in self._conn.execute("SELECT key FROM entries").fetchall():
+            self._drop(key)
@@ -1,43 +1,144 @@
+"""
+Blob storage facade used by the services and GUI.
+
+Content goes to the BlobStore selected by STORAGE_MODE (see factory.py):
+the sharded local filesystem store under CLOUD_DIR by default, or an
+S3-compatible object store. File metadata always lives in the local
+metadata store (meta_store.py). With BLOB_CACHE_BYTES set, downloads go
+through a local ciphertext LRU cache (blob_cache.py).
+"""
+
 from pathlib import Path
-from typing import List
-from config.settings import CLOUD_DIR
-from src.util.jsonio import read_json, write_json
+from typing import BinaryIO, Dict, Iterable, Iterator, List
+from config.settings import CLOUD_DIR, BLOB_CACHE_DIR, BLOB_CACHE_BYTES
+from src.storage.base import BlobStore
+from src.storage.blob_cache import BlobCache
+from src.storage.factory import make_blob_store
+from src.storage.meta_store import MetaStore
+
+META_FILE = CLOUD_DIR / "meta.json"  # legacy store, imported into META_DB on first use
+META_DB   = CLOUD_DIR / "meta.db"
+
+_store: MetaStore | None = None
+_blob_store: BlobStore | None = None
+_cache: BlobCache | None = None
+
+def _meta() -> MetaStore:
+    # Shared metadata store (create cloud dir and migrate meta.json if needed)
+    global _store
+    if _store is None:
+        CLOUD_DIR.mkdir(parents=True, exist_ok=True)
+        _store = MetaStore(META_DB, legacy_json=META_FILE)
+    return _store
 
-BLOB_EXT = ".blob"
-META_FILE = CLOUD_DIR / "meta.json"
+def _blobs() -> BlobStore:
+    # Shared blob backend, built on first use
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = make_blob_store()
+    return _blob_store
 
-def _meta():
-    # Load metadata (create cloud dir if missing)
-    CLOUD_DIR.mkdir(parents=True, exist_ok=True)
-    return read_json(META_FILE, default={})
+def set_blob_store(store: BlobStore | None):
+    # Swap the blob backend (None = rebuild from STORAGE_MODE on next use)
+    global _blob_store
+    _blob_store = store
 
-def _save_meta(m):
-    # Save metadata back to disk
-    write_json(META_FILE, m)
+def set_blob_cache(cache: BlobCache | None):
+    # Replace the ciphertext cache (None = rebuild from BLOB_CACHE_BYTES on next use)
+    global _cache
+    _cache = cache
 
+def _blob_cache() -> BlobCache | None:
+    global _cache
+    if _cache is None and BLOB_CACHE_BYTES > 0:
+        _cache = BlobCache(BLOB_CACHE_DIR, BLOB_CACHE_BYTES)
+    return _cache
+
+def _record(file_id: str, filename: str, size: int):
+    _meta().put(file_id, filename, size)
+
+# ---------- blobs ----------
 def put_blob(file_id: str, content: bytes, filename: str):
     # Store file content and update metadata
-    CLOUD_DIR.mkdir(parents=True, exist_ok=True)
-    path = CLOUD_DIR / f"{file_id}{BLOB_EXT}"
-    path.write_bytes(content)
-    meta = _meta()
-    meta[file_id] = {"filename": filename, "size": len(content)}
-    _save_meta(meta)
-    return str(path)
+    location = _blobs().put(file_id, content)
+    _record(file_id, filename, len(content))
+    return location
+
+def put_blob_stream(file_id: str, chunks: Iterable[bytes], filename: str):
+    # Store content produced chunk by chunk; the blob appears only once complete
+    size = 0
+    def counted():
+        nonlocal size
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    location = _blobs().put_stream(file_id, counted())
+    _record(file_id, filename, size)
+    return location
+
+def blob_path(file_id: str) -> Path:
+    # Filesystem location of a stored blob (filesystem backend only)
+    return _blobs().path(file_id)
 
 def get_blob(file_id: str) -> bytes:
     # Retrieve stored file content
-    path = CLOUD_DIR / f"{file_id}{BLOB_EXT}"
-    return path.read_bytes()
+    return _blobs().get(file_id)
+
+def get_blob_view(file_id: str) -> memoryview:
+    # Read-only, mmap-backed memoryview of the blob; release it (or use `with`) when done
+    return _blobs().view(file_id)
+
+def get_cached_view(file_id: str, sig: str) -> memoryview:
+    # Like get_blob_view, served from the ciphertext cache when enabled.
+    # sig is the UPLOAD signature (hex), so re-uploads never hit a stale entry.
+    cache = _blob_cache()
+    if cache is None:
+        return get_blob_view(file_id)
+    view = cache.get(file_id, sig)
+    if view is None:
+        with open_blob(file_id) as src:
+            view = cache.put(file_id, sig, src)
+    return view
+
+def open_blob(file_id: str) -> BinaryIO:
+    # Open stored content for streaming reads
+    return _blobs().open(file_id)
+
+def get_blob_range(file_id: str, offset: int, length: int) -> bytes:
+    # Read up to length bytes of stored content starting at offset
+    if offset < 0 or length < 0:
+        raise ValueError("offset and length must be non-negative")
+    return _blobs().get_range(file_id, offset, length)
+
+def put_sidecar(file_id: str, kind: str, data: bytes):
+    # Store auxiliary data next to a blob (e.g. "tree" = signed chunk hash list)
+    _blobs().put_sidecar(file_id, kind, data)
+
+def get_sidecar(file_id: str, kind: str) -> bytes | None:
+    return _blobs().get_sidecar(file_id, kind)
+
+# ---------- listing & migration ----------
+def iter_blob_ids() -> Iterator[str]:
+    # file_ids of stored blobs, listed lazily by the backend
+    return _blobs().iter_ids()
+
+def migrate_layout() -> int:
+    # Move blobs into the current shard layout; backends without a layout (S3) have nothing to move
+    migrate = getattr(_blobs(), "migrate_layout", None)
+    return migrate() if migrate is not None else 0
+
+def iter_files() -> Iterator[dict]:
+    # Stored files with metadata, streamed from the metadata store
+    return _meta().iter_all()
 
 def list_files() -> List[dict]:
     # List all stored files with metadata
-    meta = _meta()
-    out = []
-    for fid, m in meta.items():
-        out.append({"file_id": fid, "filename": m["filename"], "size": m["size"]})
-    return out
+    return list(iter_files())
 
 def get_meta(file_id: str) -> dict | None:
     # Get metadata for a specific file
     return _meta().get(file_id)
+
+def get_metas(file_ids: Iterable[str]) -> Dict[str, dict]:
+    # Metadata for many files at once, keyed by file_id (unknown ids are left out)
+    return _meta().get_many(file_ids)
@@ -0,0 +1,12 @@
+from config.settings import STORAGE_MODE, CLOUD_DIR, CLOUD_SHARD_LEVELS
+from src.storage.fs_store import FileStore
+
+def make_blob_store(mode: str = STORAGE_MODE):
+    # Build the BlobStore backend selected by STORAGE_MODE
+    if mode == "fs":
+        return FileStore(CLOUD_DIR, CLOUD_SHARD_LEVELS)
+    if mode == "s3":
+        # Imported lazily so boto3 is only needed when actually selected
+        from src.storage.s3_store import S3Store
+        return S3Store()
+    raise ValueError(f"Unknown STORAGE_MODE: {mode!r} (expected fs or s3)")
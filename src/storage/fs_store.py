@@ -0,0 +1,161 @@
+"""
+Filesystem BlobStore.
+
+Blobs live under a root directory in a fan-out of shard_levels directories
+of two hex characters each, taken from SHA-256(file_id), e.g.
+<root>/3f/a2/<file_id>.blob, so no directory grows past ~256 entries per
+level. Files still in the flat layout, or written under a different
+shard_levels setting, are found transparently until migrate_layout() moves
+them.
+"""
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+BLOB_EXT = ".blob"
+SIDECAR_KINDS = ("tree",)  # sidecar files stored beside blobs as <file_id>.<kind>
+_STORED_EXTS = (BLOB_EXT,) + tuple(f".{k}" for k in SIDECAR_KINDS)
+MAX_SHARD_LEVELS = 4  # deepest earlier layout probed when a blob is not where expected
+
+class FileStore:
+    def __init__(self, root: Path, shard_levels: int = 2):
+        self.root = Path(root)
+        self.shard_levels = shard_levels
+
+    # ---------- layout ----------
+    def _path(self, file_id: str, suffix: str = BLOB_EXT, levels: Optional[int] = None) -> Path:
+        # Where a blob (or sidecar) is written in the current layout (or one levels deep)
+        d, h = self.root, hashlib.sha256(file_id.encode()).hexdigest()
+        for i in range(self.shard_levels if levels is None else levels):
+            d = d / h[2 * i:2 * i + 2]
+        return d / f"{file_id}{suffix}"
+
+    def _locate(self, file_id: str, suffix: str = BLOB_EXT) -> Path:
+        # Existing copy: current layout first, then the flat layout and the other
+        # shard depths a CLOUD_SHARD_LEVELS change may have left behind
+        p = self._path(file_id, suffix)
+        if p.exists():
+            return p
+        for levels in range(max(self.shard_levels, MAX_SHARD_LEVELS) + 1):
+            if levels != self.shard_levels:
+                old = self._path(file_id, suffix, levels)
+                if old.exists():
+                    return old
+        # A concurrent migration may have just moved it into place
+        return p
+
+    def _open(self, file_id: str, suffix: str = BLOB_EXT) -> BinaryIO:
+        try:
+            return self._locate(file_id, suffix).open("rb")
+        except FileNotFoundError:
+            # Moved between lookup and open; the sharded path is now authoritative
+            return self._path(file_id, suffix).open("rb")
+
+    @staticmethod
+    def _write_atomic(path: Path, chunks: Iterable[bytes]) -> int:
+        # Write to <path>.part and rename into place; returns bytes written
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        size = 0
+        try:
+            with tmp.open("wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return size
+
+    def path(self, file_id: str) -> Path:
+        # Filesystem location of a stored blob (either layout)
+        return self._locate(file_id)
+
+    # ---------- BlobStore ----------
+    def put(self, file_id: str, data: bytes) -> str:
+        return self.put_stream(file_id, [data])
+
+    def put_stream(self, file_id: str, chunks: Iterable[bytes]) -> str:
+        # The blob appears only once complete
+        path = self._path(file_id)
+        self._write_atomic(path, chunks)
+        return str(path)
+
+    def get(self, file_id: str) -> bytes:
+        with self._open(file_id) as f:
+            return f.read()
+
+    def get_range(self, file_id: str, offset: int, length: int) -> bytes:
+        with self._open(file_id) as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def open(self, file_id: str) -> BinaryIO:
+        return self._open(file_id)
+
+    def view(self, file_id: str) -> memoryview:
+        # Read-only memoryview over an mmap of the blob: pages come straight from the
+        # page cache with no heap copy. The mapping is dropped once the view (and any
+        # slices of it) are released, so use it as a context manager.
+        with self._open(file_id) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def put_sidecar(self, file_id: str, kind: str, data: bytes):
+        # Only known kinds, so listing and migration can tell store files from strays
+        if kind not in SIDECAR_KINDS:
+            raise ValueError(f"Unknown sidecar kind: {kind}")
+        self._write_atomic(self._path(file_id, f".{kind}"), [data])
+
+    def get_sidecar(self, file_id: str, kind: str) -> Optional[bytes]:
+        try:
+            with self._open(file_id, f".{kind}") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    # ---------- listing & migration ----------
+    def _walk(self, d: Path | None = None) -> Iterator[os.DirEntry]:
+        # Lazily yield <file_id>.blob and known sidecar entries in the root and its shard
+        # directories; hidden files (.DS_Store, editor swap files), meta.db and partial
+        # writes are not store entries and are left alone
+        d = self.root if d is None else d
+        try:
+            it = os.scandir(d)
+        except FileNotFoundError:
+            return
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if len(e.name) == 2:
+                        yield from self._walk(Path(e.path))
+                elif not e.name.startswith(".") and e.name.endswith(_STORED_EXTS) \
+                        and e.name.rpartition(".")[0]:
+                    yield e
+
+    def iter_ids(self) -> Iterator[str]:
+        # file_ids of stored blobs, walking shards one directory at a time
+        for e in self._walk():
+            if e.name.endswith(BLOB_EXT):
+                yield e.name[:-len(BLOB_EXT)]
+
+    def migrate_layout(self) -> int:
+        # Move blobs and sidecars into the current layout (safe while the app runs)
+        moved = 0
+        for e in self._walk():
+            file_id, dot, ext = e.name.rpartition(".")
+            dst = self._path(file_id, dot + ext)
+            if Path(e.path) == dst:
+                continue
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(e.path, dst)
+            except FileNotFoundError:
+                continue  # already moved (directory listed twice while being modified)
+            moved += 1
+        return moved
@@ -0,0 +1,90 @@
+"""
+Blob metadata in an embedded SQLite table.
+
+Replaces the single meta.json that every put rewrote in full: puts and gets
+are primary-key operations, WAL mode lets readers run alongside a writer, and
+concurrent processes serialize on SQLite's own write lock instead of losing
+each other's entries. An existing meta.json is imported on first open.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+from src.util.jsonio import read_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    file_id  TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size     INTEGER NOT NULL
+);
+"""
+
+_BATCH = 500  # ids per IN (...) query, below SQLite's variable limit
+
+class MetaStore:
+    def __init__(self, db_path: Path, legacy_json: Optional[Path] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        if legacy_json is not None and Path(legacy_json).exists():
+            self.import_json(legacy_json)
+
+    def close(self):
+        self._conn.close()
+
+    def put(self, file_id: str, filename: str, size: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (file_id, filename, size) VALUES (?, ?, ?) "
+                "ON CONFLICT(file_id) DO UPDATE SET filename = excluded.filename, size = excluded.size",
+                (file_id, filename, size))
+
+    def get(self, file_id: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT filename, size FROM meta WHERE file_id = ?", (file_id,)).fetchone()
+        return {"filename": row[0], "size": row[1]} if row else None
+
+    def get_many(self, file_ids: Iterable[str]) -> Dict[str, dict]:
+        # Metadata for every known id among file_ids, a few queries in total
+        ids = list(dict.fromkeys(file_ids))
+        out = {}
+        for i in range(0, len(ids), _BATCH):
+            part = ids[i:i + _BATCH]
+            rows = self._conn.execute(
+                f"SELECT file_id, filename, size FROM meta WHERE file_id IN ({','.join('?' * len(part))})", part)
+            for fid, filename, size in rows:
+                out[fid] = {"filename": filename, "size": size}
+        return out
+
+    def iter_all(self) -> Iterator[dict]:
+        rows = self._conn.execute("SELECT file_id, filename, size FROM meta ORDER BY rowid")
+        for fid, filename, size in rows:
+            yield {"file_id": fid, "filename": filename, "size": size}
+
+    def import_json(self, path: Path) -> int:
+        # Merge a legacy meta.json (entries already present win), then retire the file
+        path = Path(path)
+        meta = read_json(path, default={})
+        rows = [(fid, m["filename"], m["size"]) for fid, m in meta.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO meta (file_id, filename, size) VALUES (?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        # Another process may have migrated it already
+        try:
+            os.replace(path, path.with_name(path.name + ".migrated"))
+        except FileNotFoundError:
+            pass
+        return len(rows)
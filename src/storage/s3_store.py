@@ -0,0 +1,169 @@
+"""
+S3-compatible BlobStore (AWS S3, MinIO, Ceph RGW, ...).
+
+Requires boto3 unless a client is injected (e.g. an in-process fake in tests).
+
+Notes:
+- Blobs larger than part_size are uploaded with multipart upload, parts sent
+  in parallel by up to `workers` threads over a shared connection pool.
+- Large downloads are split into part_size ranged GETs fetched in parallel
+  and written into a local temp file, which open() and view() then serve.
+- Objects are <prefix><file_id>.blob, sidecars <prefix><file_id>.<kind>.
+"""
+
+import mmap
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, Iterator, Optional
+from config.settings import S3_BUCKET, S3_ENDPOINT_URL, S3_PREFIX, S3_PART_SIZE, S3_WORKERS
+from src.util.chunks import rechunk
+
+BLOB_EXT = ".blob"
+_MISSING = ("NoSuchKey", "404", "NotFound")
+
+def _missing(exc: Exception) -> bool:
+    # botocore ClientError for an absent key
+    return getattr(exc, "response", {}).get("Error", {}).get("Code") in _MISSING
+
+class S3Store:
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX, endpoint_url: str | None = S3_ENDPOINT_URL,
+                 part_size: int = S3_PART_SIZE, workers: int = S3_WORKERS, client=None):
+        if not bucket:
+            raise RuntimeError("Missing S3 bucket (set S3_BUCKET)")
+        if client is None:
+            # Imported lazily so boto3 is only needed when actually selected
+            import boto3
+            from botocore.config import Config
+            client = boto3.client("s3", endpoint_url=endpoint_url,
+                                  config=Config(max_pool_connections=workers))
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def _key(self, file_id: str, suffix: str = BLOB_EXT) -> str:
+        return f"{self.prefix}{file_id}{suffix}"
+
+    def _call(self, fn, **kw):
+        # Map "no such key" to FileNotFoundError like the filesystem store
+        try:
+            return fn(Bucket=self.bucket, **kw)
+        except Exception as e:
+            if _missing(e):
+                raise FileNotFoundError(kw.get("Key")) from e
+            raise
+
+    # ---------- writes ----------
+    def put(self, file_id: str, data: bytes) -> str:
+        return self.put_stream(file_id, [data])
+
+    def put_stream(self, file_id: str, chunks: Iterable[bytes]) -> str:
+        # Single PUT for small blobs, parallel multipart upload otherwise
+        key = self._key(file_id)
+        parts = rechunk(chunks, self.part_size)
+        first = next(parts, b"")
+        second = next(parts, None)
+        if second is None:
+            self._call(self.client.put_object, Key=key, Body=first)
+            return f"s3://{self.bucket}/{key}"
+        upload_id = self._call(self.client.create_multipart_upload, Key=key)["UploadId"]
+        try:
+            done, pending = [], deque()
+
+            def send(n, body):
+                r = self._call(self.client.upload_part, Key=key, UploadId=upload_id, PartNumber=n, Body=body)
+                return {"PartNumber": n, "ETag": r["ETag"]}
+
+            def all_parts():
+                yield first
+                yield second
+                yield from parts
+
+            for n, body in enumerate(all_parts(), start=1):
+                # At most `workers` parts buffered in memory at once
+                if len(pending) >= self.workers:
+                    done.append(pending.popleft().result())
+                pending.append(self._pool.submit(send, n, body))
+            done.extend(f.result() for f in pending)
+            self._call(self.client.complete_multipart_upload, Key=key, UploadId=upload_id,
+                       MultipartUpload={"Parts": done})
+        except BaseException:
+            self._call(self.client.abort_multipart_upload, Key=key, UploadId=upload_id)
+            raise
+        return f"s3://{self.bucket}/{key}"
+
+    def put_sidecar(self, file_id: str, kind: str, data: bytes):
+        self._call(self.client.put_object, Key=self._key(file_id, f".{kind}"), Body=data)
+
+    # ---------- reads ----------
+    def _size(self, key: str) -> int:
+        return self._call(self.client.head_object, Key=key)["ContentLength"]
+
+    def _get_range(self, key: str, start: int, end: int) -> bytes:
+        # Bytes [start, end) of an object (end exclusive, clamped by the caller)
+        r = self._call(self.client.get_object, Key=key, Range=f"bytes={start}-{end - 1}")
+        return r["Body"].read()
+
+    def get_range(self, file_id: str, offset: int, length: int) -> bytes:
+        key = self._key(file_id)
+        end = min(offset + length, self._size(key))
+        if end <= offset:
+            return b""
+        return self._get_range(key, offset, end)
+
+    def _download(self, file_id: str) -> BinaryIO:
+        # Fetch the blob into an anonymous temp file with parallel ranged GETs
+        key = self._key(file_id)
+        size = self._size(key)
+        out = tempfile.TemporaryFile()
+        try:
+            fd = out.fileno()
+            os.ftruncate(fd, size)
+
+            def fetch(start):
+                os.pwrite(fd, self._get_range(key, start, min(start + self.part_size, size)), start)
+
+            for f in [self._pool.submit(fetch, s) for s in range(0, size, self.part_size)]:
+                f.result()
+        except BaseException:
+            out.close()
+            raise
+        out.seek(0)
+        return out
+
+    def get(self, file_id: str) -> bytes:
+        with self._download(file_id) as f:
+            return f.read()
+
+    def open(self, file_id: str) -> BinaryIO:
+        return self._download(file_id)
+
+    def view(self, file_id: str) -> memoryview:
+        # mmap of the downloaded temp file; the file is unlinked, so it goes away with the view
+        with self._download(file_id) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def get_sidecar(self, file_id: str, kind: str) -> Optional[bytes]:
+        try:
+            return self._call(self.client.get_object, Key=self._key(file_id, f".{kind}"))["Body"].read()
+        except FileNotFoundError:
+            return None
+
+    def iter_ids(self) -> Iterator[str]:
+        # file_ids of stored blobs, one listing page at a time
+        kw = {"Prefix": self.prefix}
+        while True:
+            page = self._call(self.client.list_objects_v2, **kw)
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(self.prefix):]
+                if name.endswith(BLOB_EXT):
+                    yield name[:-len(BLOB_EXT)]
+            if not page.get("IsTruncated"):
+                return
+            kw["ContinuationToken"] = page["NextContinuationToken"]
@@ -0,0 +1,12 @@
+from typing import Iterable, Iterator
+
+def rechunk(pieces: Iterable[bytes], size: int) -> Iterator[bytes]:
+    # Regroup variable-sized pieces into exact `size`-byte chunks (last may be shorter)
+    buf = bytearray()
+    for piece in pieces:
+        buf += piece
+        while len(buf) >= size:
+            yield bytes(buf[:size])
+            del buf[:size]
+    if buf:
+        yield bytes(buf)
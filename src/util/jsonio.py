@@ -1,4 +1,6 @@
+import os
 import json
+import tempfile
 from typing import Any
 from pathlib import Path
 
@@ -14,3 +16,17 @@ def write_json(path: str | Path, obj: Any, indent: int = 2):
     p.parent.mkdir(parents=True, exist_ok=True)
     with p.open("w", encoding="utf-8") as f:
         json.dump(obj, f, indent=indent)
+
+def write_json_atomic(path: str | Path, obj: Any, indent: int | None = None):
+    # Write via a uniquely named temp file + rename so readers never see a partial
+    # file and concurrent writers never share (or steal) each other's temp file
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=f".{p.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=indent)
+        os.replace(tmp, p)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+import pytest
+from src.blockchain.local_chain import LocalChain
+from src.core.keystore import ensure_user_keys, load_user_key
+from src.storage import cloud
+from src.storage.fs_store import FileStore
+from src.storage.meta_store import MetaStore
+
+@pytest.fixture(autouse=True)
+def isolated_cloud(tmp_path, monkeypatch):
+    # Blobs and metadata go to a per-test directory instead of the real data/cloud
+    root = tmp_path / "cloud"
+    meta = MetaStore(root / "meta.db")
+    monkeypatch.setattr(cloud, "_store", meta)
+    monkeypatch.setattr(cloud, "_blob_store", FileStore(root))
+    monkeypatch.setattr(cloud, "_cache", None)
+    monkeypatch.setattr(cloud, "BLOB_CACHE_BYTES", 0)
+    yield root
+    meta.close()
+
+@pytest.fixture(scope="session")
+def keys_dir(tmp_path_factory):
+    # Test users' keys, generated once per session outside data/keys
+    return tmp_path_factory.mktemp("keys")
+
+def _user(keys_dir, user_id: str) -> SimpleNamespace:
+    paths = ensure_user_keys(keys_dir, user_id)
+    keys = {kind: load_user_key(paths, kind) for kind in
+            ("ecdsa_priv", "ecdsa_pub", "rsa_priv", "rsa_pub", "x25519_priv", "x25519_pub")}
+    return SimpleNamespace(id=user_id, paths=paths, **keys)
+
+@pytest.fixture(scope="session")
+def owner(keys_dir):
+    return _user(keys_dir, "owner_test")
+
+@pytest.fixture(scope="session")
+def requester(keys_dir):
+    return _user(keys_dir, "requester_test")
+
+@pytest.fixture
+def make_user(keys_dir):
+    # Extra users beyond owner/requester
+    return lambda user_id: _user(keys_dir, user_id)
+
+@pytest.fixture
+def chain(tmp_path):
+    return LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock")
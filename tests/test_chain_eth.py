@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import pytest
+
+pytest.importorskip("web3")
+from src.blockchain.eth_chain import EthChain
+
+CONTRACT = "0x" + "11" * 20
+
+class _FakeDevChain:
+    # In-process stand-in for the Hardhat/Ganache JSON-RPC calls EthChain makes
+    def __init__(self):
+        self.eth = self
+        self.accounts = ["0x" + "22" * 20]
+        self.mined, self.pending = [], []
+        self.max_pending = 0
+        self.lock = threading.Lock()
+
+    def is_connected(self):
+        return True
+
+    def contract(self, address, abi):
+        return _FakeContract(self)
+
+    def get_transaction_count(self, account, block="latest"):
+        with self.lock:
+            return len(self.mined) + (len(self.pending) if block == "pending" else 0)
+
+    def send_transaction(self, tx):
+        with self.lock:
+            assert tx["nonce"] == len(self.mined) + len(self.pending), "nonce gap"
+            tx_hash = os.urandom(32)
+            self.pending.append((tx_hash, tx["data"]))
+            self.max_pending = max(self.max_pending, len(self.pending))
+            return tx_hash
+
+    def wait_for_transaction_receipt(self, tx_hash, timeout=120):
+        # Mining is instant once someone asks for a receipt
+        with self.lock:
+            while self.pending and tx_hash not in [h for h, _ in self.mined]:
+                self.mined.append(self.pending.pop(0))
+            return {"status": 1}
+
+class _FakeContract:
+    def __init__(self, node):
+        self.functions = self
+        self.node = node
+
+    def append(self, payload):
+        return _Call(lambda params: dict(params, data=payload))
+
+    def getAll(self):
+        return _Call(None, lambda: [d for _, d in self.node.mined])
+
+class _Call:
+    def __init__(self, build, call=None):
+        self._build, self._call = build, call
+
+    def build_transaction(self, params):
+        return self._build(params)
+
+    def call(self):
+        return self._call()
+
+def _chain(tmp_path, node, depth):
+    abi = tmp_path / "abi.json"
+    abi.write_text("[]")
+    return EthChain(contract_address=CONTRACT, abi_path=abi, w3=node, pipeline_depth=depth)
+
+def test_pipelined_submission_and_flush(tmp_path):
+    # Several transactions stay in flight with locally managed nonces
+    node = _FakeDevChain()
+    chain = _chain(tmp_path, node, depth=4)
+    hashes = [chain.append_event({"type":"A","n":i}) for i in range(10)]
+    chain.flush(timeout=5)
+    assert len(set(hashes)) == 10
+    assert node.max_pending > 1
+    assert [json.loads(d)["n"] for d in node.mined] == list(range(10))
+    assert [e["event"]["n"] for e in chain.get_events_since(8)] == [8, 9]
+
+def test_unpipelined_waits_for_each_receipt(tmp_path):
+    # Default mode keeps one transaction in flight at a time
+    node = _FakeDevChain()
+    chain = _chain(tmp_path, node, depth=0)
+    chain.append_events([{"type":"A"}, {"type":"B"}])
+    assert node.max_pending == 1 and len(node.mined) == 2
+
+def test_event_queries_scan_the_contract(tmp_path):
+    # The GUI's query methods work on the Ethereum backend too
+    chain = _chain(tmp_path, _FakeDevChain(), depth=0)
+    chain.append_events([{"type": "UPLOAD", "file_id": "f1", "owner_id": "o"},
+                         {"type": "ACCESS_REQUEST", "file_id": "f1", "requester_id": "r"},
+                         {"type": "ACCESS_REQUEST", "file_id": "f2", "requester_id": "r"},
+                         {"type": "KEY_SHARE", "file_id": "f1", "requester_id": "r", "n": 1},
+                         {"type": "KEY_SHARE", "file_id": "f1", "requester_id": "r", "n": 2}])
+    assert [b["event"]["file_id"] for b in chain.requests_for_owner("o")] == ["f1"]
+    assert chain.latest_event(type="KEY_SHARE", file_id="f1")["n"] == 2
+    assert chain.first_event(type="UPLOAD", file_id="f2") is None
+    assert len(chain.find_events(requester_id="r")) == 4 and chain.find_first_invalid() is None
@@ -1,8 +1,9 @@
 from pathlib import Path
 import shutil
 import json
+from src.blockchain.base import scan_events, scan_requests_for_owner
 from src.blockchain.local_chain import LocalChain, LEDGER_FILE
-from src.util.jsonio import read_json, write_json
+from src.util.jsonio import read_json, write_json, write_json_atomic
 
 def _fresh_ledger(tmp_path: Path):
     # Create a LocalChain instance with a temporary ledger file
@@ -30,3 +31,314 @@ def test_detect_tamper(tmp_path):
     data[1]["event"]["type"] = "X"  # tamper with payload
     write_json(ledger, data)
     assert chain.verify_chain() is False
+
+def test_jsonl_append_and_verify(tmp_path):
+    # JSONL ledgers append one line per block and stay verifiable
+    ledger = tmp_path / "ledger.jsonl"
+    chain = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    h1 = chain.append_event({"type":"UPLOAD","file_id":"f1"})
+    h2 = chain.append_event({"type":"ACCESS_REQUEST","file_id":"f1","requester_id":"r1"})
+    assert chain.verify_chain()
+    lines = ledger.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])["prev"] == h1
+    assert chain.get_events()[1]["hash"] == h2
+
+def test_jsonl_recovers_torn_tail(tmp_path):
+    # A partially written last line is dropped before the next append
+    ledger = tmp_path / "ledger.jsonl"
+    chain = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    h1 = chain.append_event({"type":"A"})
+    with ledger.open("ab") as f:
+        f.write(b'{"ts":1,"prev":')
+    chain.append_event({"type":"B"})
+    evs = chain.get_events()
+    assert [e["event"]["type"] for e in evs] == ["A", "B"]
+    assert evs[1]["prev"] == h1
+    assert chain.verify_chain()
+
+def test_jsonl_migrates_legacy_ledger(tmp_path):
+    # Opening a .jsonl ledger next to ledger.json migrates it once
+    legacy, _ = _fresh_ledger(tmp_path)
+    legacy.append_event({"type":"A"})
+    h2 = legacy.append_event({"type":"B"})
+    chain = LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock")
+    assert [e["hash"] for e in chain.get_events()] == [e["hash"] for e in legacy.get_events()]
+    h3 = chain.append_event({"type":"C"})
+    evs = chain.get_events()
+    assert evs[2]["prev"] == h2 and evs[2]["hash"] == h3
+    assert chain.verify_chain()
+
+def test_incremental_verify_uses_checkpoint(tmp_path):
+    # Verification records a checkpoint and later only checks newer blocks
+    chain, ledger = _fresh_ledger(tmp_path)
+    chain.append_event({"type":"A"})
+    chain.append_event({"type":"B"})
+    assert chain.verify_chain()
+    cp = read_json(chain.checkpoint_path, None)
+    assert cp["height"] == 2
+    # Tampering before the checkpoint is only caught by a full verification
+    data = read_json(ledger, [])
+    data[0]["event"]["type"] = "X"
+    write_json(ledger, data)
+    chain.append_event({"type":"C"})
+    assert chain.verify_chain()
+    assert chain.verify_chain(full=True) is False
+
+def test_incremental_verify_detects_checkpoint_change(tmp_path):
+    # Changing the checkpoint block itself falls back to a full check
+    ledger = tmp_path / "ledger.jsonl"
+    chain = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    chain.append_event({"type":"A"})
+    assert chain.verify_chain()
+    chain.append_event({"type":"B"})
+    assert chain.verify_chain()
+    assert read_json(chain.checkpoint_path, None)["height"] == 2
+    ledger.write_text(ledger.read_text().replace('"B"', '"X"'))
+    assert chain.verify_chain() is False
+
+def _seed_sharing_events(chain):
+    # Two owners, two files, requests and a re-share
+    chain.append_event({"type":"UPLOAD","file_id":"f1","owner_id":"o1"})
+    chain.append_event({"type":"UPLOAD","file_id":"f2","owner_id":"o2"})
+    chain.append_event({"type":"ACCESS_REQUEST","file_id":"f1","requester_id":"r1"})
+    chain.append_event({"type":"ACCESS_REQUEST","file_id":"f2","requester_id":"r1"})
+    chain.append_event({"type":"KEY_SHARE","file_id":"f1","owner_id":"o1","requester_id":"r1","wrapped_key":"aa"})
+    chain.append_event({"type":"KEY_SHARE","file_id":"f1","owner_id":"o1","requester_id":"r1","wrapped_key":"bb"})
+
+def test_index_queries(tmp_path):
+    # Index lookups match a linear scan for both ledger formats
+    for name in ("ledger.json", "ledger.jsonl"):
+        chain = LocalChain(ledger_path=tmp_path / name.replace(".", "_") / name, lock_path=tmp_path / "ledger.lock")
+        _seed_sharing_events(chain)
+        assert chain.latest_event(type="KEY_SHARE", file_id="f1", requester_id="r1")["wrapped_key"] == "bb"
+        assert chain.first_event(type="UPLOAD", file_id="f2")["owner_id"] == "o2"
+        assert [b["event"]["file_id"] for b in chain.requests_for_owner("o1")] == ["f1"]
+        assert len(chain.find_events(type="KEY_SHARE", requester_id="r1")) == 2
+        assert chain.latest_event(type="KEY_SHARE", requester_id="nobody") is None
+        blocks = chain.get_events()
+        assert chain.requests_for_owner("o1") == scan_requests_for_owner(blocks, "o1")
+        assert chain.find_events(type="KEY_SHARE", file_id="f1") == scan_events(blocks, type="KEY_SHARE", file_id="f1")
+
+def test_index_persists_and_catches_up(tmp_path):
+    # A saved index is reused and extended with blocks appended by other writers
+    ledger = tmp_path / "ledger.jsonl"
+    chain = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    _seed_sharing_events(chain)
+    chain.index
+    chain.save_index()
+    other = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    other.append_event({"type":"ACCESS_REQUEST","file_id":"f1","requester_id":"r2"})
+    fresh = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    assert [b["event"]["requester_id"] for b in fresh.requests_for_owner("o1")] == ["r1", "r2"]
+    assert len(chain.requests_for_owner("o1")) == 2
+    # A rewritten ledger invalidates the stale index
+    ledger.write_text("")
+    assert fresh.requests_for_owner("o1") == []
+
+def test_json_ledger_parsed_once_per_version(tmp_path, monkeypatch):
+    # Queries and cursor polls on a JSON ledger share one parse until the file changes, and write no index sidecar
+    import src.blockchain.local_chain as lc
+    chain, ledger = _fresh_ledger(tmp_path)
+    _seed_sharing_events(chain)
+    other = LocalChain(ledger_path=ledger, lock_path=tmp_path / "ledger.lock")
+    parses = []
+    real = lc.read_json
+    monkeypatch.setattr(lc, "read_json", lambda *a, **kw: parses.append(1) or real(*a, **kw))
+    for c in (chain, other):
+        c.first_event(type="UPLOAD", file_id="f1")
+        c.latest_event(type="KEY_SHARE", file_id="f1", requester_id="r1")
+        c.requests_for_owner("o1")
+        assert c.get_events_since(c.height()) == []
+    assert len(parses) == 1  # other had never read the ledger; chain kept its own write
+    other.append_event({"type":"ACCESS_REQUEST","file_id":"f1","requester_id":"r2"})
+    assert len(chain.requests_for_owner("o1")) == 2 and chain.height() == 7
+    assert [b["event"]["requester_id"] for b in chain.get_events_since(6)] == ["r2"]
+    assert len(parses) == 2 and not chain.index_path.exists()
+
+def test_append_events_batch(tmp_path):
+    # A batch is chained in order and written in one go, for both formats
+    for name in ("ledger.json", "ledger.jsonl"):
+        chain = LocalChain(ledger_path=tmp_path / name.replace(".", "_") / name, lock_path=tmp_path / "ledger.lock")
+        h0 = chain.append_event({"type":"A"})
+        hashes = chain.append_events([{"type":"B"}, {"type":"C"}, {"type":"D"}])
+        evs = chain.get_events()
+        assert [e["hash"] for e in evs] == [h0] + hashes
+        assert evs[1]["prev"] == h0
+        assert chain.verify_chain(full=True)
+        assert chain.append_events([]) == []
+
+def test_group_commit_coalesces_threads(tmp_path):
+    # Concurrent appends on a shared instance land in fewer batched writes
+    import threading
+    chain = LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock",
+                       group_commit_ms=50)
+    batches = []
+    real = chain.append_events
+    def counting(events):
+        batches.append(len(events))
+        return real(events)
+    chain.append_events = counting
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(chain.append_event({"type":"T","n":i})))
+               for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sum(batches) == 8 and len(batches) < 8
+    assert sorted(results) == sorted(e["hash"] for e in chain.get_events())
+    assert chain.verify_chain(full=True)
+
+def _segmented(tmp_path, **kw):
+    # JSONL chain that seals a segment every 3 blocks
+    return LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock",
+                      segment_max_blocks=3, **kw)
+
+def test_segments_roll_over_and_read_back(tmp_path):
+    # Sealed segments are transparent to readers, indexes and verification
+    chain = _segmented(tmp_path)
+    hashes = [chain.append_event({"type":"UPLOAD","file_id":f"f{i}","owner_id":"o1"}) for i in range(7)]
+    seals = chain._log.seals()
+    assert [s["count"] for s in seals] == [3, 3]
+    assert seals[1]["first_prev"] == seals[0]["last_hash"] == hashes[2]
+    assert (tmp_path / "ledger.jsonl.segments" / "000002.jsonl").exists()
+    assert len((tmp_path / "ledger.jsonl").read_text().splitlines()) == 1
+    assert [e["hash"] for e in chain.get_events()] == hashes
+    assert chain.first_event(type="UPLOAD", file_id="f4")["file_id"] == "f4"
+    assert chain.verify_chain() and chain.verify_chain(full=True)
+
+def test_tampered_sealed_segment_detected(tmp_path):
+    # Editing a sealed segment breaks its digest
+    chain = _segmented(tmp_path)
+    for i in range(4):
+        chain.append_event({"type":"A","n":i})
+    seg = tmp_path / "ledger.jsonl.segments" / "000001.jsonl"
+    seg.chmod(0o644)
+    seg.write_text(seg.read_text().replace('"n":1', '"n":9'))
+    assert chain.verify_chain() is False
+    assert chain.verify_chain(full=True) is False
+
+def test_merkle_proofs_over_ledger(tmp_path):
+    # Block inclusion proofs verify against an earlier published root
+    chain = LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock")
+    hashes = [chain.append_event({"type":"A","n":i}) for i in range(5)]
+    root5 = chain.merkle_root()
+    chain.append_event({"type":"A","n":5})
+    assert chain.merkle_root() != root5 and chain.merkle_root(5) == root5
+    proof = chain.prove(3, size=5)
+    assert proof["leaf"] == hashes[3]
+    assert LocalChain.verify_proof(hashes[3], proof, root5)
+    assert not LocalChain.verify_proof(hashes[2], proof, root5)
+
+def test_parallel_verify_reports_first_bad_block(tmp_path):
+    # Parallel verification finds the first tampered index in a JSON ledger
+    chain, ledger = _fresh_ledger(tmp_path)
+    chain.append_events([{"type":"A","n":i} for i in range(40)])
+    assert chain.find_first_invalid(workers=2) is None
+    evs = chain.get_events()
+    evs[23]["event"]["n"] = -1
+    write_json(ledger, evs)
+    assert chain.find_first_invalid(workers=2) == 23
+    evs[5]["prev"] = "x"
+    write_json(ledger, evs)
+    assert chain.find_first_invalid(workers=1) == 5
+
+def test_parallel_verify_segmented_jsonl(tmp_path):
+    # Ranges span sealed segments and the tail; indices are global
+    chain = LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock",
+                       segment_max_blocks=7)
+    for i in range(0, 40, 5):
+        chain.append_events([{"type":"A","n":n} for n in range(i, i + 5)])
+    chain.append_events([{"type":"A","n":n} for n in range(40, 43)])
+    assert len(chain._log.seals()) == 4
+    assert chain.find_first_invalid(workers=3) is None
+    ledger = chain.ledger_path
+    ledger.write_text(ledger.read_text().replace('"n":41', '"n":-1'))
+    assert chain.find_first_invalid(workers=3) == 41
+    seg = tmp_path / "ledger.jsonl.segments" / "000002.jsonl"
+    seg.chmod(0o644)
+    seg.write_text(seg.read_text().replace('"n":12', '"n":-1'))
+    assert chain.find_first_invalid(workers=3) == 12
+
+def test_parallel_verify_worker_pool_slices(tmp_path, monkeypatch):
+    # Forced through the spawn pool: JSON slices parse alone, and a non-write_json layout falls back
+    import src.blockchain.parallel_verify as pv
+    monkeypatch.setattr(pv, "MIN_PARALLEL_BYTES", 0)
+    monkeypatch.setattr(pv.os, "cpu_count", lambda: 2)
+    chain, ledger = _fresh_ledger(tmp_path)
+    chain.append_events([{"type":"A","n":i,"s":"}\n  {\n"} for i in range(30)])
+    assert len(pv._split_json_array(ledger, 4)) == 4
+    assert chain.find_first_invalid(workers=2) is None
+    evs = chain.get_events()
+    evs[17]["event"]["n"] = -1
+    write_json(ledger, evs)
+    assert chain.find_first_invalid(workers=2) == 17
+    ledger.write_text(json.dumps(evs))
+    assert pv._split_json_array(ledger, 4) is None
+    assert chain.find_first_invalid(workers=2) == 17
+
+def test_get_events_since_and_follow(tmp_path):
+    # Cursor reads return only the delta; follow yields blocks as they arrive
+    import threading
+    chain = LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock")
+    chain.append_events([{"type":"A","n":i} for i in range(3)])
+    assert chain.height() == 3
+    assert [b["event"]["n"] for b in chain.get_events_since(1)] == [1, 2]
+    assert chain.get_events_since(3) == []
+
+    stop = threading.Event()
+    seen = []
+    def consume():
+        for b in chain.follow(height=2, poll_interval=0.01, stop=stop):
+            seen.append(b["event"]["n"])
+            if len(seen) == 3:
+                stop.set()
+    t = threading.Thread(target=consume); t.start()
+    LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock").append_events(
+        [{"type":"A","n":3}, {"type":"A","n":4}])
+    t.join(timeout=5)
+    assert seen == [2, 3, 4]
+
+def test_concurrent_sidecar_writes_stay_whole(tmp_path):
+    # Atomic JSON writers racing on one sidecar never fail or leave a torn file
+    import threading
+    (tmp_path / "side").mkdir()
+    path, errors = tmp_path / "side" / "ledger.jsonl.index.json", []
+    def writer(n):
+        try:
+            for i in range(100):
+                write_json_atomic(path, {"writer": n, "i": i, "pad": "x" * 5000})
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not errors and read_json(path, default=None)["i"] == 99
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+def test_read_paths_skip_sidecar_saves_while_a_writer_holds_the_lock(tmp_path):
+    # Index/checkpoint saves from read paths never wait on or race the ledger lock
+    from filelock import FileLock
+    chain = LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock")
+    chain.append_events([{"type": "A", "n": i} for i in range(3)])
+    with FileLock(str(tmp_path / "ledger.lock")):
+        assert chain.verify_chain() and not chain.checkpoint_path.exists()
+    assert chain.verify_chain() and read_json(chain.checkpoint_path, default=None)["height"] == 3
+
+def test_make_chain_shares_one_instance(monkeypatch, tmp_path):
+    # Call sites get the same chain, so concurrent appends from threads reach one group committer
+    import threading
+    from src.blockchain import factory
+    monkeypatch.setattr(factory, "_shared", {})
+    monkeypatch.setattr(factory, "LocalChain",
+                        lambda: LocalChain(ledger_path=tmp_path / "ledger.jsonl", lock_path=tmp_path / "ledger.lock",
+                                           group_commit_ms=50))
+    chain = factory.make_chain("local")
+    assert factory.make_chain("local") is chain and factory.make_chain("local", shared=False) is not chain
+    writes = []
+    real = chain.append_events
+    monkeypatch.setattr(chain, "append_events", lambda evs: writes.append(len(evs)) or real(evs))
+    threads = [threading.Thread(target=lambda i=i: factory.make_chain("local").append_event({"type":"A","n":i}))
+               for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sum(writes) == 8 and len(writes) < 8 and chain.verify_chain(full=True)
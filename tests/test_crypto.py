@@ -35,3 +35,56 @@ def test_rsa_wrap_unwrap():
     wrapped = crypto.rsa_wrap(rsa_pub, key)
     unwrapped = crypto.rsa_unwrap(rsa_priv, wrapped)
     assert key == unwrapped
+
+def test_chunked_aes_gcm_roundtrip_and_tamper():
+    # Chunks decrypt in order; reordering, truncation and extension are rejected
+    key, base = os.urandom(32), os.urandom(12)
+    parts = [os.urandom(64) for _ in range(4)]
+    sealed = list(crypto.aes_encrypt_chunks(key, base, parts))
+    assert all(len(c) == 64 + crypto.TAG_BYTES for c in sealed)
+    assert b"".join(crypto.aes_decrypt_chunks(key, base, sealed)) == b"".join(parts)
+    for bad in ([sealed[1], sealed[0]] + sealed[2:], sealed[:-1], sealed + [sealed[-1]]):
+        with pytest.raises(Exception):
+            list(crypto.aes_decrypt_chunks(key, base, bad))
+
+def test_chunked_empty_stream():
+    # An empty plaintext still produces one authenticated final chunk
+    key, base = os.urandom(32), os.urandom(12)
+    sealed = list(crypto.aes_encrypt_chunks(key, base, []))
+    assert len(sealed) == 1 and b"".join(crypto.aes_decrypt_chunks(key, base, sealed)) == b""
+    with pytest.raises(Exception):
+        list(crypto.aes_decrypt_chunks(key, base, []))
+
+def test_helpers_accept_memoryviews():
+    # Hashing, signing and AES-GCM work on buffer slices without copying to bytes
+    key, nonce, ct = crypto.aes_encrypt(memoryview(b"buffered payload"), aad=memoryview(b"m"))
+    view = memoryview(bytearray(b"xx" + ct))[2:]
+    assert crypto.aes_decrypt(key, nonce, view, aad=b"m") == b"buffered payload"
+    priv = crypto.gen_ecdsa_p256()
+    crypto.verify_ecdsa(priv.public_key(), view, crypto.sign_ecdsa(priv, bytes(view)))
+    sealed = list(crypto.aes_encrypt_chunks(key, nonce, [memoryview(b"ab")], aad=memoryview(b"z")))
+    assert list(crypto.aes_decrypt_chunks(key, nonce, [memoryview(sealed[0])], aad=b"z")) == [b"ab"]
+
+def test_x25519_wrap_unwrap():
+    # X25519 wrap is bound to the recipient and much smaller than RSA-OAEP
+    priv, other = crypto.gen_x25519(), crypto.gen_x25519()
+    key = os.urandom(32)
+    scheme, wrapped = crypto.wrap_key(priv.public_key(), key)
+    assert scheme == crypto.WRAP_X25519 and len(wrapped) == 80
+    assert crypto.x25519_unwrap(priv, wrapped) == key
+    with pytest.raises(Exception):
+        crypto.x25519_unwrap(other, wrapped)
+    assert crypto.wrap_key(crypto.gen_rsa().public_key(), key)[0] == crypto.WRAP_RSA
+
+def test_decompress_stream_caps_each_piece():
+    # A small, highly compressed input expands in bounded pieces, never all at once
+    from src.core.compress import compress_stream, decompress_stream
+    bomb = b"".join(compress_stream([bytes(1 << 20)] * 64))
+    assert len(bomb) < 100_000
+    total = 0
+    for piece in decompress_stream([bomb[i:i + 4096] for i in range(0, len(bomb), 4096)], max_out=65536):
+        assert 0 < len(piece) <= 65536 and not any(piece[:16])
+        total += len(piece)
+    assert total == 64 << 20
+    with pytest.raises(ValueError):
+        list(decompress_stream([bomb[:-10]], max_out=65536))
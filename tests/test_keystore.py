@@ -0,0 +1,72 @@
+import os
+import time
+from src.core import keystore
+from src.core.keystore import clear_key_cache, ensure_user_keys, load_user_key, load_user_keys
+
+def test_keys_are_parsed_once_per_file_version(tmp_path, monkeypatch):
+    # Repeat loads reuse parsed keys until the file changes or the cache is flushed
+    paths = ensure_user_keys(tmp_path, "alice")
+    parsed = []
+    real = keystore.load_pub_pem
+    monkeypatch.setattr(keystore, "load_pub_pem", lambda data: parsed.append(1) or real(data))
+    a = load_user_key(paths, "rsa_pub")
+    assert load_user_key(paths, "rsa_pub") is a and len(parsed) == 1
+
+    other = ensure_user_keys(tmp_path, "bob")
+    paths.rsa_pub.write_bytes(other.rsa_pub.read_bytes())
+    os.utime(paths.rsa_pub, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert load_user_key(paths, "rsa_pub") is not a and len(parsed) == 2
+    clear_key_cache()
+    load_user_key(paths, "rsa_pub")
+    assert len(parsed) == 3
+
+def test_load_user_keys_is_lazy_and_ensure_skips_checks(tmp_path, monkeypatch):
+    # Only the requested key is read; known users skip the existence checks
+    paths = ensure_user_keys(tmp_path, "carol")
+    load_user_key(paths, "ecdsa_pub")
+    paths.rsa_priv.unlink()
+    assert ensure_user_keys(tmp_path, "carol") == paths and not paths.rsa_priv.exists()
+    clear_key_cache()
+    ensure_user_keys(tmp_path, "carol")
+    assert len(load_user_keys(paths)) == 4
+
+def test_ensure_user_keys_takes_pool_pairs(tmp_path, monkeypatch):
+    # A ready pooled pair is written as-is; password-protected keys are re-serialized
+    from src.core import keypool
+    pairs = {k: keypool.generate_pair(k) for k in keypool.KINDS}
+    monkeypatch.setattr(keypool, "take", lambda kind: pairs.get(kind))
+    paths = ensure_user_keys(tmp_path, "dave")
+    assert paths.rsa_pub.read_bytes() == pairs["rsa"][1]
+    assert paths.ecdsa_priv.read_bytes() == pairs["ecdsa"][0]
+    locked = ensure_user_keys(tmp_path, "erin", password=b"pw")
+    assert locked.rsa_priv.read_bytes() != pairs["rsa"][0]
+    assert load_user_key(locked, "rsa_priv", b"pw").public_key().public_numbers() == \
+        load_user_key(paths, "rsa_pub").public_numbers()
+
+def test_key_pool_take_refill_close():
+    # Ready pairs are handed out and replaced; after close the pool hands out nothing
+    from src.core import keypool
+    from src.core.crypto import load_priv_pem, pem_pub
+    pool = keypool.KeyPool(depth=1, workers=1)
+    try:
+        deadline = time.monotonic() + 60
+        while pool.ready("ecdsa") < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.take("x25519") is None
+        priv, pub = pool.take("ecdsa")
+        assert pem_pub(load_priv_pem(priv).public_key()) == pub
+        assert len(pool._pending["ecdsa"]) == 1  # refilled to depth
+    finally:
+        pool.close()
+    assert pool.take("ecdsa") is None and pool.take("rsa") is None
+    keypool.stop_pool()
+    assert keypool.start_pool(0) is None and keypool.take("rsa") is None
+
+def test_provision_users_in_worker_processes(tmp_path):
+    # Bulk provisioning creates distinct keys and skips users that already have them
+    ensure_user_keys(tmp_path, "u1")
+    created = keystore.provision_users(tmp_path, ["u1", "u2", "u3"], workers=2)
+    assert created == ["u2", "u3"]
+    pubs = {load_user_key(keystore.user_key_paths(tmp_path, u), "rsa_pub").public_numbers().n
+            for u in ("u1", "u2", "u3")}
+    assert len(pubs) == 3
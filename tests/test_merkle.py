@@ -0,0 +1,29 @@
+import os
+from src.core.merkle import MerkleTree, verify_proof
+
+def test_proofs_for_every_leaf_and_size():
+    # Every leaf verifies against roots of the current and all earlier sizes
+    leaves = [os.urandom(32) for _ in range(13)]
+    tree = MerkleTree(leaves)
+    for size in range(1, len(leaves) + 1):
+        root = tree.root(size)
+        assert root == MerkleTree(leaves[:size]).root()
+        for i in range(size):
+            assert verify_proof(leaves[i], tree.prove(i, size), root)
+
+def test_proof_rejects_wrong_leaf_or_root():
+    # A proof does not transfer to other data, positions or roots
+    leaves = [os.urandom(32) for _ in range(6)]
+    tree = MerkleTree(leaves)
+    proof = tree.prove(2)
+    assert not verify_proof(leaves[3], proof, tree.root())
+    assert not verify_proof(leaves[2], dict(proof, index=3), tree.root())
+    assert not verify_proof(leaves[2], proof, tree.root(5))
+
+def test_parallel_leaf_hashing_matches_tree():
+    # Thread-pool leaf hashes come back in order and give the same root
+    from src.core.treehash import hash_leaves, tree_root
+    chunks = [os.urandom(5000) for _ in range(37)]
+    pairs = list(hash_leaves(iter(chunks), workers=4))
+    assert [c for c, _ in pairs] == chunks
+    assert tree_root([h for _, h in pairs]) == MerkleTree(chunks).root()
@@ -0,0 +1,71 @@
+import json
+import pytest
+from src.core import owner_keys
+from src.core.crypto import gen_x25519
+from src.core.owner_keys import OwnerKeyStore, owner_key_store
+
+def test_store_imports_legacy_json_and_batches_lookups(tmp_path):
+    # _aes_keys.json is merged on first open and retired; lookups are by primary key
+    legacy = tmp_path / "_aes_keys.json"
+    legacy.write_text(json.dumps({"f1": "11" * 32, "f2": "22" * 16}), encoding="utf-8")
+    store = OwnerKeyStore(tmp_path / "aes_keys.db", legacy_json=legacy)
+    assert not legacy.exists() and (tmp_path / "_aes_keys.json.migrated").exists()
+    store.put("f3", b"\x33" * 32)
+    store.put("f1", b"\x44" * 32)
+    assert store.get("f1") == b"\x44" * 32 and store.get("missing") is None
+    assert store.get_many(["f2", "f3", "missing", "f2"]) == {"f2": b"\x22" * 16, "f3": b"\x33" * 32}
+    assert len(OwnerKeyStore(tmp_path / "aes_keys.db")) == 3
+
+def test_wrapped_entries_need_the_owner_key(tmp_path):
+    # With wrapping on, the database never holds raw AES keys
+    priv = gen_x25519()
+    store = OwnerKeyStore(tmp_path / "aes_keys.db", wrap_pub=priv.public_key(), unwrap_priv=priv)
+    key = b"\x55" * 32
+    store.put("f1", key)
+    assert store.get_many(["f1"]) == {"f1": key}
+    assert key not in (tmp_path / "aes_keys.db").read_bytes() + (tmp_path / "aes_keys.db-wal").read_bytes()
+    with pytest.raises(ValueError):
+        OwnerKeyStore(tmp_path / "aes_keys.db").get("f1")
+
+def test_owner_key_store_is_shared_per_owner(tmp_path, monkeypatch):
+    monkeypatch.setattr(owner_keys, "_stores", {})
+    keys, stores = tmp_path / "keys", tmp_path / "stores"
+    store = owner_key_store(keys, "owner1", wrap=True, store_dir=stores)
+    assert owner_key_store(keys, "owner1", wrap=True, store_dir=stores) is store
+    store.put("f1", b"\x66" * 32)
+    assert owner_key_store(keys, "owner1", wrap=False, store_dir=stores).get("f1") == b"\x66" * 32
+    # The store lives apart from the private keys it is wrapped under
+    assert store.db_path.parent == stores and not list(keys.glob("**/*.db"))
+
+def test_corrupt_legacy_json_is_logged_and_skipped(tmp_path, caplog):
+    # An unreadable _aes_keys.json does not stop the store from opening and is left in place
+    for i, text in enumerate(('{"f1": "11', '{"f1": "zz"}', '["f1"]')):
+        legacy = tmp_path / f"_aes_keys{i}.json"
+        legacy.write_text(text, encoding="utf-8")
+        store = OwnerKeyStore(tmp_path / f"aes_keys{i}.db", legacy_json=legacy)
+        assert len(store) == 0 and legacy.exists()
+    assert sum("unreadable legacy key file" in r.getMessage() for r in caplog.records) == 3
+
+def test_wrapping_key_can_be_password_protected(tmp_path, monkeypatch):
+    # The owner's X25519 private key may be encrypted at rest; the store is opened with its password
+    from src.core.keystore import ensure_user_keys
+    monkeypatch.setattr(owner_keys, "_stores", {})
+    ensure_user_keys(tmp_path / "keys", "owner2", password=b"pw")
+    store = owner_key_store(tmp_path / "keys", "owner2", wrap=True, store_dir=tmp_path / "stores", password=b"pw")
+    store.put("f1", b"\x88" * 32)
+    assert store.get("f1") == b"\x88" * 32
+
+def test_unwrapped_store_opens_without_the_key_password(tmp_path, monkeypatch):
+    # The private key is only loaded (and its password needed) once a wrapped entry is read
+    from src.core.keystore import ensure_user_keys
+    monkeypatch.setattr(owner_keys, "_stores", {})
+    keys, stores = tmp_path / "keys", tmp_path / "stores"
+    ensure_user_keys(keys, "owner3", password=b"pw")
+    plain = owner_key_store(keys, "owner3", wrap=False, store_dir=stores)
+    plain.put("f1", b"\x99" * 32)
+    assert plain.get("f1") == b"\x99" * 32
+    owner_key_store(keys, "owner3", wrap=True, store_dir=stores, password=b"pw").put("f2", b"\xaa" * 32)
+    with pytest.raises(TypeError):
+        plain.get("f2")
+    assert owner_key_store(keys, "owner3", wrap=False, store_dir=stores, password=b"pw").get_many(["f1", "f2"]) \
+        == {"f1": b"\x99" * 32, "f2": b"\xaa" * 32}
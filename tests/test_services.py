@@ -1,10 +1,15 @@
-from pathlib import Path
+import io
 import os
+import pytest
+import src.services.verifier as verifier
 from src.blockchain.local_chain import LocalChain
+from src.blockchain.sqlite_chain import SqliteChain
+from src.core.crypto import aes_encrypt, rsa_wrap, sign_ecdsa
 from src.core.keystore import ensure_user_keys, load_user_keys
 from src.services.uploader import encrypt_sign_upload
-from src.services.sharing import create_access_request, approve_and_share_key
-from src.services.verifier import requester_download_and_verify
+from src.services.sharing import create_access_request, approve_and_share_key, approve_and_share_keys_bulk
+from src.services.verifier import requester_download_and_verify, requester_download_range, requester_download_to
+from src.storage.cloud import blob_path, put_blob
 from config.settings import KEYS_DIR
 
 def test_full_flow(tmp_path, monkeypatch):
@@ -38,3 +43,179 @@ def test_full_flow(tmp_path, monkeypatch):
     # Requester downloads, decrypts, and verifies
     out = requester_download_and_verify(chain, req_id, req_rsa_priv, owner_ecdsa_pub, file_id)
     assert out == pt_data
+
+def _upload_and_share(chain, owner, requester, path, **kw):
+    upload = encrypt_sign_upload(owner.ecdsa_priv, owner.id, str(path), chain=chain, **kw)
+    approve_and_share_key(chain, owner.id, upload["file_id"], requester.id, requester.rsa_pub, upload["aes_key"])
+    return upload
+
+def test_download_with_trusted_root(tmp_path, chain, owner, requester):
+    # Events used for download are confirmed by Merkle proofs against a known root
+    pt_path = tmp_path/"doc.txt"
+    pt_path.write_bytes(b"audited contents")
+    upload = _upload_and_share(chain, owner, requester, pt_path)
+    root = (2, chain.merkle_root())
+    out = requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub,
+                                        upload["file_id"], trusted_root=root)
+    assert out == b"audited contents"
+    with pytest.raises(ValueError):
+        requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub,
+                                      upload["file_id"], trusted_root=(1, chain.merkle_root(1)))
+
+    sqlite_chain = SqliteChain(tmp_path/"ledger.db")
+    sqlite_chain.append_events([b["event"] for b in chain.get_events()])
+    with pytest.raises(ValueError, match="cannot prove inclusion"):
+        requester_download_and_verify(sqlite_chain, requester.id, requester.rsa_priv, owner.ecdsa_pub,
+                                      upload["file_id"], trusted_root=root)
+
+def test_chunked_upload_roundtrip(tmp_path, chain, owner, requester):
+    # Uploads are streamed in fixed-size chunks and the event records the layout
+    pt_path = tmp_path/"big.bin"
+    pt_data = os.urandom(10_000)
+    pt_path.write_bytes(pt_data)
+
+    upload = _upload_and_share(chain, owner, requester, pt_path, chunk_size=4096)
+    ev = chain.first_event(type="UPLOAD", file_id=upload["file_id"])
+    assert ev["format"] == 2 and ev["chunk_size"] == 4096
+    assert ev["size"] == upload["size"] == 10_000 + 3 * 16
+    out = requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, upload["file_id"])
+    assert out == pt_data
+
+def test_download_to_path_streams_and_rejects_tamper(tmp_path, chain, owner, requester):
+    # Plaintext lands at dest only after the signature verifies; a bad blob leaves nothing behind
+    pt_path = tmp_path/"big.bin"
+    pt_data = os.urandom(20_000)
+    pt_path.write_bytes(pt_data)
+    fid = _upload_and_share(chain, owner, requester, pt_path, chunk_size=4096)["file_id"]
+
+    out_dir = tmp_path/"out"; out_dir.mkdir()
+    n = requester_download_to(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid, out_dir/"copy.bin")
+    assert n == len(pt_data) and (out_dir/"copy.bin").read_bytes() == pt_data
+
+    blob = blob_path(fid)
+    blob.write_bytes(blob.read_bytes()[:-4096 - 16])  # drop the last chunk
+    with pytest.raises(Exception):
+        requester_download_to(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid, out_dir/"bad.bin")
+    assert sorted(p.name for p in out_dir.iterdir()) == ["copy.bin"]
+
+def test_download_legacy_single_shot_blob(chain, owner, requester):
+    # Format-1 uploads (one AES-GCM message, no format field) still stream-decrypt
+    key, nonce, ct = aes_encrypt(b"legacy payload")
+    put_blob("legacy_test", ct, filename="old.txt")
+    chain.append_event({"type": "UPLOAD", "file_id": "legacy_test", "owner_id": owner.id,
+                        "filename": "old.txt", "aes_nonce": nonce.hex(),
+                        "sig": sign_ecdsa(owner.ecdsa_priv, ct).hex(), "size": len(ct)})
+    approve_and_share_key(chain, owner.id, "legacy_test", requester.id, requester.rsa_pub, key)
+    buf = io.BytesIO()
+    requester_download_to(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, "legacy_test", buf)
+    assert buf.getvalue() == b"legacy payload"
+
+def test_tree_signed_upload_detects_bad_chunk(tmp_path, chain, owner, requester):
+    # Tree-signed uploads record their tree; a modified chunk is named on download
+    pt_path = tmp_path/"big.bin"
+    pt_path.write_bytes(os.urandom(12_000))
+    for mode in ("tree", "stream"):
+        fid = _upload_and_share(chain, owner, requester, pt_path, chunk_size=4096, sign_mode=mode)["file_id"]
+        ev = chain.first_event(type="UPLOAD", file_id=fid)
+        assert ev["sig_mode"] == mode
+        assert requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid) \
+            == pt_path.read_bytes()
+
+    tree_ev = [e["event"] for e in chain.find_events(type="UPLOAD") if e["event"].get("sig_mode") == "tree"][-1]
+    assert tree_ev["tree"]["leaves"] == 3 and tree_ev["tree"]["leaf_size"] == 4096 + 16
+    blob = blob_path(tree_ev["file_id"])
+    data = bytearray(blob.read_bytes()); data[5000] ^= 1
+    blob.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="chunk 1"):
+        requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, tree_ev["file_id"])
+
+def test_range_download_reads_only_covering_chunks(tmp_path, monkeypatch, chain, owner, requester):
+    # Slices decrypt correctly across chunk boundaries and fetch only the chunks they need
+    pt_path = tmp_path/"log.bin"
+    pt_data = os.urandom(50_000)
+    pt_path.write_bytes(pt_data)
+    fid = _upload_and_share(chain, owner, requester, pt_path, chunk_size=4096)["file_id"]
+
+    fetched = []
+    real = verifier.get_blob_range
+    monkeypatch.setattr(verifier, "get_blob_range", lambda f, o, n: fetched.append(n) or real(f, o, n))
+    for off, n in ((0, 10), (4000, 200), (49_990, 100), (12_288, 4096), (60_000, 5)):
+        got = requester_download_range(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid, off, n)
+        assert got == pt_data[off:off + n]
+    assert max(fetched) == 2 * (4096 + 16)
+
+def test_compressed_upload_roundtrip(tmp_path, chain, owner, requester):
+    # Text compresses before encryption; random data is left alone under "auto"
+    text = tmp_path/"app.log"
+    text.write_bytes(b"".join(b"2024-01-01 INFO request %d served\n" % i for i in range(5000)))
+    noise = tmp_path/"noise.bin"
+    noise.write_bytes(os.urandom(50_000))
+
+    sizes, fids = {}, {}
+    for path in (text, noise):
+        fid = fids[path.name] = _upload_and_share(chain, owner, requester, path,
+                                                  chunk_size=8192, compression="auto")["file_id"]
+        ev = chain.first_event(type="UPLOAD", file_id=fid)
+        sizes[path.name] = (ev.get("codec"), ev["size"])
+        out = requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid)
+        assert out == path.read_bytes()
+    assert sizes["app.log"][0] == "zlib" and sizes["app.log"][1] < text.stat().st_size // 4
+    assert sizes["noise.bin"][0] is None
+    with pytest.raises(ValueError):
+        requester_download_range(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fids["app.log"], 0, 10)
+
+def test_bulk_share_writes_once_and_skips_existing(tmp_path, monkeypatch, chain, owner, requester, make_user):
+    # Many requests are approved with one ledger append; already-shared and keyless ones are skipped
+    uploads = []
+    for name in ("a.txt", "b.txt"):
+        (tmp_path/name).write_bytes(name.encode() * 10)
+        uploads.append(encrypt_sign_upload(owner.ecdsa_priv, owner.id, str(tmp_path/name), chain=chain))
+    bulk = make_user("requester_bulk")
+    pubs = {requester.id: requester.rsa_pub, bulk.id: bulk.rsa_pub}
+    a, b = uploads[0]["file_id"], uploads[1]["file_id"]
+    approve_and_share_key(chain, owner.id, a, requester.id, requester.rsa_pub, uploads[0]["aes_key"])
+
+    writes = []
+    real = chain.append_events
+    monkeypatch.setattr(chain, "append_events", lambda evs: writes.append(len(evs)) or real(evs))
+    requests = [(a, requester.id), (a, bulk.id), (b, requester.id),
+                (b, bulk.id), (b, bulk.id), ("unknown", bulk.id)]
+    keys = {a: uploads[0]["aes_key"], b: uploads[1]["aes_key"]}
+    result = approve_and_share_keys_bulk(chain, owner.id, requests, keys, pubs.__getitem__, workers=2)
+
+    assert writes == [3] and len(result["shared"]) == 3
+    assert result["already_shared"] == 2 and result["missing_key"] == [("unknown", bulk.id)]
+    for fid, name in ((a, b"a.txt"), (b, b"b.txt")):
+        out = requester_download_and_verify(chain, bulk.id, bulk.rsa_priv, owner.ecdsa_pub, fid)
+        assert out == name * 10
+
+def test_x25519_share_and_legacy_rsa_share(tmp_path, chain, owner, requester):
+    # Downloads read X25519 shares and untagged (pre-scheme) RSA shares alike
+    (tmp_path/"x.txt").write_bytes(b"wrapped with ecdh")
+    upload = encrypt_sign_upload(owner.ecdsa_priv, owner.id, str(tmp_path/"x.txt"), chain=chain)
+    fid = upload["file_id"]
+
+    approve_and_share_key(chain, owner.id, fid, requester.id, requester.x25519_pub, upload["aes_key"])
+    assert chain.latest_event(type="KEY_SHARE", file_id=fid)["scheme"] == "x25519-hkdf-aesgcm"
+    with pytest.raises(ValueError):
+        requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid)
+    assert requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid,
+                                         requester_x25519_priv=requester.x25519_priv) == b"wrapped with ecdh"
+
+    chain.append_event({"type": "KEY_SHARE", "file_id": fid, "owner_id": owner.id, "requester_id": requester.id,
+                        "wrapped_key": rsa_wrap(requester.rsa_pub, upload["aes_key"]).hex()})
+    assert requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, fid) \
+        == b"wrapped with ecdh"
+
+def test_share_key_accepts_deprecated_rsa_keyword(tmp_path, chain, owner, requester):
+    # Keyword callers from before X25519 support still work, with a deprecation warning
+    (tmp_path/"k.txt").write_bytes(b"old keyword")
+    upload = encrypt_sign_upload(owner.ecdsa_priv, owner.id, str(tmp_path/"k.txt"), chain=chain)
+    with pytest.warns(DeprecationWarning):
+        approve_and_share_key(chain, owner.id, upload["file_id"], requester.id,
+                              requester_rsa_pub=requester.rsa_pub, aes_key=upload["aes_key"])
+    assert requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub,
+                                         upload["file_id"]) == b"old keyword"
+    with pytest.raises(TypeError):
+        approve_and_share_key(chain, owner.id, upload["file_id"], requester.id, requester.rsa_pub,
+                              upload["aes_key"], requester_rsa_pub=requester.rsa_pub)
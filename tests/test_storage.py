@@ -0,0 +1,231 @@
+import io
+import json
+import os
+import threading
+import time
+import pytest
+from src.services.uploader import encrypt_sign_upload
+from src.services.sharing import approve_and_share_key
+from src.services.verifier import requester_download_and_verify
+from src.storage import cloud
+from src.storage.blob_cache import BlobCache
+from src.storage.fs_store import FileStore
+from src.storage.meta_store import MetaStore
+from src.storage.s3_store import S3Store
+
+def test_meta_store_put_get_many(tmp_path):
+    # Single and bulk lookups; unknown ids are left out
+    store = MetaStore(tmp_path/"meta.db")
+    for i in range(1200):
+        store.put(f"f{i}", f"name{i}.txt", i)
+    store.put("f3", "renamed.txt", 99)
+    assert store.get("f3") == {"filename": "renamed.txt", "size": 99}
+    assert store.get("missing") is None
+    got = store.get_many([f"f{i}" for i in range(0, 1200, 2)] + ["missing"])
+    assert len(got) == 600 and got["f1198"] == {"filename": "name1198.txt", "size": 1198}
+    assert sum(1 for _ in store.iter_all()) == 1200
+
+def test_meta_store_migrates_json_once(tmp_path):
+    # meta.json is imported on first open and retired
+    legacy = tmp_path/"meta.json"
+    legacy.write_text(json.dumps({"a": {"filename": "a.txt", "size": 1}, "b": {"filename": "b.txt", "size": 2}}))
+    store = MetaStore(tmp_path/"meta.db", legacy_json=legacy)
+    assert store.get_many(["a", "b"]) == {"a": {"filename": "a.txt", "size": 1},
+                                          "b": {"filename": "b.txt", "size": 2}}
+    assert not legacy.exists() and (tmp_path/"meta.json.migrated").exists()
+
+def test_meta_store_concurrent_writers(tmp_path):
+    # Writers on separate connections never lose each other's entries
+    stores = [MetaStore(tmp_path/"meta.db") for _ in range(4)]
+    def work(k):
+        for i in range(100):
+            stores[k].put(f"{k}-{i}", "x", i)
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sum(1 for _ in stores[0].iter_all()) == 400
+
+def test_sharded_layout_reads_flat_blobs_and_migrates(tmp_path):
+    # Flat-layout blobs stay readable and move into shards online
+    store = FileStore(tmp_path, shard_levels=2)
+    (tmp_path/"old.blob").write_bytes(b"flat")
+    (tmp_path/"old.tree").write_bytes(b"x" * 32)
+    store.put_sidecar("new", "tree", b"y" * 32)
+    store.put("new", b"sharded")
+    assert store.get("old") == b"flat" and store.get("new") == b"sharded"
+    assert store.path("new").parent.parent.parent == tmp_path
+    assert sorted(store.iter_ids()) == ["new", "old"]
+
+    assert store.migrate_layout() == 2
+    assert not (tmp_path/"old.blob").exists()
+    assert store.get("old") == b"flat" and store.get_sidecar("old", "tree") == b"x" * 32
+    assert store.migrate_layout() == 0
+
+def test_shard_levels_change_keeps_blobs_readable(tmp_path):
+    # Blobs written under another CLOUD_SHARD_LEVELS are found, then migrated to the new depth
+    FileStore(tmp_path, shard_levels=3).put("deep", b"three")
+    FileStore(tmp_path, shard_levels=1).put_sidecar("shallow", "tree", b"t" * 32)
+    store = FileStore(tmp_path, shard_levels=2)
+    assert store.get("deep") == b"three" and store.get_sidecar("shallow", "tree") == b"t" * 32
+    assert store.migrate_layout() == 2
+    assert store.path("deep") == store._path("deep")
+    assert store.get("deep") == b"three" and store.get_sidecar("shallow", "tree") == b"t" * 32
+
+def test_migration_ignores_stray_files(tmp_path):
+    # Hidden files, swap files and unknown suffixes in CLOUD_DIR are neither listed nor moved
+    store = FileStore(tmp_path, shard_levels=2)
+    strays = [".DS_Store", ".old.blob.swp", "notes.txt", ".blob", "x.blob.part", "x.blob~"]
+    for name in strays:
+        (tmp_path/name).write_bytes(b"?")
+    (tmp_path/"x.blob").write_bytes(b"flat")
+    assert list(store.iter_ids()) == ["x"]
+    assert store.migrate_layout() == 1
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == sorted(strays)
+    with pytest.raises(ValueError):
+        store.put_sidecar("x", "notes", b"")
+
+def test_blob_view_is_mmap_backed(tmp_path):
+    # view() maps the blob read-only; empty blobs give an empty view
+    import mmap
+    store = FileStore(tmp_path)
+    store.put("v", b"0123456789")
+    store.put("e", b"")
+    with store.view("v") as view:
+        assert isinstance(view.obj, mmap.mmap) and view.readonly
+        assert bytes(view[2:5]) == b"234"
+    assert len(store.view("e")) == 0
+
+class _FakeS3:
+    # In-process stand-in for the S3 API calls S3Store makes
+    class Missing(Exception):
+        response = {"Error": {"Code": "NoSuchKey"}}
+
+    class _Body:
+        def __init__(self, data): self.data = data
+        def read(self): return self.data
+
+    def __init__(self):
+        self.objects, self.uploads = {}, {}
+        self.lock = threading.Lock()
+        self.active = self.max_active = 0
+        self.ranged_gets = 0
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.Missing()
+        return {"ContentLength": len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Key not in self.objects:
+            raise self.Missing()
+        data = self.objects[Key]
+        if Range:
+            self._enter(); time.sleep(0.01); self._leave()
+            self.ranged_gets += 1
+            a, b = Range[len("bytes="):].split("-")
+            data = data[int(a):int(b) + 1]
+        return {"Body": self._Body(data)}
+
+    def create_multipart_upload(self, Bucket, Key):
+        uid = f"u{len(self.uploads)}"
+        self.uploads[uid] = {}
+        return {"UploadId": uid}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._enter(); time.sleep(0.01); self._leave()
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f"e{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + 2]
+        more = start + 2 < len(keys)
+        return {"Contents": [{"Key": k} for k in page], "IsTruncated": more,
+                "NextContinuationToken": str(start + 2)}
+
+def test_s3_store_parallel_multipart_and_ranged_reads():
+    # Large blobs go up as parallel parts and come back via parallel ranged GETs
+    fake = _FakeS3()
+    store = S3Store(bucket="b", prefix="p/", part_size=1000, workers=4, client=fake)
+    data = os.urandom(10_500)
+    store.put_stream("big", (data[i:i + 777] for i in range(0, len(data), 777)))
+    assert fake.objects["p/big.blob"] == data and fake.max_active > 1
+    store.put("small", b"tiny")
+    store.put_sidecar("big", "tree", b"t")
+
+    fake.max_active = 0
+    assert store.get("big") == data and fake.ranged_gets == 11 and fake.max_active > 1
+    with store.view("big") as view:
+        assert bytes(view[5000:5010]) == data[5000:5010]
+    assert store.get_range("big", 10_400, 500) == data[10_400:]
+    assert store.get_sidecar("big", "tree") == b"t" and store.get_sidecar("nope", "tree") is None
+    assert sorted(store.iter_ids()) == ["big", "small"]
+    with pytest.raises(FileNotFoundError):
+        store.get("nope")
+
+def test_services_run_on_s3_backend(tmp_path, chain, owner, requester):
+    # Upload and streaming download work unchanged on the object-store backend
+    pt = tmp_path/"f.bin"
+    pt.write_bytes(os.urandom(30_000))
+    fake = _FakeS3()
+    cloud.set_blob_store(S3Store(bucket="b", part_size=5000, workers=3, client=fake))
+    up = encrypt_sign_upload(owner.ecdsa_priv, owner.id, str(pt), chain=chain, chunk_size=4096)
+    approve_and_share_key(chain, owner.id, up["file_id"], requester.id, requester.rsa_pub, up["aes_key"])
+    assert f"{up['file_id']}.blob" in fake.objects and f"{up['file_id']}.tree" in fake.objects
+    assert requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub, up["file_id"]) \
+        == pt.read_bytes()
+
+def test_migrate_layout_is_noop_on_s3():
+    # Object stores have no shard layout to migrate
+    cloud.set_blob_store(S3Store(bucket="b", client=_FakeS3()))
+    assert cloud.migrate_layout() == 0
+
+def test_blob_cache_lru_and_integrity(tmp_path):
+    # Size-bounded LRU; a corrupted entry is dropped instead of served
+    cache = BlobCache(tmp_path/"cache", max_bytes=250)
+    for fid in ("a", "b"):
+        cache.put(fid, "sig", io.BytesIO(fid.encode() * 100)).release()
+    assert bytes(cache.get("a", "sig")) == b"a" * 100       # a is now most recent
+    assert cache.get("a", "other-sig") is None               # re-upload => different key
+    cache.put("c", "sig", io.BytesIO(b"c" * 100)).release()  # evicts b
+    assert cache.get("b", "sig") is None and cache.size() == 200
+    assert bytes(cache.put("huge", "sig", io.BytesIO(b"h" * 500))) == b"h" * 500
+    assert cache.get("huge", "sig") is None
+
+    path = cache._path(cache._key("c", "sig"))
+    path.write_bytes(b"x" * 100)
+    assert cache.get("c", "sig") is None and not path.exists()
+
+def test_cached_downloads_skip_the_transfer(tmp_path, chain, owner, requester):
+    # The second download of the same upload is served from the local cache
+    pt = tmp_path/"f.bin"
+    pt.write_bytes(os.urandom(20_000))
+    fake = _FakeS3()
+    cloud.set_blob_store(S3Store(bucket="b", part_size=5000, workers=2, client=fake))
+    cloud.set_blob_cache(BlobCache(tmp_path/"cache", max_bytes=1 << 20))
+    up = encrypt_sign_upload(owner.ecdsa_priv, owner.id, str(pt), chain=chain, chunk_size=4096)
+    approve_and_share_key(chain, owner.id, up["file_id"], requester.id, requester.rsa_pub, up["aes_key"])
+    for expected_gets in (5, 5):
+        assert requester_download_and_verify(chain, requester.id, requester.rsa_priv, owner.ecdsa_pub,
+                                             up["file_id"]) == pt.read_bytes()
+        assert fake.ranged_gets == expected_gets